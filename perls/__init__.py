@@ -13,6 +13,7 @@ from .utils import (math_util,
 )
 
 from .control import Controller
+from .rollout import RolloutManager
 
 from .robot import kinect, sawyer
 from .robot.utils import pcl_segment
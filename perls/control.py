@@ -1,4 +1,4 @@
-import multiprocessing
+import os
 import sys, logging
 import platform
 
@@ -13,6 +13,7 @@ from .handler.controlHandler import (KeyboardEventHandler,
 from .utils import io_util, time_util, math_util
 from .utils.io_util import pjoin
 from .utils.io_util import PerlsLogger
+from .utils.channel import ControlChannel
 from .view import View
 from .world import World
 
@@ -88,7 +89,14 @@ class Controller(object):
                              'configs',
                              config_batch)
         self._physics_servers = dict()
-        self._process_pool = list()
+
+        # Control loop scheduler and number of physics
+        # steps per tick (0 unless lockstep) of each server
+        self._schedulers = dict()
+
+        # Timers of control loop phases of each server,
+        # only recording in debug and test builds
+        self._timers = dict()
 
         # space to store useful states.
         # Note it needs to use dictionary to store the states of
@@ -128,16 +136,24 @@ class Controller(object):
          instance_id: ......}
         """
         info_dic = {}
-        for s_id, (world, disp, pe, ctrl_hdlr) in \
+        for s_id, (_, world, disp, ctrl_hdlr, channel) in \
                 self._physics_servers.items():
             info_dic[s_id] = dict(
                 world_info=world.info,
                 display_info=disp.info,
-                engine_info=pe.info,
+                engine_info=world.info['engine'],
                 control=ctrl_hdlr.name,
+                channel=channel.stats,
                 run_time=time_util.get_elapsed_time(
                     self._init_time_stamp),
             )
+            scheduler, substeps = self._schedulers[s_id]
+            if scheduler is not None:
+                info_dic[s_id]['loop'] = dict(
+                    scheduler.stats, rate=1. / scheduler.period,
+                    substeps=substeps)
+            if self._timers[s_id].enabled:
+                info_dic[s_id]['timing'] = self._timers[s_id].stats
         return info_dic
 
     def _build(self):
@@ -157,8 +173,12 @@ class Controller(object):
                 'Error loading configuration: invalid id.'
 
             # load configs
-            queue = multiprocessing.Queue()
-            nruns, world, disp, ctrl_hdlr = self.load_config(conf, queue)
+            # Handlers tick in a thread of the process running
+            # the server, so signals are passed without copies
+            channel = ControlChannel(
+                conf.channel, conf.channel_size,
+                merge=self._merge_signals)
+            nruns, world, disp, ctrl_hdlr = self.load_config(conf, channel)
             if num_configs > 1 and (not conf.async):
                 logging.error(
                     'Currently only support multiple instances '
@@ -172,10 +192,62 @@ class Controller(object):
                     'Simulation configuration {} build success. '
                     'Build type: {}'.format(i, conf.build))
                 world.notify_engine('pending')
-            self._physics_servers[conf.id] = (nruns, world, disp, ctrl_hdlr, queue)
+            self._physics_servers[conf.id] = (nruns, world, disp, ctrl_hdlr, channel)
+            self._schedulers[conf.id] = self._make_scheduler(conf)
+            self._timers[conf.id] = time_util.PhaseTimer(
+                enabled=conf.build != 'release')
+
+    @staticmethod
+    def _merge_signals(older, newer):
+        """
+        Coalesce a pending control signal into a newer one,
+        keeping the one-shot instructions and view updates of
+        the older signal. Reach targets and camera moves are
+        rates scaled by the elapsed time, so newer ones
+        supersede the older.
+        :param older: replaced signal dictionary
+        :param newer: newer signal dictionary
+        :return: merged signal dictionary
+        """
+        merged = dict(newer)
+        carried = [ins for ins in older['instruction'] if ins[0] != 'reach']
+        merged['instruction'] = carried + newer['instruction']
+        # Keep the selected tool if the newer signal only holds
+        # the default selection. Some handlers never select.
+        if carried and 'tid' in older and \
+                (newer.get('tid', 0), newer.get('key', 'm')) == (0, 'm'):
+            merged['tid'] = older['tid']
+            merged['key'] = older.get('key', 'm')
+        merged['update'] = older['update'] or newer['update']
+        return merged
 
     @staticmethod
-    def load_config(conf, queue):
+    def _make_scheduler(conf):
+        """
+        Set up the pacing of the control loop. Real time
+        simulation is ticked at the control rate, lockstep
+        simulation also steps physics to match each tick,
+        and other asynchronous simulation runs free.
+        :param conf: configuration of the server
+        :return: tuple (RateScheduler or None, integer
+        number of physics steps per tick, 0 if not lockstep)
+        """
+        if conf.lockstep:
+            substeps = max(int(round(
+                1. / (conf.rate * conf.step_size))), 1)
+            if abs(substeps * conf.step_size * conf.rate - 1.) > 1e-3:
+                logging.warning(
+                    'Control period is not a multiple of step size, '
+                    'ticking at {:.2f} Hz.'.format(
+                        1. / (substeps * conf.step_size)))
+            return time_util.RateScheduler(
+                1. / (substeps * conf.step_size)), substeps
+        if conf.async:
+            return None, 0
+        return time_util.RateScheduler(conf.rate), 0
+
+    @staticmethod
+    def load_config(conf, channel):
         """
         Helper method to load configurations. Not recommended with
         outside calls unless perform manual check, since it may
@@ -188,6 +260,8 @@ class Controller(object):
         :param conf: configuration to load.
         Currently only support three types of engines:
         Bullet Physics, Mujoco, and Gazebo.
+        :param channel: ControlChannel passing control
+        signals to the control loop, None for no control
         :return: loaded tuple (world, display, physics physics_engine)
         """
 
@@ -207,14 +281,20 @@ class Controller(object):
             conf.max_run_time,
             conf.async,
             conf.step_size,
+            solver=conf.solver,
         )
+        if conf.asset_cache:
+            pe.configure_asset_cache(
+                True, io_util.pjoin(__file__, '../log/asset_cache'))
+        if conf.command_buffer:
+            pe.configure_command_buffer(True)
 
         world = World(conf.model_desc, pe)
         display = View(conf.view_desc, Adapter(world), ge)
 
         # Set up control event interruption handlers
         ctrl_handler = Controller._CTRL_HANDLERS[conf.control_type](
-            pe.ps_id, queue, conf.sensitivity, conf.rate,
+            pe.ps_id, channel, conf.sensitivity, conf.rate,
         )
 
         # TODO
@@ -247,23 +327,71 @@ class Controller(object):
 
         return num_of_runs, world, display, ctrl_handler
 
-    def start_all(self):
+    @staticmethod
+    def load_pool(conf, size):
+        """
+        Load independent copies of the configured world, each
+        in its own DIRECT physics client inside this process,
+        for batched rollouts. No display or control handler is
+        created, and only async simulation is supported.
+        :param conf: configuration to load
+        :param size: integer number of worlds
+        :return: tuple (engine pool, list of booted worlds)
+        """
+        if not conf.async:
+            logging.error('Engine pool only supports async simulation.')
+            return None, list()
+
+        pool = physicsEngine.BulletEnginePool(
+            size, conf.max_run_time, conf.step_size, conf.solver)
+        if conf.asset_cache:
+            for engine in pool:
+                engine.configure_asset_cache(
+                    True, io_util.pjoin(__file__, '../log/asset_cache'))
+        if conf.command_buffer:
+            for engine in pool:
+                engine.configure_command_buffer(True)
+
+        worlds = list()
+        for engine in pool:
+            world = World(conf.model_desc, engine)
+            world.build()
+            world.boot('cmd', conf.job)
+            worlds.append(world)
+        return pool, worlds
+
+    def start_all(self, num_workers=None, policy=None):
         """
         Kick start all instances simulation!
         Note this can only be called when there are
         multiple instances of simulation servers.
-        Each simulation will happen in different
-        threads.
-        :return: None
+        The runs of all configurations are spread as
+        single episodes over a pool of worker processes,
+        see <RolloutManager>.
+        :param num_workers: integer number of worker
+        processes, default is one per core
+        :param policy: function (world, step) -> None applying
+        scripted actions each tick, None to only run physics
+        :return: list of result dictionaries of all episodes
         """
+        from .rollout import RolloutManager
+
         if len(self._physics_servers) < 2:
             logging.error('Cannot call <start_all> for less than 2 instances.')
-            return
-        for s_id in range(len(self._physics_servers)):
-            # Dispatch to new threads
-            t = multiprocessing.Process(target=self.start, args=(s_id,))
-            self._process_pool.append(t)
-            t.start()
+            return list()
+
+        manager = RolloutManager(num_workers, policy)
+        manager.start()
+        for s_id, server in sorted(self._physics_servers.items()):
+            manager.submit(self._config, num_runs=server[0], conf_id=s_id)
+        try:
+            results = list(manager.results())
+        finally:
+            manager.close()
+
+        logging.info('Finished {} runs, {} successful.'.format(
+            len(results), sum(bool(r['success']) for r in results)))
+        return results
 
     def start(self, server_id=0):
         """
@@ -273,7 +401,9 @@ class Controller(object):
         :return: None
         """
         # Get all handlers
-        nruns, world, display, ctrl_handler, queue = self._physics_servers[server_id]
+        nruns, world, display, ctrl_handler, channel = self._physics_servers[server_id]
+        scheduler, substeps = self._schedulers[server_id]
+        timer = self._timers[server_id]
 
         # Kickstart the model, perform frame type check
         world.boot(display.info['frame'], job=display.info['engine']['job'])
@@ -286,9 +416,8 @@ class Controller(object):
             try:
                 ctrl_handler.pause()
 
-                # Clear the control queue
-                while not queue.empty():
-                    queue.get_nowait()
+                # Clear the control channel
+                channel.clear()
 
                 # Preparing variables
                 time_up, done, success = False, False, False
@@ -327,6 +456,9 @@ class Controller(object):
 
                 # Finally start control loop (Core)
                 ctrl_handler.resume()
+                if scheduler is not None:
+                    scheduler.reset_stats()
+                    scheduler.start()
 
                 while not time_up and not done:
                     elt = time_util.get_elapsed_time(self._init_time_stamp)
@@ -335,21 +467,38 @@ class Controller(object):
                     self._update_time_stamp = time_util.get_abs_time()
 
                     # Perform control interruption first
-                    if not queue.empty():
-                        signal = queue.get_nowait()
+                    stamp = timer.start()
+                    signal = channel.get()
+                    stamp = timer.lap('poll', stamp)
+                    if signal is not None:
 
-                        self._control_interrupt(
+                        view_time = self._control_interrupt(
                             world, display, signal,
-                            time_since_last_update)
+                            time_since_last_update, timer)
+                        stamp = timer.lap('interrupt', stamp, view_time)
 
-                    # Update model
-                    time_up = world.update(elt)
+                    # Update model, in lockstep advance physics
+                    # by one control period
+                    time_up = world.update(elt, num_steps=substeps or 1)
+                    stamp = timer.lap('update', stamp)
 
                     # Check agent performance & task completion
                     done, success = world.check_states()
+                    stamp = timer.lap('check', stamp)
+
+                    # Wait for the next control tick
+                    if scheduler is not None:
+                        scheduler.wait()
+                        timer.lap('wait', stamp)
 
                     # TODO: GUI frame allow user to interact with the world
                     # dynamically, and vividly
+
+                if scheduler is not None:
+                    logging.info('Control loop stats: {}'.format(
+                        scheduler.stats))
+                logging.info('Control channel stats: {}'.format(
+                    channel.stats))
                 if success:
                     self.stop(server_id, 0)
                     logging.info('Task success! Exiting run {}...'.format(r))
@@ -403,15 +552,21 @@ class Controller(object):
         # Destroy world
         world.clean_up()
 
-        # TODO
-        if self._process_pool:
-            self._process_pool[server_id].terminate()
-            self._process_pool[server_id] = None
+        timer = self._timers[server_id]
+        if timer.enabled:
+            log_dir = pjoin(__file__, '../log/timing')
+            if not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+            log_file = pjoin(log_dir, '{}_{}.json'.format(
+                time_util.get_full_time_stamp(), server_id))
+            timer.dump(log_file)
+            logging.info('Control loop timing saved to {}'.format(log_file))
 
         logging.info('Safe exit.')
         sys.exit(0)
 
-    def _control_interrupt(self, world, display, signal, elapsed_time):
+    def _control_interrupt(self, world, display, signal, elapsed_time,
+                           timer=None):
         """
         The control interruption, jumps to control defined
         in xml file, process the control signals and
@@ -419,7 +574,9 @@ class Controller(object):
         :param world: the world model, provides tools
         :param display: the view model, set camera views
         :param signal: the signal received from control handler
-        :return: None
+        :param timer: PhaseTimer to time view updates in,
+        None to not time them
+        :return: float seconds recorded as view update
         """
         # Only keep consistency for GUI usage
         elapsed_time = 1 if display.info['frame'] != 'gui' else elapsed_time * 50
@@ -428,8 +585,11 @@ class Controller(object):
 
         # Update view perspective modified by user pressing control key
         if update:
+            stamp = timer.start() if timer else None
             self._view_update(display)
-            return
+            if stamp is None:
+                return 0.
+            return timer.lap('view', stamp) - stamp
 
         # Check for view perspective control
         if view:
@@ -580,6 +740,7 @@ class Controller(object):
                     tool.grasp(value)
                 elif method == 'pick_and_place':
                     tool.pick_and_place(*value)
+        return 0.
 
     def _view_update(self, display):
         """
@@ -601,14 +762,16 @@ class Controller(object):
         :param world: The world model that provides tools
         :return: None
         """
-        init_states = world.get_env_state(('tool', 'tool_pose'))[0]
+        names = [tool.name for tool in world.tool.values()]
+        snapshot = world.snapshot(['tool_pose'], names)
         # First control states
-        for tid, init_pose in init_states.items():
+        for tid, tool in world.tool.items():
+            init_pose = snapshot['tool_pose'][snapshot['index'][tool.name]]
             # if tid[0] == 'g':
             self._states['tool'][tid] = [
-                init_pose[0],
+                init_pose[:3],
                 # Use radians
-                math_util.quat2euler(init_pose[1])]
+                math_util.quat2euler(init_pose[3:])]
             # else:
             #     # For arms, use joint positions for tool orn;
             #     # The real orientation is end effector pose
@@ -1,5 +1,6 @@
 import abc
 import logging
+import numpy as np
 
 from .body import Tool
 from ..utils import math_util
@@ -25,6 +26,14 @@ class Arm(Tool):
 
         self.collision_checking = collision_checking
 
+        # Stiffness of operational space torque control, damping
+        # is set for critically damped response
+        self._osc_gains = dict(pos=150., orn=150., null=10.)
+        # Target (pos, orn, null space) of operational space
+        # control, driven before every physics step, None
+        # when not under torque control
+        self._osc_target = None
+
     @property
     def type(self):
         """
@@ -134,6 +143,30 @@ class Arm(Tool):
         else:
             return self.kinematics['abs_omega'][self._end_idx]
 
+    @property
+    def osc_gains(self):
+        """
+        Get the gains of operational space torque control
+        :return: dictionary of {pos, orn, null} stiffness,
+        for end effector position, orientation and the
+        null space posture towards rest pose
+        """
+        return dict(self._osc_gains)
+
+    @osc_gains.setter
+    def osc_gains(self, gains):
+        """
+        Set the gains of operational space torque control
+        :param gains: dictionary of stiffness values to
+        update, keys among {pos, orn, null}
+        :return: None
+        """
+        for key in gains:
+            if key not in self._osc_gains:
+                logging.warning('Ignoring unknown gain {}'.format(key))
+        self._osc_gains.update(
+            (k, float(v)) for k, v in gains.items() if k in self._osc_gains)
+
     @tool_pos.setter
     def tool_pos(self, pos_iter):
         """
@@ -183,6 +216,7 @@ class Arm(Tool):
         """
         if len(orn) == 4:
             orn = math_util.quat2euler(orn)
+        self._stop_osc()
         joint_spec = self.joint_specs
         eef_joints = self.active_joints[-2:]
 
@@ -205,22 +239,23 @@ class Arm(Tool):
                            velocityGains=(1.,))
             )
 
-    def set_eef_pose(self, pos, orn, iters=500):
+    def set_eef_pose(self, pos, orn, iters=500, ctype='position'):
         """
         Directly move the end effector to desired pose.
         Note that it matches the reference frame pose.
         :param pos: position cartesian vec float 3
         :param orn: orientation quaternion vec float 4
         :param iters: number of iterations to reach for 
-        the end effector pose 
+        the end effector pose, position control only
+        :param ctype: control type, 'position' or 'torque'
         """
         self._move_to(pos, orn,
-                      precise=False,
+                      precise=ctype == 'torque',
                       fast=True,
                       iterative=iters > 0,
                       max_iter=iters,
                       threshold=1e-2,
-                      ctype='position')
+                      ctype=ctype)
 
     ###
     # Helper functions
@@ -245,6 +280,86 @@ class Arm(Tool):
         frame = math_util.pose2mat((pos, orn)).dot(transform)
         return math_util.mat2pose(frame)
 
+    def _osc_torques(self, pos, orn, null_space=True):
+        """
+        Compute joint torques of operational space control
+        driving the end effector frame to given pose.
+        :param pos: target position vec3 float cartesian
+        :param orn: target orientation vec4 float quaternion
+        :param null_space: boolean, whether to also pull the
+        arm towards its rest pose in the null space
+        :return: tuple (joint indices, torques, position error)
+        """
+        kinematics = self.kinematics
+        frame_pos = math_util.vec(kinematics['abs_frame_pos'][self._end_idx])
+        frame_orn = kinematics['abs_frame_orn'][self._end_idx]
+
+        # Jacobian is taken at the link frame origin,
+        # expressed in link center of mass frame
+        com_rot = math_util.quat2mat(
+            kinematics['orn'][self._end_idx]).astype(np.float64)
+        local_pos = com_rot.T.dot(
+            frame_pos - math_util.vec(kinematics['pos'][self._end_idx]))
+
+        jids, jac, mass, bias, q, dq = \
+            self._engine.get_body_operational_model(
+                self._uid, self._end_idx, tuple(local_pos))
+
+        # Pose error, orientation error from rotation matrix columns
+        pos_err = math_util.vec(pos) - frame_pos
+        target_rot = math_util.quat2mat(orn).astype(np.float64)
+        curr_rot = math_util.quat2mat(frame_orn).astype(np.float64)
+        orn_err = .5 * np.cross(curr_rot.T, target_rot.T).sum(axis=0)
+
+        kp = np.repeat((self._osc_gains['pos'], self._osc_gains['orn']), 3)
+        kv = 2. * np.sqrt(kp)
+        err = np.concatenate((pos_err, orn_err))
+
+        mass_inv = np.linalg.inv(mass)
+        # Operational space inertia, pseudo inverse near singularities
+        lambda_ = np.linalg.pinv(jac.dot(mass_inv).dot(jac.T))
+        force = lambda_.dot(kp * err - kv * jac.dot(dq))
+        torques = jac.T.dot(force) + bias
+
+        if null_space:
+            rest = q.copy()
+            num = min(len(self._rest_pose), len(rest))
+            rest[:num] = self._rest_pose[:num]
+            kn = self._osc_gains['null']
+            jac_bar = mass_inv.dot(jac.T).dot(lambda_)
+            projection = np.eye(len(jids)) - jac.T.dot(jac_bar.T)
+            torques += projection.dot(
+                mass.dot(kn * (rest - q) - 2. * np.sqrt(kn) * dq))
+
+        # Unspecified limits are zeros in model files
+        max_force = self.joint_specs['max_force'][jids]
+        limit = np.where(max_force > 0, max_force, np.inf)
+        return jids, np.clip(torques, -limit, limit), math_util.l2(pos_err)
+
+    def _osc_step(self):
+        """
+        Send operational space control torques towards the
+        current target. Called by the engine before every
+        physics step, since applied torques only last one.
+        :return: None
+        """
+        pos, orn, null_space = self._osc_target
+        jids, torques, _ = self._osc_torques(pos, orn, null_space=null_space)
+        self._engine.set_body_joint_state(
+            self._uid, jids, torques.tolist(), 'torque', dict())
+
+    def _stop_osc(self):
+        """
+        Leave torque control, putting the joint motors
+        back on to hold the current joint positions
+        :return: None
+        """
+        if self._osc_target is None:
+            return
+        self._osc_target = None
+        self._engine.set_body_step_callback(self._uid, None)
+        self.joint_positions = self.joint_positions
+
     def _move_to(self, pos, orn, precise,
                  fast,  # Equivalent to !Null_Space
                  iterative, max_iter, threshold, ctype):
@@ -268,7 +383,10 @@ class Arm(Tool):
         :param max_iter: refer to <pinpoint::max_iter>
         :param ctype: the control type. Specify among
         <'position', 'velocity', 'torque'> to perform certain
-        controlling.
+        controlling. Torque control sets the target of
+        operational space control, which then runs before
+        every physics step until other control takes over,
+        so the call returns at once.
         :return: None
         """
         # Convert to pose in robot base frame
@@ -281,6 +399,7 @@ class Arm(Tool):
         ranges = upper_limits - lower_limits
 
         if ctype == 'position':
+            self._stop_osc()
 
             def _position_control_helper():
 
@@ -330,8 +449,14 @@ class Arm(Tool):
                 _position_control_helper()
                 max_iter = 1
 
-        # elif ctype == 'torque':
-        # TODO: torque Operational Space Control
+        elif ctype == 'torque':
+            if self._osc_target is None:
+                # Joint motors would resist the torques
+                self.torque_mode()
+                self._engine.set_body_step_callback(
+                    self._uid, self._osc_step)
+            self._osc_target = (math_util.vec(pos), orn, not fast)
+            max_iter = 1
 
         return max_iter
         
@@ -343,6 +468,7 @@ class Arm(Tool):
         :return: None
         """
         del self.mark
+        self._stop_osc()
         if self._gripper:
             # First attach gripper
             self.attach_children = \
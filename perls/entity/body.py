@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 
 import abc
+import copy
 import logging
 
 from ..utils import math_util
@@ -179,19 +180,30 @@ class Body(object):
             info_dic['abs_v'].append(self.v)
             info_dic['abs_omega'].append(self.omega)
         else:
+            snapshot = self.snapshot
             for lid in self._links[1:]:
-                info = self._engine.get_body_link_state(self._uid, lid)
                 info_dic['name'].append(self._engine.get_link_name(self._uid, lid))
-                info_dic['pos'].append(info[0])
-                info_dic['orn'].append(info[1])
-                info_dic['rel_pos'].append(info[2])
-                info_dic['rel_orn'].append(info[3])
-                info_dic['abs_frame_pos'].append(info[4])
-                info_dic['abs_frame_orn'].append(info[5])
-                info_dic['abs_v'].append(info[6])
-                info_dic['abs_omega'].append(info[7])
+                info_dic['pos'].append(snapshot['link_pos'][lid].copy())
+                info_dic['orn'].append(snapshot['link_orn'][lid].copy())
+                info_dic['rel_pos'].append(snapshot['link_rel_pos'][lid].copy())
+                info_dic['rel_orn'].append(snapshot['link_rel_orn'][lid].copy())
+                info_dic['abs_frame_pos'].append(snapshot['link_frame_pos'][lid].copy())
+                info_dic['abs_frame_orn'].append(snapshot['link_frame_orn'][lid].copy())
+                info_dic['abs_v'].append(snapshot['link_v'][lid].copy())
+                info_dic['abs_omega'].append(snapshot['link_omega'][lid].copy())
         return info_dic
 
+    @property
+    def snapshot(self):
+        """
+        Get the batched whole body state of this body,
+        fetched from physics engine in one pass and shared
+        by all readers until the simulation state changes.
+        :return: dictionary of numpy arrays, refer to
+        <engine::get_body_snapshot>
+        """
+        return self._engine.get_body_snapshot([self._uid])[self._uid]
+
     @property
     def dynamics(self):
         """
@@ -218,6 +230,14 @@ class Body(object):
         """
         return self._engine.get_body_bounding_box(self._uid, -1)
 
+    @property
+    def model_path(self):
+        """
+        Get the model file path this body is loaded from
+        :return: path string
+        """
+        return self._model_path
+
     @property
     def contact(self):
         """
@@ -233,8 +253,49 @@ class Body(object):
             ...
         ]
         """
-        return [self._engine.get_body_contact_info(self._uid, lid)
-                for lid in self._links]
+        contacts = self.contacts
+        buckets = dict((lid, []) for lid in self._links)
+        for point in contacts:
+            buckets[int(point['lid_self'])].append(
+                dict(uid_other=int(point['uid_other']),
+                     lid_self=int(point['lid_self']),
+                     lid_other=int(point['lid_other']),
+                     pos_self=tuple(point['pos_self']),
+                     pos_other=tuple(point['pos_other']),
+                     normalvec2self=tuple(point['normal']),
+                     distance=float(point['distance']),
+                     force=float(point['force'])))
+        return [buckets[lid] for lid in self._links]
+
+    @property
+    def contacts(self):
+        """
+        Get the contact points from bodies B on all links
+        of this body A, fetched in a single query
+        :return: numpy structured array, one row per point,
+        with fields lid_self, uid_other, lid_other, pos_self,
+        pos_other, normal, distance, force
+        """
+        return self._engine.get_body_contacts(self._uid)
+
+    def in_contact(self, uidB=None, lid=None):
+        """
+        Check if this body is in contact with body B
+        :param uidB: unique id of body B, None for any body
+        :param lid: link index of this body, None for any link
+        :return: boolean
+        """
+        return self._engine.has_body_contact(self._uid, uidB, lid)
+
+    def max_contact_force(self, lid=None, uidB=None):
+        """
+        Get the maximum normal force applied on this body
+        :param lid: link index of this body, None for any link
+        :param uidB: unique id of body B, None for any body
+        :return: float normal force, 0 if not in contact
+        """
+        return self._engine.get_body_max_contact_force(
+            self._uid, lid, uidB)
 
     @property
     def attach_children(self):
@@ -539,6 +600,10 @@ class Body(object):
         for shape marking.
         :return: None
         """
+        # Markers are only drawn in visual frames
+        if not self._engine.visual:
+            return
+
         # Need a few tricks to hack link index for base
         mtype, width, color, lid, time, kwargs = marker_info
 
@@ -567,41 +632,17 @@ class Body(object):
             bottom_right = (center[0] + length,
                             center[1] - length,
                             z)
-            a = self._engine.add_body_line_marker(
-                bottom_left, top_left, color, width,
-                time, None, lid
-            )
-            self._markers[a] = dict(
-                posA=bottom_left, posB=top_left,
-                size=width, color=color, time=time
-            )
-
-            b = self._engine.add_body_line_marker(
-                top_left, top_right, color, width,
-                time, None, lid
-            )
-            self._markers[b] = dict(
-                posA=top_left, posB=top_right,
-                size=width, color=color, time=time
-            )
-
-            c = self._engine.add_body_line_marker(
-                top_right, bottom_right, color, width,
-                time, None, lid
-            )
-            self._markers[c] = dict(
-                posA=top_right, posB=bottom_right,
-                size=width, color=color, time=time
-            )
-
-            d = self._engine.add_body_line_marker(
-                bottom_right, bottom_left, color, width,
-                time, None, lid
-            )
-            self._markers[d] = dict(
-                posA=bottom_right, posB=bottom_left,
-                size=width, color=color, time=time
-            )
+            segments = [(bottom_left, top_left),
+                        (top_left, top_right),
+                        (top_right, bottom_right),
+                        (bottom_right, bottom_left)]
+            mids = self._engine.add_body_line_markers(
+                segments, color, width, time, None, lid)
+            for mid, (pos_a, pos_b) in zip(mids, segments):
+                self._markers[mid] = dict(
+                    posA=pos_a, posB=pos_b,
+                    size=width, color=color, time=time
+                )
 
     @mark.deleter
     def mark(self):
@@ -649,6 +690,32 @@ class Body(object):
         else:
             self.fix = (pos, orn)
 
+    def checkpoint(self):
+        """
+        Get the bookkeeping of this body that is kept
+        outside of the simulation states, e.g. constraints
+        and markers, so that it can be restored together
+        with a saved simulation state.
+        :return: dictionary of bookkeeping records
+        """
+        return dict(children=copy.deepcopy(self._children),
+                    markers=copy.deepcopy(self._markers),
+                    fixed=self._fixed)
+
+    def restore(self, record):
+        """
+        Restore the bookkeeping given by <checkpoint>.
+        Markers added after the checkpoint are removed.
+        :param record: dictionary of bookkeeping records
+        :return: None
+        """
+        for mid in list(self._markers.keys()):
+            if mid not in record['markers']:
+                self._engine.remove_body_text_marker(mid)
+        self._markers = copy.deepcopy(record['markers'])
+        self._children = copy.deepcopy(record['children'])
+        self._fixed = record['fixed']
+
     def remove(self):
         """
         Remove current entity instance from environment
@@ -656,10 +723,43 @@ class Body(object):
         """
         self._engine.delete_body(self._uid)
 
-    def get_neighbors(self, uidB, dist_thresh, lidB=-1):
+    def enable_ft_sensors(self, jids=None):
+        """
+        Opt in force/torque sensing on joints of this body.
+        Readings are collected once per simulation step.
+        :param jids: list of joint indices, None for all joints
+        :return: 0 if success, -1 if failure
+        """
+        jids = list(self._joints) if jids is None else list(jids)
+        return self._engine.enable_joint_sensors(self._uid, jids)
+
+    def disable_ft_sensors(self, jids=None):
+        """
+        Stop force/torque sensing on joints of this body
+        :param jids: list of joint indices, None for all joints
+        :return: None
+        """
+        self._engine.disable_joint_sensors(self._uid, jids)
+
+    def get_ft_readings(self, jids=None, history=1):
+        """
+        Get the latest force/torque sensor readings
+        :param jids: list of sensed joint indices,
+        None for all joints
+        :param history: number of latest steps to get
+        :return: (steps, joints, 6) numpy array of wrenches,
+        oldest step first
+        """
+        jids = list(self._joints) if jids is None else list(jids)
+        return self._engine.get_joint_sensor_readings(
+            self._uid, jids, history)
+
+    def get_neighbors(self, uidB, dist_thresh, lidB=-1, as_array=False):
         """
         Get the closest points of bodies B near this body A,
         within given distance threshold
+        :param as_array: if True, query all links at once and
+        return a numpy structured array with a lid_self column
         :return: a list of lists of dictionaries
         [
             base: [{uid, lid, posA, posB, distance}, {}...],
@@ -667,9 +767,42 @@ class Body(object):
             ...
         ]
         """
+        if as_array:
+            return self._engine.get_body_surroundings(
+                self._uid, None, uidB, lidB, dist_thresh, as_array=True)
         return [self._engine.get_body_surroundings(
             self._uid, lid,
             uidB, lidB, dist_thresh) for lid in self._links]
+
+    def get_nearby(self, dist_thresh, uids=None):
+        """
+        Get the closest points of all bodies near this body,
+        within given distance threshold. Cheaper than querying
+        each body with <get_neighbors>, since far away links
+        are filtered out by their bounding boxes first.
+        :param dist_thresh: float distance threshold
+        :param uids: list of body unique ids to consider,
+        None for all other bodies
+        :return: numpy structured array of points, with
+        lid_self, uid_other, lid_other and distance columns
+        """
+        return self._engine.get_body_proximity(
+            self._uid, dist_thresh,
+            None if uids is None else tuple(sorted(uids)))
+
+    def get_min_distance(self, uidB, dist_thresh, lidB=-1, per_link=False):
+        """
+        Get the minimum distance between this body A and body B,
+        within given distance threshold
+        :param per_link: if True, reduce for each link of this body
+        :return: float distance, None if farther than threshold;
+        or dictionary of {link index: distance} if per_link
+        """
+        points = self.get_neighbors(uidB, dist_thresh, lidB, as_array=True)
+        if per_link:
+            return self._engine.reduce_points_by_link(points, 'distance')
+        closest = self._engine.get_closest_point(points)
+        return None if closest is None else float(closest['distance'])
         
     def apply_force(self, force, pos, ref='abs', lid=-1):
         """
@@ -866,42 +999,16 @@ class Tool(Body):
     @property
     def joint_specs(self):
         """
-        Get joints info of the body.
+        Get joints info of the body. The specs are
+        cached by the engine when the body is loaded.
         :return: a dictionary of lists of
         {name, joint type, pos_idx, vel_idx, damping,
         friction, lower, upper, max_force, max_vel},
         where the keys are info names, and
         values are arranged in link indices order.
+        Numerical specs are read-only numpy arrays.
         """
-        info_dict = dict(
-            index=[],
-            name=[],
-            jtype=[],
-            active=[],
-            pos_idx=[],
-            vel_idx=[],
-            damping=[],
-            friction=[],
-            lower=[],
-            upper=[],
-            max_force=[],
-            max_vel=[]
-        )
-        for jid in self._joints:
-            info = self._engine.get_body_joint_info(self._uid, jid)
-            info_dict['index'].append(info[0])
-            info_dict['name'].append(info[1])
-            info_dict['jtype'].append(info[2])
-            info_dict['pos_idx'].append(info[3])
-            info_dict['vel_idx'].append(info[4])
-            info_dict['active'].append(info[5])
-            info_dict['damping'].append(info[6])
-            info_dict['friction'].append(info[7])
-            info_dict['lower'].append(info[8])
-            info_dict['upper'].append(info[9])
-            info_dict['max_force'].append(info[10])
-            info_dict['max_vel'].append(info[11])
-        return info_dict
+        return self._engine.get_body_joint_specs(self._uid)
 
     @property
     def joint_positions(self):
@@ -911,8 +1018,8 @@ class Tool(Body):
         is ordered by indices from small to large.
         Typically the order goes from base to end effector.
         """
-        return [self._engine.get_body_joint_state(
-            self._uid, jid)[0] for jid in self._joints]
+        return self._engine.get_body_snapshot(
+            [self._uid], {self._uid: ()})[self._uid]['joint_pos'].tolist()
 
     @property
     def joint_velocities(self):
@@ -922,8 +1029,8 @@ class Tool(Body):
         is ordered by indices from small to large.
         Typically the order goes from base to end effector.
         """
-        return [self._engine.get_body_joint_state(
-            self._uid, jid)[1] for jid in self._joints]
+        return self._engine.get_body_snapshot(
+            [self._uid], {self._uid: ()})[self._uid]['joint_vel'].tolist()
 
     @property
     def joint_torques(self):
@@ -935,8 +1042,8 @@ class Tool(Body):
         is ordered by indices from small to large.
         Typically the order goes from base to end effector.
         """
-        return [self._engine.get_body_joint_state(
-            self._uid, jid)[3] for jid in self._joints]
+        return self._engine.get_body_snapshot(
+            [self._uid], {self._uid: ()})[self._uid]['joint_torque'].tolist()
 
     @property
     def joint_wrenches(self):
@@ -948,8 +1055,8 @@ class Tool(Body):
         is ordered by indices from small to large.
         Typically the order goes from base to end effector.
         """
-        return [self._engine.get_body_joint_state(
-            self._uid, jid)[2] for jid in self._joints]
+        return self._engine.get_body_snapshot(
+            [self._uid], {self._uid: ()})[self._uid]['joint_wrench'].tolist()
 
     @Body.name.setter
     def name(self, string):
@@ -1066,11 +1173,30 @@ class Tool(Body):
         torques = value[0] if isinstance(value, tuple) else value
         kwargs = value[1] if isinstance(value, tuple) else {}
         jids = [j for j, val in enumerate(torques) if val is not None]
-        value = [v for v in value if v is not None]
+        value = [v for v in torques if v is not None]
         assert len(value) == len(jids), \
             'Input number of torque values must match the number of joints'
         self._engine.set_body_joint_state(self._uid, jids, value, 'torque', kwargs)
 
+    def checkpoint(self):
+        """
+        Get the bookkeeping of this tool, including
+        the gripper state.
+        :return: dictionary of bookkeeping records
+        """
+        record = super(Tool, self).checkpoint()
+        record['close_grip'] = self._close_grip
+        return record
+
+    def restore(self, record):
+        """
+        Restore the bookkeeping given by <checkpoint>.
+        :param record: dictionary of bookkeeping records
+        :return: None
+        """
+        super(Tool, self).restore(record)
+        self._close_grip = record['close_grip']
+
     def torque_mode(self):
         """
         Prepare the tool for torque mode control,
@@ -28,11 +28,22 @@ class PerlsEnv(gym.Env):
         'video.frames_per_second': 50
     }
 
-    def __init__(self, conf_path, max_step):
+    # Whether actions must be sent again every simulation
+    # step, e.g. bullet clears torques after each step
+    _reapply_action = False
+
+    def __init__(self, conf_path, max_step, action_repeat=None,
+                 start_states=None):
         """
         Initialize the environment
         :param conf_path: the absolute path string to
         the configuration file, default is 'gym-disp.xml'
+        :param action_repeat: number of simulation steps
+        each action is held for, stepped in one engine call.
+        Default aligns one gym step with the control rate.
+        :param start_states: path string of a start state
+        library to sample episode resets from, see
+        scripts/generate_start_states.py
         """
         conf = io_util.parse_config(conf_path)[0]
 
@@ -43,6 +54,12 @@ class PerlsEnv(gym.Env):
         _, self._world, self._display, control = Controller.load_config(conf, None)
 
         self._world.boot(self._display.info['frame'])
+
+        # Episode resets restore from an in-memory
+        # checkpoint after the first settled reset
+        self._world.fast_reset = True
+        if start_states:
+            self._world.load_start_states(start_states)
         self._status = self._display.run(None)
 
         if not self._world.info['engine']['real_time']:
@@ -50,6 +67,8 @@ class PerlsEnv(gym.Env):
             control_rate = control.freq
             self._align_iters = int(control_rate / step_size)
 
+        self._action_repeat = action_repeat or self._align_iters
+
         # Store last action for regularization purposes
         self._action = None
 
@@ -142,6 +161,14 @@ class PerlsEnv(gym.Env):
         self._display.show()
         return self.state
 
+    @property
+    def action_repeat(self):
+        """
+        Number of simulation steps each action is held for
+        :return: integer
+        """
+        return self._action_repeat
+
     def _step(self, action):
         """
         Make one step move in the simulation,
@@ -152,11 +179,15 @@ class PerlsEnv(gym.Env):
         self._action = action
         self._step_count += 1
 
-        # Perform extra steps in simulation to align
-        # with real time
-        for _ in range(self._align_iters):
+        # Apply the action once, then hold it for extra
+        # steps in simulation to align with real time
+        if self._reapply_action:
+            for _ in range(self._action_repeat):
+                self._step_helper(action)
+                self._world.update()
+        else:
             self._step_helper(action)
-            self._world.update()
+            self._world.update(num_steps=self._action_repeat)
 
         return self.state, self.reward, self.done, {'state': self.state}
 
@@ -13,9 +13,11 @@ class PushCube(PerlsEnv):
     """
     Pushing cube to a specific goal on table
     """
-    def __init__(self, conf_path, max_step):
+    def __init__(self, conf_path, max_step, action_repeat=None,
+                 start_states=None):
 
-        super(PushCube, self).__init__(conf_path, max_step)
+        super(PushCube, self).__init__(
+            conf_path, max_step, action_repeat, start_states)
         self._cube = self._world.body['cube_0']
         self._robot = self._world.tool['m0']
         self._table = self._world.body['table_0']
@@ -63,19 +65,37 @@ class PushCube(PerlsEnv):
         )
         return super(PushCube, self)._reset()
 
+    def _snapshot(self, fields):
+        """
+        Get states of the robot and the cube in one pass
+        :param fields: list of field strings, see <World.snapshot>
+        :return: tuple of (robot states, cube states), each a
+        dictionary of {field: array}, joint fields are trimmed
+        to the number of joints
+        """
+        snapshot = self._world.snapshot(
+            fields, [self._robot.name, self._cube.name])
+        states = list()
+        for name in (self._robot.name, self._cube.name):
+            row = snapshot['index'][name]
+            num_joints = snapshot['num_joints'][row]
+            states.append(dict(
+                (field, snapshot[field][row][:num_joints]
+                 if field.startswith('joint_') else snapshot[field][row])
+                for field in fields))
+        return tuple(states)
+
     @property
     def state(self):
         cube_pos, cube_orn = self._cube.get_pose(self._robot.uid, 0)
         goal_pos = self._world.get_task_state()['goal']
 
-        eef_pos, _ = math_util.get_relative_pose(
-            self._robot.eef_pose, self._robot.pose)
-
-        cube_vel = self._cube.v
+        robot, cube = self._snapshot(
+            ['joint_positions', 'joint_velocities', 'v'])
 
-        return math_util.concat((self._robot.joint_positions,
-                                 self._robot.joint_velocities,
-                                 cube_pos, cube_orn, cube_vel,
+        return math_util.concat((robot['joint_positions'],
+                                 robot['joint_velocities'],
+                                 cube_pos, cube_orn, cube['v'],
                                  math_util.vec(goal_pos) - math_util.vec(cube_pos)))
 
         # return math_util.concat((self._robot.joint_positions,
@@ -8,9 +8,11 @@ class PushCubePose(PushCube):
     """
     Pushing cube across the table
     """
-    def __init__(self, conf_path, max_step):
+    def __init__(self, conf_path, max_step, action_repeat=None,
+                 start_states=None):
 
-        super(PushCubePose, self).__init__(conf_path, max_step)
+        super(PushCubePose, self).__init__(
+            conf_path, max_step, action_repeat, start_states)
         self._action = math_util.zero_vec(3)
 
     @property
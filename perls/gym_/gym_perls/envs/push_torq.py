@@ -8,9 +8,13 @@ class PushCubeTorque(PushCube):
     """
     Pushing cube across the table
     """
-    def __init__(self, conf_path, max_step):
+    _reapply_action = True
 
-        super(PushCubeTorque, self).__init__(conf_path, max_step)
+    def __init__(self, conf_path, max_step, action_repeat=None,
+                 start_states=None):
+
+        super(PushCubeTorque, self).__init__(
+            conf_path, max_step, action_repeat, start_states)
 
     @property
     def observation_space(self):
@@ -70,10 +74,11 @@ class PushCubeTorque(PushCube):
 
         eef_pos, _ = math_util.get_relative_pose(
             self._robot.eef_pose, self._robot.pose)
-        
+        robot, _ = self._snapshot(['joint_positions', 'joint_velocities'])
+
         return math_util.concat((
-            self._robot.joint_positions,
-            self._robot.joint_velocities,
+            robot['joint_positions'],
+            robot['joint_velocities'],
             cube_pos, cube_orn, goal_pos,
             math_util.vec(cube_pos) - math_util.vec(eef_pos),
             math_util.vec(goal_pos) - math_util.vec(cube_pos)))
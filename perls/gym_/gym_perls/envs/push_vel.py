@@ -8,9 +8,11 @@ class PushCubeVel(PushCube):
     """
     Pushing cube across the table
     """
-    def __init__(self, conf_path, max_step):
+    def __init__(self, conf_path, max_step, action_repeat=None,
+                 start_states=None):
 
-        super(PushCubeVel, self).__init__(conf_path, max_step)
+        super(PushCubeVel, self).__init__(
+            conf_path, max_step, action_repeat, start_states)
 
     @property
     def observation_space(self):
@@ -8,9 +8,11 @@ class PushViz(PushCube):
     """
     Pushing cube across the table
     """
-    def __init__(self, conf_path, max_step):
+    def __init__(self, conf_path, max_step, action_repeat=None,
+                 start_states=None):
 
-        super(PushViz, self).__init__(conf_path, max_step)
+        super(PushViz, self).__init__(
+            conf_path, max_step, action_repeat, start_states)
 
     @property
     def observation_space(self):
@@ -56,7 +58,8 @@ class PushViz(PushCube):
     @property
     def state(self):
         goal_pos = self._world.get_task_state()['goal']
-        aux = math_util.concat((self._robot.joint_positions,
-                               self._robot.joint_velocities,
+        robot, _ = self._snapshot(['joint_positions', 'joint_velocities'])
+        aux = math_util.concat((robot['joint_positions'],
+                               robot['joint_velocities'],
                                goal_pos))
         return self._display.get_camera_image('rgbd'), aux
@@ -8,8 +8,10 @@ class PushVizVel(PushViz):
     """
     Pushing cube across the table
     """
-    def __init__(self, conf_path, max_step):
-        super(PushVizVel, self).__init__(conf_path, max_step)
+    def __init__(self, conf_path, max_step, action_repeat=None,
+                 start_states=None):
+        super(PushVizVel, self).__init__(
+            conf_path, max_step, action_repeat, start_states)
 
     @property
     def action_space(self):
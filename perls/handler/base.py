@@ -7,11 +7,11 @@ class ControlHandler(object):
     """
     Base class for control interrupt handling
     """
-    def __init__(self, ps_id, queue, sensitivity, rate):
+    def __init__(self, ps_id, channel, sensitivity, rate):
         # self._id = ps_id
         self._sens = sensitivity
         self._rate = rate
-        self._handler = Timer(1. / rate, self.interrupt, None, queue)
+        self._handler = Timer(1. / rate, self.interrupt, None, channel)
 
     @property
     def freq(self):
@@ -25,7 +25,7 @@ class ControlHandler(object):
         self._handler.start()
 
     @abc.abstractmethod
-    def interrupt(self, queue):
+    def interrupt(self, channel):
         return NotImplemented
 
     def pause(self):
@@ -42,10 +42,10 @@ class NullHandler(ControlHandler):
     """
     Singleton placeholder
     """
-    def __init__(self, ps_id, queue, sensitivity, rate):
+    def __init__(self, ps_id, channel, sensitivity, rate):
         super(NullHandler, self).__init__(0, None, 0, rate)
 
-    def interrupt(self, queue):
+    def interrupt(self, channel):
         return NotImplemented
 
     def stop(self):
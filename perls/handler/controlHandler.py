@@ -29,15 +29,15 @@ class CmdEventHandler(ControlHandler):
     For algorithmic learning usage, such as
     passing commands into gym_ environment.
     """
-    def __init__(self, ps_id, queue, sensitivity=1, rate=100):
+    def __init__(self, ps_id, channel, sensitivity=1, rate=100):
         super(CmdEventHandler, self).__init__(
-            ps_id, queue, sensitivity, rate)
+            ps_id, channel, sensitivity, rate)
 
     @property
     def name(self):
         return 'CmdControl'
 
-    def interrupt(self, queue):
+    def interrupt(self, channel):
         # TODO
         pass
 
@@ -49,15 +49,15 @@ class KeyboardEventHandler(ControlHandler):
     """
     Handler for keyboard events/signal
     """
-    def __init__(self, ps_id, queue, sensitivity=1, rate=100):
-        super(KeyboardEventHandler, self).__init__(ps_id, queue, sensitivity, rate)
+    def __init__(self, ps_id, channel, sensitivity=1, rate=100):
+        super(KeyboardEventHandler, self).__init__(ps_id, channel, sensitivity, rate)
         self._client_key = p.connect(3, key=12348)
 
     @property
     def name(self):
         return 'KeyboardControl'
 
-    def interrupt(self, queue):
+    def interrupt(self, channel):
 
         signal = dict()
         signal['tid'] = 0
@@ -117,22 +117,18 @@ class KeyboardEventHandler(ControlHandler):
         signal['instruction'] = ins
         # return signal
 
-        if queue.full():
-            # Force poll, then set back in
-            queue.get_nowait()
-        
-        queue.put_nowait(signal)
+        channel.put(signal)
 
 
 class ViveEventHandler(ControlHandler):
     """
     Handles VR controller events/signal
     """
-    def __init__(self, ps_id, queue, sensitivity=1, rate=100):
+    def __init__(self, ps_id, channel, sensitivity=1, rate=100):
         """
         Initialize vive event handler with given rate
         """
-        super(ViveEventHandler, self).__init__(ps_id, queue, sensitivity, rate)
+        super(ViveEventHandler, self).__init__(ps_id, channel, sensitivity, rate)
 
         # Initialize positions
         self._controllers = dict()
@@ -144,7 +140,7 @@ class ViveEventHandler(ControlHandler):
     def name(self):
         return 'VRControl'
 
-    def interrupt(self, queue):
+    def interrupt(self, channel):
 
         signal = dict()
         signal['cmd'] = list()
@@ -187,11 +183,7 @@ class ViveEventHandler(ControlHandler):
 
         signal['instruction'] = ins
 
-        if queue.full():
-            # Force poll, then set back in
-            queue.get_nowait()
-
-        queue.put_nowait(signal)
+        channel.put(signal)
 
     def _register(self):
         """
@@ -211,9 +203,9 @@ class AppEventHandler(ControlHandler):
     Handler for keyboard events/signal
     """
 
-    def __init__(self, ps_id, queue, sensitivity=1, 
+    def __init__(self, ps_id, channel, sensitivity=1, 
                  rate=100, channel_name='ios_channel'):
-        super(AppEventHandler, self).__init__(ps_id, queue, sensitivity, rate)
+        super(AppEventHandler, self).__init__(ps_id, channel, sensitivity, rate)
         self._comm = network.RedisComm('localhost', port=6379, db=0)
         self._channel_name = channel_name
         self._comm.connect_to_channel(channel_name)
@@ -222,7 +214,7 @@ class AppEventHandler(ControlHandler):
     def name(self):
         return 'PhoneControl'
 
-    def interrupt(self, queue):
+    def interrupt(self, channel):
 
         signal = {}
         signal['cmd'] = list()
@@ -252,11 +244,7 @@ class AppEventHandler(ControlHandler):
 
         signal['instruction'] = ins
 
-        if queue.full():
-            # Force poll, then set back in
-            queue.get_nowait()
-
-        queue.put_nowait(signal)
+        channel.put(signal)
 
     def stop(self):
         self._comm.disconnect()
@@ -27,6 +27,7 @@ class Checker(object):
         self._name = env_name
         self._states = dict()
         self._job = 'run'
+        self._random_start = False
 
         log_path = pjoin(
             __file__, 
@@ -52,6 +53,16 @@ class Checker(object):
         """
         return self._states
 
+    @state.setter
+    def state(self, states):
+        """
+        Set task checker states, e.g. when restoring
+        from a world checkpoint
+        :param states: dictionary of states
+        :return: None
+        """
+        self._states = states
+
     def set_job(self, job):
         """
         Tell task checker what's the current run's job
@@ -61,6 +72,16 @@ class Checker(object):
         """
         self._job = job
 
+    def set_random_start(self, random_start):
+        """
+        Tell task checker whether to randomize the task
+        setup, e.g. object placement and goal, drawn from
+        numpy random state on each initialization
+        :param random_start: boolean
+        :return: None
+        """
+        self._random_start = random_start
+
     def initialize(self, world):
         """
         Customize world for some fine tunings that
@@ -92,18 +113,23 @@ class Checker(object):
             # table.set_texture(
             #     -1, 'table', pjoin(__file__, '../../asset/table.png'))
 
-            # Random goal
-            # box_center = math_util.rand_vec(
-            #     3, (cube.pos[0] + 0.25, cube.pos[1] - 0.25, 0.641),
-            #     (cube.pos[0] + 0.45, cube.pos[1] + 0.25, 0.642),
-            #     'uniform')
+            if self._random_start:
+                # Random cube placement on the table
+                cube.pos = cube.pos + math_util.rand_vec(
+                    3, (-0.05, -0.05, 0.), (0.05, 0.05, 0.), 'uniform')
 
-            # Fixed goal
-            # box_center = math_util.vec((
-            #     cube.pos[0] + 0.33, cube.pos[1] - 0.23, 0.641))
+                # Random goal
+                box_center = math_util.rand_vec(
+                    3, (cube.pos[0] + 0.25, cube.pos[1] - 0.25, 0.641),
+                    (cube.pos[0] + 0.45, cube.pos[1] + 0.25, 0.642),
+                    'uniform')
+            else:
+                # Fixed goal
+                # box_center = math_util.vec((
+                #     cube.pos[0] + 0.33, cube.pos[1] - 0.23, 0.641))
 
-            # To prevent cube pose from last demo affects this one..
-            box_center = math_util.vec((0.63, -0.43, 0.641))
+                # To prevent cube pose from last demo affects this one..
+                box_center = math_util.vec((0.63, -0.43, 0.641))
 
             robot_pose = world.body['titan_0'].pose
             goal_pos, _ = math_util.get_relative_pose(
@@ -177,10 +203,8 @@ class Checker(object):
                 return True, False
 
             # If collided with table, fail
-            for points in world.body['table_0'].contact:
-                for point in points:
-                    if point['uid_other'] < 2:
-                        return True, False
+            if (world.body['table_0'].contacts['uid_other'] < 2).any():
+                return True, False
 
             # If gripper too far away from the cube, fail
             tool_pos = world.body['titan_0'].tool_pos
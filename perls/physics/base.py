@@ -37,6 +37,14 @@ class StateEngine(object):
         """
         return NotImplemented
 
+    @property
+    def visual(self):
+        """
+        Check if the render is shown in a visual frame
+        :return: boolean
+        """
+        return self.info.get('visual', False)
+
     @property
     def error(self):
         """
@@ -146,6 +154,29 @@ class StateEngine(object):
         """
         return NotImplemented
 
+    @abc.abstractmethod
+    def get_body_snapshot(self, uids, lids=None):
+        """
+        Get the whole body states of given bodies in one pass.
+        States are written into buffers preallocated per body,
+        and reused until the simulation state changes.
+        Note the returned arrays are overwritten by later
+        calls, copy them if they need to be kept.
+        :param uids: list of integer body unique ids
+        :param lids: dictionary where keys are body uids, values
+        are lists of link indices to fetch link states for.
+        Bodies not listed get states of all links.
+        :return: dictionary where keys are body uids, values are
+        dictionaries of numpy arrays
+        {pos, orn, v, omega,
+         joint_pos, joint_vel, joint_wrench, joint_torque,
+         link_pos, link_orn, link_rel_pos, link_rel_orn,
+         link_frame_pos, link_frame_orn, link_v, link_omega},
+        where joint/link arrays are arranged in joint indices
+        order, and only rows of fetched links are valid.
+        """
+        return NotImplemented
+
     @abc.abstractmethod
     def set_body_scene_pose(self, uid, pos, orn):
         """
@@ -325,6 +356,21 @@ class StateEngine(object):
         """
         return NotImplemented
 
+    @abc.abstractmethod
+    def get_body_joint_specs(self, uid):
+        """
+        Get the static specs of all joints on body. Specs
+        are cached when the body is loaded, and served
+        without querying the engine again.
+        :param uid: integer unique body id
+        :return: a dictionary of
+        {index, name, jtype, pos_idx, vel_idx, active,
+        damping, friction, lower, upper, max_force, max_vel},
+        where values are arranged in joint indices order.
+        Numerical values are read-only numpy arrays.
+        """
+        return NotImplemented
+
     @abc.abstractmethod
     def get_body_joint_state(self, uid, jid):
         """
@@ -334,11 +380,47 @@ class StateEngine(object):
         :return: a tuple of
         joint position float (radian),
         joint velocity float (rad/s),
-        wrench on joint (vec6 float, force3 + torque3),
+        wrench on joint (vec6 float, force3 + torque3, zeros
+        unless the joint sensor is enabled),
         applied motor torque on joint float.
         """
         return NotImplemented
 
+    @abc.abstractmethod
+    def enable_joint_sensors(self, uid, jids):
+        """
+        Register joint force/torque sensors. Registered sensors
+        are read once per simulation step into a ring buffer.
+        :param uid: integer body unique id
+        :param jids: list of integer joint indices
+        :return: 0 if success, -1 if failure
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def disable_joint_sensors(self, uid, jids=None):
+        """
+        Unregister joint force/torque sensors
+        :param uid: integer body unique id
+        :param jids: list of integer joint indices,
+        None for all joints of the body
+        :return: None
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def get_joint_sensor_readings(self, uid, jids, history=1):
+        """
+        Get the buffered readings of registered sensors
+        :param uid: integer body unique id
+        :param jids: list of integer joint indices
+        :param history: number of latest steps to get
+        :return: (steps, len(jids), 6) numpy array of wrenches
+        (force3 + torque3), oldest step first, at most <history>
+        steps; None if any sensor is not registered
+        """
+        return NotImplemented
+
     @abc.abstractmethod
     def set_body_joint_state(self, uid, jids, vals, ctype, kwargs):
         """
@@ -380,6 +462,24 @@ class StateEngine(object):
         """
         return NotImplemented
 
+    @abc.abstractmethod
+    def get_body_operational_model(self, uid, lid, local_pos=(0., 0., 0.)):
+        """
+        Get the rigid body dynamics model of body at current
+        joint states, used for operational space control.
+        Only movable joints are included.
+        :param uid: integer body unique id
+        :param lid: integer link index of the operational point
+        :param local_pos: position of the operational point
+        in the link center of mass frame, vec3 float
+        :return: tuple (joint indices list,
+        (6, N) jacobian with linear rows on top,
+        (N, N) joint space mass matrix,
+        (N,) coriolis and gravity torques,
+        (N,) joint positions, (N,) joint velocities)
+        """
+        return NotImplemented
+
     @abc.abstractmethod
     def get_body_dynamics(self, uid, lid):
         """
@@ -419,11 +519,24 @@ class StateEngine(object):
         return NotImplemented
 
     @abc.abstractmethod
-    def get_body_contact_info(self, uid, lid):
+    def get_body_bounding_boxes(self, uid):
+        """
+        Get the bounding boxes of all links of given body
+        :param uid: integer body unique id
+        :return: (links + 1, 2, 3) numpy array of minimum and
+        maximum corners w.r.t. world frame, where the first
+        row is the base
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def get_body_contact_info(self, uid, lid, as_array=False):
         """
         Get the contacts information on given body link
         :param uid: integer body unique id
         :param lid: integer link index of body
+        :param as_array: if True, return a numpy structured
+        array as given by <get_body_contacts> instead
         :return: a list of dictionaries of all
         contact bodies, where dictionary is
         uid=integer unique id of another body,
@@ -440,15 +553,61 @@ class StateEngine(object):
         return NotImplemented
 
     @abc.abstractmethod
-    def get_body_surroundings(self, uidA, lidA, uidB, lidB, dist):
+    def get_body_contacts(self, uid, uid_other=None, lid_other=None):
+        """
+        Get the contacts on all links of given body in one query.
+        :param uid: integer body unique id
+        :param uid_other: integer unique id of another body, if
+        given only contacts between the two bodies are returned
+        :param lid_other: integer link index of another body,
+        only used when uid_other is given
+        :return: numpy structured array, one row per contact
+        point, with fields lid_self (link index of given body),
+        uid_other, lid_other, pos_self, pos_other,
+        normal (pointing to given body), distance, force.
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def has_body_contact(self, uid, uid_other=None, lid=None):
+        """
+        Check if given body is in contact
+        :param uid: integer body unique id
+        :param uid_other: integer unique id of another body,
+        None for any body
+        :param lid: integer link index of given body,
+        None for any link
+        :return: boolean
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def get_body_max_contact_force(self, uid, lid=None, uid_other=None):
+        """
+        Get the maximum normal force among the contacts of given body
+        :param uid: integer body unique id
+        :param lid: integer link index of given body,
+        None for any link
+        :param uid_other: integer unique id of another body,
+        None for any body
+        :return: float normal force, 0 if there is no contact
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def get_body_surroundings(self, uidA, lidA, uidB, lidB, dist,
+                              as_array=False):
         """
         Get the neighbors of given body and link
         :param uidA: integer body A unique id
-        :param lidA: integer link index of body A
+        :param lidA: integer link index of body A, None for all links
         :param uidB: integer body B unique id
-        :param lidB: integer link index of body B
+        :param lidB: integer link index of body B, None for all links
         :param dist: examination distance threshold, bodies farther
         than this distance will not be examined
+        :param as_array: if True, return a numpy structured
+        array as given by <get_body_contacts> instead, where
+        force is always 0
         :return: a list of dictionaries of all nearby bodies,
         where the dictionary is
         uid=neighbor body unique id integer,
@@ -461,6 +620,34 @@ class StateEngine(object):
         """
         return NotImplemented
 
+    @abc.abstractmethod
+    def get_body_proximity(self, uid, dist, uids_other=None):
+        """
+        Get the closest points of all bodies near given body.
+        Candidate links are first found by overlapping bounding
+        boxes, and only those are queried for closest points.
+        :param uid: integer body unique id
+        :param dist: float distance threshold
+        :param uids_other: tuple of body unique ids to consider,
+        None for all other bodies
+        :return: numpy structured array as given by
+        <get_body_contacts>, where force is always 0
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def get_proximity(self, uids, dist, uids_other=None):
+        """
+        Get the closest points near each of given bodies
+        :param uids: list of integer body unique ids
+        :param dist: float distance threshold
+        :param uids_other: list of body unique ids to consider,
+        None for all other bodies
+        :return: dictionary of {uid: structured array}, as
+        given by <get_body_proximity>
+        """
+        return NotImplemented
+
     @abc.abstractmethod
     def add_body_line_marker(self, posA, posB, color, width,
                              time, uid, lid):
@@ -479,6 +666,22 @@ class StateEngine(object):
         """
         return NotImplemented
 
+    @abc.abstractmethod
+    def add_body_line_markers(self, segments, color, width,
+                              time, uid, lid):
+        """
+        Mark a batch of line segments on given body
+        :param segments: list of (posA, posB) tuples of line
+        segment ends, vec3 float cartesian world frame
+        :param color: vec3 float RGB in [0,1]
+        :param width: float width of lines
+        :param time: float life time of lines in seconds
+        :param uid: integer body unique id
+        :param lid: integer link index of body
+        :return: list of integer line mark ids
+        """
+        return NotImplemented
+
     @abc.abstractmethod
     def add_body_text_marker(self, text, pos, font_size, color,
                              uid, lid, time):
@@ -647,6 +850,72 @@ class StateEngine(object):
         """
         return NotImplemented
 
+    @abc.abstractmethod
+    def save_state(self):
+        """
+        Save the current simulation state in memory, including
+        body states, constraint parameters and motor commands.
+        :return: state token to restore from
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def restore_state(self, token):
+        """
+        Restore the simulation to a saved state. The set of
+        bodies and constraints must be the same as when saved.
+        :param token: state token given by <save_state>
+        :return: 0 if success, -1 if failed
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def export_state(self, uids):
+        """
+        Export the state of given bodies as plain arrays, which
+        unlike <save_state> can be stored on disk and imported
+        into another engine with the same scene loaded.
+        :param uids: list of integer body unique ids
+        :return: dictionary of numpy arrays
+        {base: (B, 13) position, orientation, linear and angular
+        velocity, joints: (B, J, 2) joint positions and
+        velocities, motors: (B, J, 3) motor control type code,
+        target and force, constraints: (C, 9) constraint id,
+        child pivot, child frame orientation and max force},
+        where missing joints and motor values are NaN
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def import_state(self, uids, state):
+        """
+        Set the state of given bodies from exported arrays
+        :param uids: list of integer body unique ids, in the
+        same order as exported
+        :param state: dictionary given by <export_state>
+        :return: 0 if success, -1 if failed
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def step_n(self, num_steps, callback=None,
+               callback_every=0, use_substeps=False):
+        """
+        Simulate for given number of steps with a single
+        call, applying whatever commands were last set.
+        Only available for asynchronous simulation.
+        :param num_steps: integer number of steps to advance
+        :param callback: function called as callback(engine, steps)
+        with steps advanced so far, every callback_every steps
+        :param callback_every: integer interval of callback, 0 for
+        calling only once all steps are done
+        :param use_substeps: boolean, if True each chunk between
+        callbacks is advanced by the engine as internal substeps
+        of one simulation call
+        :return: True if running time is up, False otherwise
+        """
+        return NotImplemented
+
     @abc.abstractmethod
     def stop(self):
         """
@@ -1,10 +1,18 @@
 #!/usr/bin/env/ python
 
 import numpy as np
+import collections
+import copy
+import functools
+import hashlib
 import logging
+import os
+import pickle
 
 import os.path as osp
 import pybullet as p
+from multiprocessing.pool import ThreadPool
+from xml.etree import ElementTree
 
 from .stateEngine import FakeStateEngine
 from ..utils import math_util
@@ -18,10 +26,311 @@ __version__ = '0.1'
 logging.setLoggerClass(PerlsLogger)
 
 
+def _freeze(value):
+    """
+    Convert query arguments to hashable values
+    :param value: argument, e.g. list of uids or array
+    :return: hashable value
+    """
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return tuple(_freeze(v) for v in value)
+    elif isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    elif isinstance(value, set):
+        return frozenset(_freeze(v) for v in value)
+    return value
+
+
+def _step_memoized(method):
+    """
+    Decorator of state queries on the physics engine. When
+    memoization is enabled, results are reused until the
+    simulation state changes (step, hold, reset or set_*).
+    :param method: engine query method
+    :return: wrapped method
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def _wrapper(self, *args, **kwargs):
+        memo = self._memo
+        # Real time simulation moves on by itself
+        if memo is None or self._real_time:
+            return method(self, *args, **kwargs)
+
+        if self._memo_tick != self._state_tick:
+            memo.clear()
+            self._memo_tick = self._state_tick
+
+        key = (name, _freeze(args), _freeze(kwargs))
+        stats = self._memo_stats.setdefault(name, dict(hits=0, misses=0))
+        if key in memo:
+            stats['hits'] += 1
+        else:
+            stats['misses'] += 1
+            memo[key] = method(self, *args, **kwargs)
+
+        # Hand out copies so that callers cannot
+        # modify the memoized values in place
+        result = memo[key]
+        if isinstance(result, np.ndarray):
+            return result.copy()
+        elif isinstance(result, (tuple, list, dict)):
+            return copy.deepcopy(result)
+        return result
+
+    return _wrapper
+
+
 class MujocoEngine(FakeStateEngine):
     pass
 
 
+class KinematicEngine(FakeStateEngine):
+    """
+    Kinematics only engine without any physics server.
+    URDF files are parsed once on load, and forward kinematics
+    is computed in numpy over batches of joint configurations,
+    e.g. for replaying and postprocessing demonstrations.
+    """
+
+    _MOVABLE_TYPES = ('revolute', 'continuous', 'prismatic')
+
+    def __init__(self, e_id=0, max_run_time=0):
+        """
+        Initialize the kinematic engine.
+        :param e_id: integer, engine id label
+        :param max_run_time: unused, kept for interface
+        """
+        super(KinematicEngine, self).__init__(e_id, max_run_time, True, 0.)
+        self._data_path = pjoin(osp.dirname(__file__), '../data')
+        self._models = list()
+
+    @property
+    def version(self):
+        return 'perls version {}, numpy kinematics'.format(__version__)
+
+    @property
+    def info(self):
+        return dict(
+            name='NumPy Kinematic Engine',
+            status=self.status,
+            real_time=False,
+            id=self.engine_id,
+            max_run_time=self._max_run_time,
+            visual=False
+        )
+
+    @staticmethod
+    def _origin(elem):
+        """
+        Get the homogeneous transform of an urdf <origin> element
+        :param elem: parent element of <origin>
+        :return: 4x4 float64 matrix
+        """
+        mat = np.identity(4)
+        origin = elem.find('origin') if elem is not None else None
+        if origin is not None:
+            xyz = [float(x) for x in origin.attrib.get('xyz', '0 0 0').split()]
+            rpy = [float(x) for x in origin.attrib.get('rpy', '0 0 0').split()]
+            mat[:3, :3] = math_util.euler2mat(rpy, 'sxyz')
+            mat[:3, 3] = xyz
+        return mat
+
+    def _parse_urdf(self, file_path):
+        """
+        Parse the kinematic tree of an urdf file. Joints are
+        indexed in depth first order as bullet does.
+        :param file_path: absolute path string of urdf
+        :return: dictionary of model description
+        """
+        root = ElementTree.parse(file_path).getroot()
+        links = dict((link.attrib['name'], link)
+                     for link in root.findall('link'))
+        children = collections.defaultdict(list)
+        child_links = set()
+        for joint in root.findall('joint'):
+            children[joint.find('parent').attrib['link']].append(joint)
+            child_links.add(joint.find('child').attrib['link'])
+        base = [link.attrib['name'] for link in root.findall('link')
+                if link.attrib['name'] not in child_links][0]
+
+        model = dict(name=root.attrib.get('name', ''),
+                     link_names=[base], joint_names=[], jtype=[],
+                     parent=[], origin=[], axis=[], q_idx=[],
+                     inertial=[self._origin(links[base].find('inertial'))])
+
+        def _visit(link_name, parent):
+            for joint in children[link_name]:
+                jtype = joint.attrib['type']
+                child = joint.find('child').attrib['link']
+                axis = joint.find('axis')
+                axis = np.array([float(x) for x in axis.attrib['xyz'].split()]
+                                if axis is not None else (1., 0., 0.))
+
+                model['joint_names'].append(joint.attrib['name'])
+                model['link_names'].append(child)
+                model['jtype'].append(jtype)
+                model['parent'].append(parent)
+                model['origin'].append(self._origin(joint))
+                model['axis'].append(axis / np.linalg.norm(axis))
+                model['q_idx'].append(
+                    sum(q > -1 for q in model['q_idx'])
+                    if jtype in self._MOVABLE_TYPES else -1)
+                model['inertial'].append(
+                    self._origin(links[child].find('inertial')))
+                _visit(child, len(model['joint_names']) - 1)
+
+        _visit(base, -1)
+        model['dof'] = sum(q > -1 for q in model['q_idx'])
+        model['inertial'] = np.array(model['inertial'])
+        return model
+
+    def load_asset(self, file_path, pos, orn, fixed):
+        if not osp.isfile(file_path):
+            file_path = pjoin(self._data_path, file_path)
+        if osp.splitext(file_path)[1] != '.urdf':
+            logging.error('Kinematic engine only supports urdf files.')
+            return None
+        model = self._parse_urdf(file_path)
+        model['pose'] = (math_util.vec(pos), math_util.vec(orn))
+
+        uid = len(self._models)
+        self._models.append(model)
+        joints = list(range(len(model['joint_names'])))
+        return uid, [-1] + joints, joints
+
+    def get_body_name(self, uid):
+        return self._models[uid]['name']
+
+    def get_link_name(self, uid, lid):
+        return self._models[uid]['link_names'][lid + 1]
+
+    def get_body_scene_position(self, uid):
+        return self._models[uid]['pose'][0]
+
+    def get_body_scene_orientation(self, uid, otype='quat'):
+        orn = self._models[uid]['pose'][1]
+        return math_util.quat2euler(orn) if otype == 'euler' else orn
+
+    def set_body_scene_pose(self, uid, pos, orn):
+        self._models[uid]['pose'] = (math_util.vec(pos), math_util.vec(orn))
+
+    def forward_kinematics(self, uid, joint_positions,
+                           frame='link', ref_lid=None):
+        """
+        Compute the poses of all links for a batch of joint
+        configurations of given body.
+        :param uid: integer body unique id
+        :param joint_positions: (N, dof) array of positions
+        of movable joints, in joint index order. Missing
+        trailing joints are taken at zero, e.g. when logs
+        only record the first few joints
+        :param frame: 'link' for urdf link frames, 'com'
+        for inertial frames as bullet reports link positions
+        :param ref_lid: link index whose link frame the poses are
+        expressed in, None for world frame
+        :return: (N, links, 7) float64 array of poses
+        [x, y, z, qx, qy, qz, qw], base first
+        """
+        model = self._models[uid]
+        q = np.atleast_2d(np.asarray(joint_positions, dtype=np.float64))
+        if q.shape[1] > model['dof']:
+            logging.error('Expect at most {} joint positions, got {}.'.
+                          format(model['dof'], q.shape[1]))
+            return None
+        elif q.shape[1] < model['dof']:
+            q = np.pad(q, ((0, 0), (0, model['dof'] - q.shape[1])),
+                       'constant')
+
+        # Scene pose is the base inertial frame, as in bullet
+        base = np.array(math_util.pose2mat(model['pose']), dtype=np.float64)
+        base = base.dot(np.linalg.inv(model['inertial'][0]))
+
+        frames = np.empty((len(q), len(model['link_names']), 4, 4))
+        frames[:, 0] = base
+        for jid, jtype in enumerate(model['jtype']):
+            mat = frames[:, model['parent'][jid] + 1].dot(model['origin'][jid])
+            qid = model['q_idx'][jid]
+            if qid > -1:
+                motion = np.tile(np.identity(4), (len(q), 1, 1))
+                axis = model['axis'][jid]
+                if jtype == 'prismatic':
+                    motion[:, :3, 3] = q[:, qid, None] * axis
+                else:
+                    # Rodrigues rotation about joint axis
+                    skew = np.array([[0., -axis[2], axis[1]],
+                                     [axis[2], 0., -axis[0]],
+                                     [-axis[1], axis[0], 0.]])
+                    sin = np.sin(q[:, qid])[:, None, None]
+                    cos = np.cos(q[:, qid])[:, None, None]
+                    motion[:, :3, :3] = np.identity(3) + sin * skew + \
+                        (1. - cos) * skew.dot(skew)
+                mat = np.matmul(mat, motion)
+            frames[:, jid + 1] = mat
+
+        if ref_lid is not None:
+            ref = np.linalg.inv(frames[:, ref_lid + 1])
+            frames = np.matmul(ref[:, None], frames)
+        if frame == 'com':
+            frames = np.matmul(frames, model['inertial'])
+
+        orn = self._mat2quat(frames[..., :3, :3])
+        return np.concatenate([frames[..., :3, 3], orn], axis=-1)
+
+    @staticmethod
+    def _mat2quat(rot):
+        """
+        Convert a batch of rotation matrices to quaternions,
+        branching on the largest component for stability
+        :param rot: (..., 3, 3) rotation matrices
+        :return: (..., 4) [x, y, z, w] quaternions
+        """
+        r = lambda i, j: rot[..., i, j]
+        trace = r(0, 0) + r(1, 1) + r(2, 2)
+        # Four times the largest of |w|, |x|, |y|, |z| in each case
+        d = 2. * np.sqrt(np.maximum(np.stack([
+            1. + trace,
+            1. + r(0, 0) - r(1, 1) - r(2, 2),
+            1. - r(0, 0) + r(1, 1) - r(2, 2),
+            1. - r(0, 0) - r(1, 1) + r(2, 2)], axis=-1), 1e-12))
+        cases = np.stack([
+            np.stack([(r(2, 1) - r(1, 2)) / d[..., 0],
+                      (r(0, 2) - r(2, 0)) / d[..., 0],
+                      (r(1, 0) - r(0, 1)) / d[..., 0],
+                      .25 * d[..., 0]], axis=-1),
+            np.stack([.25 * d[..., 1],
+                      (r(0, 1) + r(1, 0)) / d[..., 1],
+                      (r(0, 2) + r(2, 0)) / d[..., 1],
+                      (r(2, 1) - r(1, 2)) / d[..., 1]], axis=-1),
+            np.stack([(r(0, 1) + r(1, 0)) / d[..., 2],
+                      .25 * d[..., 2],
+                      (r(1, 2) + r(2, 1)) / d[..., 2],
+                      (r(0, 2) - r(2, 0)) / d[..., 2]], axis=-1),
+            np.stack([(r(0, 2) + r(2, 0)) / d[..., 3],
+                      (r(1, 2) + r(2, 1)) / d[..., 3],
+                      .25 * d[..., 3],
+                      (r(1, 0) - r(0, 1)) / d[..., 3]], axis=-1)],
+            axis=-2)
+        best = np.argmax(d, axis=-1)[..., None, None]
+        quat = np.take_along_axis(cases, best, axis=-2)[..., 0, :]
+        return quat / np.linalg.norm(quat, axis=-1, keepdims=True)
+
+    def start_engine(self, frame):
+        self.status = self._STATUS[0]
+        return 0
+
+    def hold(self, max_steps=30):
+        pass
+
+    def step(self, elapsed_time, step_size):
+        return False
+
+    def stop(self):
+        self._models = list()
+        self.status = 'finished'
+
+
 class BulletPhysicsEngine(FakeStateEngine):
     """
     Bullet Physics simulation engine.
@@ -45,8 +354,47 @@ class BulletPhysicsEngine(FakeStateEngine):
         sphere=2, box=3, cylinder=4, mesh=5,
         plane=6, capsule=7)
 
+    # Named solver settings, from fastest to most accurate.
+    # Entries can be overridden individually in config xml
+    SOLVER_PRESETS = {
+        'fast-training': dict(
+            num_solver_iterations=10,
+            num_substeps=0,
+            contact_breaking_threshold=0.02,
+            enable_cone_friction=False,
+            deterministic_overlapping_pairs=False),
+        'high-fidelity-demo': dict(
+            num_solver_iterations=150,
+            num_substeps=4,
+            contact_breaking_threshold=0.001,
+            enable_cone_friction=True,
+            deterministic_overlapping_pairs=True,
+            collision_margin=0.001)
+    }
+
+    # Mapping from solver settings to bullet engine parameters
+    _SOLVER_PARAMS = dict(
+        num_solver_iterations=('numSolverIterations', int),
+        num_substeps=('numSubSteps', int),
+        contact_breaking_threshold=('contactBreakingThreshold', float),
+        enable_cone_friction=('enableConeFriction', int),
+        deterministic_overlapping_pairs=(
+            'deterministicOverlappingPairs', int))
+
+    # Model metadata templates keyed by asset file hash,
+    # shared by all engines in the process
+    _ASSET_TEMPLATES = dict()
+
+    # Record layout of contact and closest point queries,
+    # one row per point, <lid_self> is the link bucket
+    CONTACT_DTYPE = np.dtype([
+        ('lid_self', np.int32), ('uid_other', np.int32),
+        ('lid_other', np.int32), ('pos_self', np.float64, 3),
+        ('pos_other', np.float64, 3), ('normal', np.float64, 3),
+        ('distance', np.float64), ('force', np.float64)])
+
     def __init__(self, e_id, identifier, max_run_time,
-                 async=False, step_size=0.001):
+                 async=False, step_size=0.001, solver=None):
         """
         Initialize the physics physics_engine.
         :param async: boolean: indicate if run 
@@ -63,6 +411,8 @@ class BulletPhysicsEngine(FakeStateEngine):
         same as from the graphics server for bullet
         :param step_size: time step size (float) for each
         simulation step
+        :param solver: dictionary of solver settings, optionally
+        with a 'preset' name, see <configure_solver>
         """
         self._version = 'perls version {}, bullet version {}'.\
             format(__version__, p.getAPIVersion())
@@ -76,11 +426,90 @@ class BulletPhysicsEngine(FakeStateEngine):
         self._physics_server_id = identifier
 
         self._viz = False
-        self._sensor_enabled = False
+
+        # Debug items are recycled instead of removed, by
+        # (kind, uid, lid) they are attached to. Removed
+        # items are hidden until replaced by a new marker
+        self._marker_pool = dict()
+        self._marker_items = dict()
+        self._marker_replace = True
+
+        # Joint force/torque sensors opted in by (uid, jid),
+        # read in one pass per step into a ring buffer
+        # holding the last <_sensor_history> readings
+        self._sensors = list()
+        self._sensor_rows = dict()
+        self._sensor_groups = list()
+        self._sensor_history = 16
+        self._sensor_ring = np.zeros((self._sensor_history, 0, 6))
+        self._sensor_count = 0
+
+        # Counter bumped by every call that may change
+        # the simulation state, used to tell whether
+        # batched snapshots are still valid
+        self._state_tick = 0
+
+        # Preallocated per-body state buffers, keyed by uid
+        self._snapshot = dict()
+
+        # Immutable model metadata (names, joint specs,
+        # dynamics), keyed by uid, filled on load
+        self._model_info = dict()
+
+        # Asset load cache, off by default. Asset file hashes
+        # are kept by (path, modification time)
+        self._asset_cache = False
+        self._asset_cache_dir = None
+        self._asset_hashes = dict()
+        self._data_path = pjoin(osp.dirname(__file__), '../data')
+
+        # Latest motor command of each joint, keyed by uid
+        self._motor_commands = dict()
+
+        # Deferred motor commands of current tick, same layout
+        # as motor commands, None if commands are sent at once
+        self._command_buffer = None
+        self._command_stats = dict(commands=0, calls=0)
+
+        # Functions run before every simulation step, keyed by
+        # uid, e.g. torque controllers recomputing their output
+        self._step_callbacks = dict()
+
+        # Number of internal substeps per simulation step,
+        # 0 uses the engine default
+        self._num_substeps = 0
+
+        # Solver settings applied on start, bullet
+        # defaults are kept for unspecified entries
+        self._solver = dict()
+        if solver:
+            self.configure_solver(**solver)
+
+        # IK solutions keyed by quantized target and joint
+        # configuration, and last solution of each end effector
+        # used as warm start
+        self._ik_cache = collections.OrderedDict()
+        self._ik_cache_size = 1024
+        self._ik_resolution = 1e-5
+        self._ik_seed = dict()
+        self._ik_extended = True
+        self._ik_warm_start = False
+
+        # Forward kinematics of urdf bodies for IK residuals,
+        # the kinematic model id of each body and asset paths
+        self._kinematics = KinematicEngine()
+        self._kinematic_uids = dict()
+        self._urdf_paths = dict()
+        self._ik_stats = dict(hits=0, misses=0, iterations=0, residual=None)
+
+        # Step coherent query memoization, off by default
+        self._memo = None
+        self._memo_tick = -1
+        self._memo_stats = dict()
 
         p.setAdditionalSearchPath(
-            pjoin(osp.dirname(__file__),
-                  '../data'))
+            self._data_path,
+            physicsClientId=self._physics_server_id)
 
     @property
     def version(self):
@@ -98,10 +527,51 @@ class BulletPhysicsEngine(FakeStateEngine):
             max_run_time=self._max_run_time,
             visual=self._viz
         )
+        if self._solver:
+            info_dic['solver'] = dict(self._solver)
+        if self._asset_cache:
+            info_dic['asset_cache'] = dict(
+                dir=self._asset_cache_dir,
+                templates=len(self._ASSET_TEMPLATES))
+        if self._memo is not None:
+            info_dic['memo'] = self._memo_stats
+        if self._command_buffer is not None:
+            info_dic['command_buffer'] = dict(self._command_stats)
         if self._async:
             info_dic['step_size'] = self._step_size
         return info_dic
 
+    @property
+    def visual(self):
+        return self._viz
+
+    @property
+    def asset_cache(self):
+        """
+        Check if the asset cache is enabled
+        :return: boolean
+        """
+        return self._asset_cache
+
+    @property
+    def memo_stats(self):
+        """
+        Get the hit/miss counters of memoized queries
+        :return: dictionary where keys are query method
+        names, values are dictionaries of {hits, misses}
+        """
+        return self._memo_stats
+
+    @property
+    def ik_stats(self):
+        """
+        Get the counters of IK solves
+        :return: dictionary of {hits, misses, iterations,
+        residual}, where iterations is the total number of
+        solver calls and residual is that of the last solve
+        """
+        return self._ik_stats
+
     @property
     def ps_id(self):
         """
@@ -124,22 +594,330 @@ class BulletPhysicsEngine(FakeStateEngine):
                 return -1
         return 0
 
+    def enable_memoization(self, flag=True):
+        """
+        Turn on/off memoizing state queries within one
+        simulation step. Counters are reset on each call.
+        :param flag: boolean, True to enable
+        :return: None
+        """
+        self._memo = dict() if flag else None
+        self._memo_tick = -1
+        self._memo_stats = dict()
+
+    def _mark_dirty(self):
+        """
+        Flag the simulation state as changed, so that
+        buffered snapshots are refreshed on next read
+        :return: None
+        """
+        self._state_tick += 1
+
+    def _alloc_snapshot(self, uid):
+        """
+        Allocate the state buffers of given body
+        :param uid: integer body unique id
+        :return: dictionary of numpy arrays
+        """
+        num_joints = len(self._get_model_info(uid)['joint_info'])
+        return dict(
+            tick=-1,
+            links=frozenset(),
+            pos=np.zeros(3), orn=np.zeros(4),
+            v=np.zeros(3), omega=np.zeros(3),
+            joint_pos=np.zeros(num_joints),
+            joint_vel=np.zeros(num_joints),
+            joint_wrench=np.zeros((num_joints, 6)),
+            joint_torque=np.zeros(num_joints),
+            link_pos=np.zeros((num_joints, 3)),
+            link_orn=np.zeros((num_joints, 4)),
+            link_rel_pos=np.zeros((num_joints, 3)),
+            link_rel_orn=np.zeros((num_joints, 4)),
+            link_frame_pos=np.zeros((num_joints, 3)),
+            link_frame_orn=np.zeros((num_joints, 4)),
+            link_v=np.zeros((num_joints, 3)),
+            link_omega=np.zeros((num_joints, 3)),
+        )
+
+    def _get_model_info(self, uid):
+        """
+        Get the cached static metadata of given body,
+        fetch and cache it if not there yet
+        :param uid: integer body unique id
+        :return: dictionary of metadata
+        """
+        info = self._model_info.get(uid)
+        if info is None:
+            info = self._cache_model_info(uid)
+        return info
+
+    def _cache_model_info(self, uid, asset_hash=None):
+        """
+        Query and store the static metadata of given body.
+        Joint specs are stored in read-only numpy arrays.
+        :param uid: integer body unique id
+        :param asset_hash: hash string of the asset file, if given
+        the metadata is instantiated from the template of the
+        same asset instead of queried
+        :return: dictionary of metadata
+        """
+        template = self._get_asset_template(asset_hash)
+        if template is not None:
+            info = dict(template, dynamics=dict())
+            self._model_info[uid] = info
+            return info
+
+        def _decode(string):
+            if isinstance(string, bytes):
+                string = string.decode('utf-8')
+            return str(string)
+
+        base_name, body_name = p.getBodyInfo(
+            uid, physicsClientId=self._physics_server_id)
+
+        joint_info = list()
+        for jid in range(p.getNumJoints(
+                uid, physicsClientId=self._physics_server_id)):
+            info = list(p.getJointInfo(
+                uid, jid, physicsClientId=self._physics_server_id))
+            info[1] = _decode(info[1])
+            info[2] = BulletPhysicsEngine.JOINT_TYPES[info[2]]
+            info[12] = _decode(info[12])
+            joint_info.append(tuple(info))
+
+        specs = dict(
+            index=[j[0] for j in joint_info],
+            name=[j[1] for j in joint_info],
+            jtype=[j[2] for j in joint_info],
+            pos_idx=[j[3] for j in joint_info],
+            vel_idx=[j[4] for j in joint_info],
+            active=[j[5] for j in joint_info],
+        )
+        for key, idx in (('damping', 6), ('friction', 7),
+                         ('lower', 8), ('upper', 9),
+                         ('max_force', 10), ('max_vel', 11)):
+            arr = np.array([j[idx] for j in joint_info], dtype=np.float64)
+            arr.flags.writeable = False
+            specs[key] = arr
+
+        info = dict(
+            name=_decode(body_name),
+            link_names=[_decode(base_name)] + [j[12] for j in joint_info],
+            joint_info=joint_info,
+            joint_specs=specs,
+            # Dynamics are filled lazily, they can be changed
+            dynamics=dict()
+        )
+        self._model_info[uid] = info
+        if asset_hash is not None:
+            self._put_asset_template(asset_hash, info)
+        return info
+
+    def configure_asset_cache(self, flag=True, cache_dir=None):
+        """
+        Turn on/off the asset load cache. When on, graphics
+        shapes are cached by bullet, and model metadata of each
+        asset file is parsed once and reused as a template for
+        repeated loads, keyed by file content hash.
+        :param flag: boolean, True to enable
+        :param cache_dir: directory to persist templates across
+        processes, None to only keep them in memory
+        :return: None
+        """
+        self._asset_cache = flag
+        self._asset_cache_dir = cache_dir
+        if flag and cache_dir and not osp.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _resolve_asset(self, file_path):
+        """
+        Find the asset file on disk, as bullet would
+        :param file_path: path string, absolute or relative
+        to the data directory
+        :return: absolute path string, None if not found
+        """
+        for path in (file_path, pjoin(self._data_path, file_path)):
+            if osp.isfile(path):
+                return osp.abspath(path)
+        return None
+
+    def _hash_asset(self, file_path):
+        """
+        Get the content hash of an asset file
+        :param file_path: asset path string
+        :return: hex digest string, None if not found
+        """
+        path = self._resolve_asset(file_path)
+        if path is None:
+            return None
+        key = (path, os.stat(path).st_mtime)
+        digest = self._asset_hashes.get(key)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha1(f.read()).hexdigest()
+            self._asset_hashes[key] = digest
+        return digest
+
+    def _get_asset_template(self, asset_hash):
+        """
+        Get the model metadata template of an asset,
+        from memory or from the cache directory
+        :param asset_hash: hash string, can be None
+        :return: dictionary of metadata, None if not cached
+        """
+        if asset_hash is None:
+            return None
+        template = self._ASSET_TEMPLATES.get(asset_hash)
+        if template is None and self._asset_cache_dir:
+            cache_file = pjoin(self._asset_cache_dir,
+                               '{}.pkl'.format(asset_hash))
+            if osp.isfile(cache_file):
+                try:
+                    with open(cache_file, 'rb') as f:
+                        template = pickle.load(f)
+                    for arr in template['joint_specs'].values():
+                        if isinstance(arr, np.ndarray):
+                            arr.flags.writeable = False
+                except (IOError, EOFError, pickle.UnpicklingError,
+                        AttributeError, KeyError, ValueError) as e:
+                    # Broken file, e.g. left by a crashed writer,
+                    # treat as a miss so it is written again
+                    logging.warning('Dropping bad asset cache file {}: '
+                                    '{}'.format(cache_file, e))
+                    try:
+                        os.remove(cache_file)
+                    except OSError:
+                        pass
+                    return None
+                self._ASSET_TEMPLATES[asset_hash] = template
+        return template
+
+    def _put_asset_template(self, asset_hash, info):
+        """
+        Store the model metadata of an asset as template
+        :param asset_hash: hash string
+        :param info: dictionary of metadata
+        :return: None
+        """
+        template = dict(info, dynamics=dict())
+        self._ASSET_TEMPLATES[asset_hash] = template
+        if self._asset_cache_dir:
+            cache_file = pjoin(self._asset_cache_dir,
+                               '{}.pkl'.format(asset_hash))
+            # Write aside and move, so that other processes
+            # never read a partial file
+            tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+            try:
+                with open(tmp_file, 'wb') as f:
+                    # Python 2 & 3 compatible
+                    pickle.dump(template, f, protocol=2)
+                os.rename(tmp_file, cache_file)
+            except (IOError, OSError) as e:
+                logging.warning('Cannot write asset cache file {}: '
+                                '{}'.format(cache_file, e))
+
+    def preload_assets(self, file_paths, num_threads=4):
+        """
+        Hash the given asset files in parallel and fetch their
+        cached templates ahead of loading. No-op if the asset
+        cache is off.
+        :param file_paths: list of asset path strings
+        :param num_threads: number of worker threads
+        :return: dictionary of {path: hash string}
+        """
+        if not self._asset_cache:
+            return dict()
+        paths = sorted(set(path for path in file_paths if path))
+        pool = ThreadPool(max(min(num_threads, len(paths)), 1))
+        try:
+            hashes = pool.map(self._hash_asset, paths)
+        finally:
+            pool.close()
+        for asset_hash in hashes:
+            self._get_asset_template(asset_hash)
+        return dict(zip(paths, hashes))
+
     ###
     # General environment related methods
 
     def configure_environment(self, gravity, *_):
         p.setGravity(0., 0., - gravity * 9.8, self._physics_server_id)
 
+    def configure_solver(self, preset=None, **params):
+
+        settings = dict()
+        if preset is not None:
+            if preset not in self.SOLVER_PRESETS:
+                logging.error('Unknown solver preset {}, available: {}'.
+                              format(preset, list(self.SOLVER_PRESETS)))
+                return -1
+            settings.update(self.SOLVER_PRESETS[preset])
+        for key, value in params.items():
+            if key not in self._SOLVER_PARAMS and key != 'collision_margin':
+                logging.error('Unknown solver setting {}'.format(key))
+                return -1
+            if value is not None:
+                settings[key] = value
+
+        self._solver.update(settings)
+        if self.status == 'running':
+            self._apply_solver()
+        return 0
+
+    def _apply_solver(self):
+        """
+        Send the solver settings to bullet, and set
+        collision margins of all loaded bodies
+        :return: None
+        """
+        kwargs = dict()
+        for key, (name, dtype) in self._SOLVER_PARAMS.items():
+            if key in self._solver:
+                kwargs[name] = dtype(self._solver[key])
+        self._num_substeps = int(self._solver.get('num_substeps', 0))
+        if kwargs:
+            p.setPhysicsEngineParameter(
+                physicsClientId=self._physics_server_id, **kwargs)
+        for uid in self._model_info:
+            self._set_collision_margin(uid)
+
+    def _set_collision_margin(self, uid):
+        """
+        Set the configured collision margin on all links of body
+        :param uid: integer body unique id
+        :return: None
+        """
+        margin = self._solver.get('collision_margin')
+        if margin is None:
+            return
+        links = [-1] + list(range(len(self._get_model_info(uid)['joint_info'])))
+        try:
+            for lid in links:
+                p.changeDynamics(uid, lid, collisionMargin=float(margin),
+                                 physicsClientId=self._physics_server_id)
+        except TypeError:
+            # Older bullet versions do not expose collision margins
+            logging.warning('Collision margin is not supported '
+                            'by bullet {}.'.format(self.version))
+
     def load_asset(self, file_path, pos, orn, fixed):
+        self._mark_dirty()
         uid = -1
+        asset_hash = None
+        flags = p.URDF_USE_SELF_COLLISION_EXCLUDE_PARENT
+        if self._asset_cache:
+            asset_hash = self._hash_asset(file_path)
+            # Not available in older bullet versions
+            flags |= getattr(p, 'URDF_ENABLE_CACHED_GRAPHICS_SHAPES', 0)
         try:
             if osp.basename(file_path).split('.')[1] == 'urdf':
                 uid = p.loadURDF(
                     file_path, basePosition=pos, baseOrientation=orn,
                     useFixedBase=fixed,
-                    flags=p.URDF_USE_SELF_COLLISION_EXCLUDE_PARENT,
+                    flags=flags,
                     physicsClientId=self._physics_server_id
                 )
+                self._urdf_paths[uid] = file_path
             elif osp.basename(file_path).split('.')[1] == 'sdf':
                 uid = p.loadSDF(file_path, physicsClientId=self._physics_server_id)[0]
                 if fixed:
@@ -155,8 +933,10 @@ class BulletPhysicsEngine(FakeStateEngine):
                     uid, pos, orn, physicsClientId=self._physics_server_id)
 
             # Get joint and link indices
-            joints = list(range(p.getNumJoints(uid, physicsClientId=self._physics_server_id)))
+            joints = list(range(len(
+                self._cache_model_info(uid, asset_hash)['joint_info'])))
             links = [-1] + joints
+            self._set_collision_margin(uid)
             return int(uid), links, joints
         except p.error as e:
             self.status = BulletPhysicsEngine._STATUS[-1]
@@ -166,12 +946,14 @@ class BulletPhysicsEngine(FakeStateEngine):
     ###
     # Body related methods
 
+    @_step_memoized
     def get_body_scene_position(self, uid):
         if uid == -1:
             return math_util.zero_vec(3)
         return math_util.vec(p.getBasePositionAndOrientation(
             uid, physicsClientId=self._physics_server_id)[0])
 
+    @_step_memoized
     def get_body_scene_orientation(self, uid, otype='quat'):
 
         if uid == -1:
@@ -217,7 +999,72 @@ class BulletPhysicsEngine(FakeStateEngine):
         body_pose = p.getBasePositionAndOrientation(uid, self._physics_server_id)
         return math_util.get_relative_pose(body_pose, (frame_pos, frame_orn))
 
+    def get_body_snapshot(self, uids, lids=None):
+        if isinstance(uids, int):
+            uids = [uids]
+        lids = lids or dict()
+        snapshots = dict()
+
+        for uid in uids:
+            snap = self._snapshot.get(uid)
+            if snap is None:
+                snap = self._alloc_snapshot(uid)
+                self._snapshot[uid] = snap
+
+            num_joints = len(snap['joint_pos'])
+            links = lids.get(uid, None)
+            links = list(range(num_joints) if links is None else links)
+
+            # Real time simulation moves on by itself,
+            # so buffered states are never reused there
+            if not self._real_time and snap['tick'] == self._state_tick \
+                    and snap['links'].issuperset(links):
+                snapshots[uid] = snap
+                continue
+
+            pos, orn = p.getBasePositionAndOrientation(
+                uid, physicsClientId=self._physics_server_id)
+            v, omega = p.getBaseVelocity(
+                uid, physicsClientId=self._physics_server_id)
+            snap['pos'][:], snap['orn'][:] = pos, orn
+            snap['v'][:], snap['omega'][:] = v, omega
+
+            if num_joints:
+                joint_states = p.getJointStates(
+                    uid, list(range(num_joints)),
+                    physicsClientId=self._physics_server_id)
+                for jid, state in enumerate(joint_states):
+                    snap['joint_pos'][jid] = state[0]
+                    snap['joint_vel'][jid] = state[1]
+                    snap['joint_wrench'][jid] = state[2]
+                    snap['joint_torque'][jid] = state[3]
+
+            if links:
+                link_states = p.getLinkStates(
+                    uid, links, computeLinkVelocity=1,
+                    physicsClientId=self._physics_server_id)
+                for lid, state in zip(links, link_states):
+                    snap['link_pos'][lid] = state[0]
+                    snap['link_orn'][lid] = state[1]
+                    snap['link_rel_pos'][lid] = state[2]
+                    snap['link_rel_orn'][lid] = state[3]
+                    snap['link_frame_pos'][lid] = state[4]
+                    snap['link_frame_orn'][lid] = state[5]
+                    snap['link_v'][lid] = state[6]
+                    snap['link_omega'][lid] = state[7]
+
+            # Links are only trusted within the same tick
+            if snap['tick'] == self._state_tick:
+                snap['links'] = snap['links'].union(links)
+            else:
+                snap['links'] = frozenset(links)
+            snap['tick'] = self._state_tick
+            snapshots[uid] = snap
+
+        return snapshots
+
     def set_body_scene_pose(self, uid, pos, orn):
+        self._mark_dirty()
         status = 0
         try:
             p.resetBasePositionAndOrientation(
@@ -231,25 +1078,13 @@ class BulletPhysicsEngine(FakeStateEngine):
         return status
 
     def get_body_name(self, uid):
-        _, name_str = p.getBodyInfo(
-            int(uid), physicsClientId=self._physics_server_id)
-        if isinstance(name_str, bytes):
-            name_str = name_str.decode('utf-8')
-        return name_str
+        return self._get_model_info(int(uid))['name']
 
     def get_link_name(self, uid, lid):
         try:
-            if lid == -1:
-                link_str, _ = p.getBodyInfo(
-                    uid, physicsClientId=self._physics_server_id)
-            else:
-                # Note link_0 is the base link
-                link_str = p.getJointInfo(
-                    uid, lid, physicsClientId=self._physics_server_id)[-1]
-            if isinstance(link_str, bytes):
-                link_str = link_str.decode('utf-8')
-            return str(link_str)
-        except p.error as e:
+            # Note link_0 is the base link
+            return self._get_model_info(uid)['link_names'][lid + 1]
+        except (IndexError, p.error) as e:
             self.status = BulletPhysicsEngine._STATUS[-1]
             self._error_message.append(str(e))
             logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
@@ -303,11 +1138,13 @@ class BulletPhysicsEngine(FakeStateEngine):
     def change_loaded_texture(self, texture_id, pixels, w, h):
         p.changeTexture(texture_id, pixels, w, h, self._physics_server_id)
 
+    @_step_memoized
     def get_body_linear_velocity(self, uid):
         return np.array(p.getBaseVelocity(
             uid, physicsClientId=self._physics_server_id)[0])
 
     def set_body_linear_velocity(self, uid, vel):
+        self._mark_dirty()
         try:
             return p.resetBaseVelocity(
                 uid, linearVelocity=vel, physicsClientId=self._physics_server_id)
@@ -316,11 +1153,13 @@ class BulletPhysicsEngine(FakeStateEngine):
             self._error_message.append(str(e))
             logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
 
+    @_step_memoized
     def get_body_angular_velocity(self, uid):
         return np.array(p.getBaseVelocity(
             uid, physicsClientId=self._physics_server_id)[1])
 
     def set_body_angular_velocity(self, uid, vel):
+        self._mark_dirty()
         try:
             return p.resetBaseVelocity(
                 uid, angularVelocity=vel, physicsClientId=self._physics_server_id)
@@ -329,6 +1168,7 @@ class BulletPhysicsEngine(FakeStateEngine):
             self._error_message.append(str(e))
             logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
 
+    @_step_memoized
     def get_body_link_state(self, uid, lid):
         return tuple(
             [np.array(vec) for
@@ -336,16 +1176,99 @@ class BulletPhysicsEngine(FakeStateEngine):
                 uid, lid, 1, physicsClientId=self._physics_server_id)])
 
     def get_body_joint_info(self, uid, jid):
-        info = list(p.getJointInfo(uid, jid, physicsClientId=self._physics_server_id))
-        info[2] = BulletPhysicsEngine.JOINT_TYPES[info[2]]
-        return tuple(info)
+        return self._get_model_info(uid)['joint_info'][jid]
+
+    def get_body_joint_specs(self, uid):
+        return self._get_model_info(uid)['joint_specs']
 
+    @_step_memoized
     def get_body_joint_state(self, uid, jid):
-        if not self._sensor_enabled:
-            p.enableJointForceTorqueSensor(uid, jid, 1, physicsClientId=self._physics_server_id)
-            self._sensor_enabled = True
         return p.getJointState(uid, jid, physicsClientId=self._physics_server_id)
 
+    def configure_sensors(self, history=16):
+        """
+        Set the number of steps of sensor readings kept.
+        Readings collected so far are dropped.
+        :param history: integer number of steps K
+        :return: None
+        """
+        self._sensor_history = max(int(history), 1)
+        self._rebuild_sensors()
+
+    def _rebuild_sensors(self):
+        """
+        Regroup registered sensors by body for batched reads,
+        and reallocate the ring buffer
+        :return: None
+        """
+        self._sensors.sort()
+        self._sensor_rows = dict(
+            (sensor, row) for row, sensor in enumerate(self._sensors))
+        groups = collections.OrderedDict()
+        for row, (uid, jid) in enumerate(self._sensors):
+            jids, rows = groups.setdefault(uid, ([], []))
+            jids.append(jid)
+            rows.append(row)
+        self._sensor_groups = [(uid, jids, rows)
+                               for uid, (jids, rows) in groups.items()]
+        self._sensor_ring = np.zeros(
+            (self._sensor_history, len(self._sensors), 6))
+        self._sensor_count = 0
+
+    def _read_sensors(self):
+        """
+        Read all registered sensors into the next ring buffer row,
+        one query per sensed body
+        :return: None
+        """
+        if not self._sensors:
+            return
+        row = self._sensor_ring[self._sensor_count % self._sensor_history]
+        for uid, jids, rows in self._sensor_groups:
+            states = p.getJointStates(
+                uid, jids, physicsClientId=self._physics_server_id)
+            row[rows] = [state[2] for state in states]
+        self._sensor_count += 1
+
+    def enable_joint_sensors(self, uid, jids):
+        new_sensors = [(uid, jid) for jid in jids
+                       if (uid, jid) not in self._sensor_rows]
+        if not new_sensors:
+            return 0
+        try:
+            for _, jid in new_sensors:
+                p.enableJointForceTorqueSensor(
+                    uid, jid, 1, physicsClientId=self._physics_server_id)
+        except p.error as e:
+            self._error_message.append(str(e))
+            logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
+            return -1
+        self._sensors.extend(new_sensors)
+        self._rebuild_sensors()
+        return 0
+
+    def disable_joint_sensors(self, uid, jids=None):
+        removed = [(u, jid) for (u, jid) in self._sensors
+                   if u == uid and (jids is None or jid in jids)]
+        if not removed:
+            return
+        if uid in self._model_info:
+            for _, jid in removed:
+                p.enableJointForceTorqueSensor(
+                    uid, jid, 0, physicsClientId=self._physics_server_id)
+        self._sensors = [s for s in self._sensors if s not in removed]
+        self._rebuild_sensors()
+
+    def get_joint_sensor_readings(self, uid, jids, history=1):
+        try:
+            rows = [self._sensor_rows[(uid, jid)] for jid in jids]
+        except KeyError as e:
+            logging.error('Force/torque sensor {} not enabled.'.format(e))
+            return None
+        num = min(history, self._sensor_count, self._sensor_history)
+        steps = np.arange(self._sensor_count - num, self._sensor_count)
+        return self._sensor_ring[steps % self._sensor_history][:, rows]
+
     def set_body_joint_state(self, uid, jids, vals, ctype, kwargs):
         if isinstance(jids, int):
             jids = [jids]
@@ -353,6 +1276,7 @@ class BulletPhysicsEngine(FakeStateEngine):
             vals = [vals]
         assert (len(jids) == len(vals)), \
             'In <set_body_joint_state>: Number of joints mismatches number of values'
+        self._mark_dirty()
 
         try:
             # Only reset if indicated to use reset
@@ -367,45 +1291,179 @@ class BulletPhysicsEngine(FakeStateEngine):
 
             # Remove 'reset' from kwargs
             kwargs.pop('reset', None)
-            if ctype == 'position':
-                p.setJointMotorControlArray(uid, jointIndices=jids,
-                                            controlMode=p.POSITION_CONTROL,
-                                            targetPositions=vals,
-                                            targetVelocities=(0.,) * len(jids),
-                                            physicsClientId=self._physics_server_id,
-                                            **kwargs)
-            elif ctype == 'velocity':
-                p.setJointMotorControlArray(uid, jointIndices=jids,
-                                            controlMode=p.VELOCITY_CONTROL,
-                                            targetVelocities=vals,
-                                            physicsClientId=self._physics_server_id,
-                                            **kwargs)
-            elif ctype == 'torque':
-                # Need to disable joint motors first
-                p.setJointMotorControlArray(uid, jointIndices=jids,
-                                            controlMode=p.TORQUE_CONTROL,
-                                            physicsClientId=self._physics_server_id,
-                                            forces=vals, **kwargs)
+            self._record_motor_commands(uid, jids, vals, ctype, kwargs)
+            if self._command_buffer is not None:
+                self._buffer_motor_commands(uid, jids, vals, ctype, kwargs)
+            else:
+                self._send_motor_commands(uid, jids, vals, ctype, kwargs)
         except (AssertionError, p.error) as e:
             self.status = BulletPhysicsEngine._STATUS[-1]
             if p.error:
                 self._error_message.append(str(e))
                 logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
 
+    def configure_command_buffer(self, flag=True):
+        """
+        Turn on/off deferred motor commands. When on, joint
+        state commands are merged per body and control type,
+        the last command of each joint wins, and are sent
+        right before the next simulation step.
+        :param flag: boolean, True to enable
+        :return: None
+        """
+        if not flag and self._command_buffer:
+            self.flush_motor_commands()
+        self._command_buffer = dict() if flag else None
+        self._command_stats = dict(commands=0, calls=0)
+
+    def set_body_step_callback(self, uid, callback):
+        if callback is None:
+            self._step_callbacks.pop(uid, None)
+        else:
+            self._step_callbacks[uid] = callback
+
+    def _pre_step(self):
+        """
+        Run the step callbacks and send deferred motor
+        commands, right before one simulation step
+        :return: None
+        """
+        if self._step_callbacks:
+            # Callbacks read the state left by the last step
+            self._mark_dirty()
+            for callback in list(self._step_callbacks.values()):
+                callback()
+        self.flush_motor_commands()
+
+    def _buffer_motor_commands(self, uid, jids, vals, ctype, kwargs):
+        """
+        Defer motor control commands of given joints
+        until the next flush
+        :return: None
+        """
+        self._command_stats['commands'] += 1
+        commands = self._command_buffer.setdefault(uid, dict())
+        for i, (jid, val) in enumerate(zip(jids, vals)):
+            joint_kwargs = dict(
+                (k, v[i]) if hasattr(v, '__len__') and len(v) == len(jids)
+                else (k, v) for k, v in kwargs.items())
+            commands[jid] = (ctype, val, joint_kwargs)
+
+    def flush_motor_commands(self):
+        """
+        Send all deferred motor commands, one call per
+        body, control type and set of motor arguments
+        :return: None
+        """
+        if not self._command_buffer:
+            return
+        buffered, self._command_buffer = self._command_buffer, dict()
+        self._command_stats['calls'] += self._replay_motor_commands(buffered)
+
+    def _send_motor_commands(self, uid, jids, vals, ctype, kwargs):
+        """
+        Issue motor control commands of given joints
+        :param uid: integer body unique id
+        :param jids: list of joint indices
+        :param vals: list of target values
+        :param ctype: control type string among
+        'position', 'velocity', 'torque'
+        :param kwargs: keyword arguments of motor control
+        :return: None
+        """
+        if ctype == 'position':
+            p.setJointMotorControlArray(uid, jointIndices=jids,
+                                        controlMode=p.POSITION_CONTROL,
+                                        targetPositions=vals,
+                                        targetVelocities=(0.,) * len(jids),
+                                        physicsClientId=self._physics_server_id,
+                                        **kwargs)
+        elif ctype == 'velocity':
+            p.setJointMotorControlArray(uid, jointIndices=jids,
+                                        controlMode=p.VELOCITY_CONTROL,
+                                        targetVelocities=vals,
+                                        physicsClientId=self._physics_server_id,
+                                        **kwargs)
+        elif ctype == 'torque':
+            # Need to disable joint motors first
+            p.setJointMotorControlArray(uid, jointIndices=jids,
+                                        controlMode=p.TORQUE_CONTROL,
+                                        physicsClientId=self._physics_server_id,
+                                        forces=vals, **kwargs)
+
+    def _record_motor_commands(self, uid, jids, vals, ctype, kwargs):
+        """
+        Keep the latest motor command of each joint, since
+        bullet does not save them with simulation states.
+        :return: None
+        """
+        commands = self._motor_commands.setdefault(uid, dict())
+        for i, (jid, val) in enumerate(zip(jids, vals)):
+            # Per joint keyword arguments are aligned with joints
+            joint_kwargs = dict(
+                (k, v[i]) if hasattr(v, '__len__') and len(v) == len(jids)
+                else (k, v) for k, v in kwargs.items())
+            commands[jid] = (ctype, val, joint_kwargs)
+
+    def _replay_motor_commands(self, motor_commands):
+        """
+        Re-issue recorded motor commands, grouped into
+        one call per body, control type and arguments
+        :param motor_commands: dictionary of recorded commands
+        :return: number of motor control calls issued
+        """
+        calls = 0
+        for uid, commands in motor_commands.items():
+            groups = dict()
+            for jid, (ctype, val, kwargs) in sorted(commands.items()):
+                key = (ctype, tuple(sorted(kwargs.keys())))
+                groups.setdefault(key, list()).append((jid, val, kwargs))
+            for (ctype, keys), joints in groups.items():
+                kwargs = dict((k, tuple(j[2][k] for j in joints)) for k in keys)
+                self._send_motor_commands(
+                    uid, [j[0] for j in joints],
+                    [j[1] for j in joints], ctype, kwargs)
+                calls += 1
+        return calls
+
+    def _drop_buffered_commands(self, uid, jids):
+        """
+        Discard deferred commands of given joints, which
+        are overridden by a command sent at once
+        :return: None
+        """
+        commands = (self._command_buffer or dict()).get(uid)
+        if commands:
+            for jid in jids:
+                commands.pop(jid, None)
+
     def enable_body_joint_motors(self, uid, jids, forces):
+        self._drop_buffered_commands(uid, jids)
+        self._record_motor_commands(
+            uid, jids, [0.] * len(jids), 'velocity', dict(forces=forces))
         p.setJointMotorControlArray(uid, jids, controlMode=p.VELOCITY_CONTROL,
                                     forces=forces,
                                     physicsClientId=self._physics_server_id)
 
     def disable_body_joint_motors(self, uid, jids):
+        self._drop_buffered_commands(uid, jids)
+        self._record_motor_commands(
+            uid, jids, [0.] * len(jids), 'velocity',
+            dict(forces=[0.] * len(jids)))
         p.setJointMotorControlArray(uid, jids, controlMode=p.VELOCITY_CONTROL,
                                     forces=len(jids) * [0.],
                                     physicsClientId=self._physics_server_id)
 
     def get_body_dynamics(self, uid, lid):
-        return p.getDynamicsInfo(uid, lid, physicsClientId=self._physics_server_id)
+        dynamics = self._get_model_info(uid)['dynamics']
+        if lid not in dynamics:
+            dynamics[lid] = p.getDynamicsInfo(
+                uid, lid, physicsClientId=self._physics_server_id)
+        return dynamics[lid]
 
     def set_body_dynamics(self, uid, lid, info):
+        self._mark_dirty()
+        self._get_model_info(uid)['dynamics'].pop(lid, None)
         status = 0
         try:
             if 'mass' in info:
@@ -434,93 +1492,277 @@ class BulletPhysicsEngine(FakeStateEngine):
             logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
         return status
 
+    @_step_memoized
     def get_body_bounding_box(self, uid, lid):
         return p.getAABB(uid, linkIndex=lid, physicsClientId=self._physics_server_id)
 
-    def get_body_contact_info(self, uid, lid):
+    @_step_memoized
+    def get_body_bounding_boxes(self, uid):
+        num_links = len(self._get_model_info(uid)['joint_info'])
+        return np.array(
+            [p.getAABB(uid, linkIndex=lid,
+                       physicsClientId=self._physics_server_id)
+             for lid in range(-1, num_links)], dtype=np.float64)
+
+    @_step_memoized
+    def get_body_contact_info(self, uid, lid, as_array=False):
+
+        contacts = self._to_contact_array(
+            p.getContactPoints(bodyA=uid, linkIndexA=lid,
+                               physicsClientId=self._physics_server_id))
+        if as_array:
+            return contacts
+        return [dict(uid_other=int(contact['uid_other']),
+                     lid_self=int(contact['lid_self']),
+                     lid_other=int(contact['lid_other']),
+                     pos_self=tuple(contact['pos_self']),   # Vec3
+                     pos_other=tuple(contact['pos_other']),   # Vec3
+                     normalvec2self=tuple(contact['normal']),  # Vec3
+                     distance=float(contact['distance']),   # Scalar
+                     force=float(contact['force']))  # Scalar
+                for contact in contacts]
+
+    def _to_contact_array(self, points):
+        """
+        Pack pybullet contact / closest point tuples
+        into a structured array of CONTACT_DTYPE
+        :param points: tuple of pybullet point tuples
+        :return: numpy structured array
+        """
+        records = np.zeros(len(points), dtype=self.CONTACT_DTYPE)
+        if len(points):
+            cols = list(zip(*points))
+            records['lid_self'] = cols[3]
+            records['uid_other'] = cols[2]
+            records['lid_other'] = cols[4]
+            records['pos_self'] = cols[5]
+            records['pos_other'] = cols[6]
+            records['normal'] = cols[7]
+            records['distance'] = cols[8]
+            records['force'] = cols[9]
+        return records
+
+    @staticmethod
+    def get_closest_point(points):
+        """
+        Get the point of minimum distance
+        :param points: structured array of CONTACT_DTYPE
+        :return: the closest record, None if empty
+        """
+        if not len(points):
+            return None
+        return points[np.argmin(points['distance'])]
 
-        contacts = p.getContactPoints(bodyA=uid, linkIndexA=lid,
-                                      physicsClientId=self._physics_server_id)
-        contact_dic = []
-        for contact in contacts:
-            contact_dic.append(
-                dict(uid_other=contact[2],
-                     lid_self=contact[3],
-                     lid_other=contact[4],
-                     pos_self=contact[5],   # Vec3
-                     pos_other=contact[6],   # Vec3
-                     normalvec2self=contact[7],  # Vec3
-                     distance=contact[8],   # Scalar
-                     force=contact[9]) # Scalar
-            )
-        return contact_dic
+    @staticmethod
+    def reduce_points_by_link(points, field='distance', ufunc=np.minimum):
+        """
+        Reduce a field of points per link of the queried body
+        :param points: structured array of CONTACT_DTYPE
+        :param field: field name to reduce, e.g. 'distance', 'force'
+        :param ufunc: numpy binary ufunc, e.g. np.minimum,
+        np.maximum or np.add
+        :return: dictionary of {lid_self: reduced value}
+        """
+        if not len(points):
+            return dict()
+        order = np.argsort(points['lid_self'], kind='mergesort')
+        lids = points['lid_self'][order]
+        starts = np.flatnonzero(np.r_[True, lids[1:] != lids[:-1]])
+        values = ufunc.reduceat(points[field][order], starts)
+        return dict(zip(lids[starts].tolist(), values.tolist()))
+
+    @_step_memoized
+    def get_body_contacts(self, uid, uid_other=None, lid_other=None):
+
+        kwargs = dict(bodyA=uid, physicsClientId=self._physics_server_id)
+        if uid_other is not None:
+            kwargs['bodyB'] = uid_other
+            if lid_other is not None:
+                kwargs['linkIndexB'] = lid_other
+        return self._to_contact_array(p.getContactPoints(**kwargs))
+
+    def has_body_contact(self, uid, uid_other=None, lid=None):
+
+        contacts = self.get_body_contacts(uid, uid_other)
+        if lid is not None:
+            contacts = contacts[contacts['lid_self'] == lid]
+        return len(contacts) > 0
+
+    def get_body_max_contact_force(self, uid, lid=None, uid_other=None):
+
+        contacts = self.get_body_contacts(uid, uid_other)
+        if lid is not None:
+            contacts = contacts[contacts['lid_self'] == lid]
+        if not len(contacts):
+            return 0.
+        return float(contacts['force'].max())
+
+    @_step_memoized
+    def get_body_surroundings(self, uidA, lidA, uidB, lidB, dist,
+                              as_array=False):
+
+        kwargs = dict(bodyA=uidA, bodyB=uidB, distance=dist,
+                      physicsClientId=self._physics_server_id)
+        # None queries all links of the body
+        if lidA is not None:
+            kwargs['linkIndexA'] = lidA
+        if lidB is not None:
+            kwargs['linkIndexB'] = lidB
+        neighbors = self._to_contact_array(p.getClosestPoints(**kwargs))
+        if as_array:
+            return neighbors
+        return [dict(uid=int(neighbor['uid_other']),
+                     lid=int(neighbor['lid_other']),
+                     posA=tuple(neighbor['pos_self']),  # Vec3
+                     posB=tuple(neighbor['pos_other']),  # Vec3
+                     distance=float(neighbor['distance']))  # Scalar
+                for neighbor in neighbors]
+
+    def _get_proximity_candidates(self, uid, dist, uids_other=None):
+        """
+        Broadphase of proximity queries. Find links of other
+        bodies whose bounding boxes overlap the bounding box
+        of a link of given body inflated by distance
+        :param uid: integer body unique id
+        :param dist: float distance threshold
+        :param uids_other: set of body unique ids to consider,
+        None for all other bodies
+        :return: sorted list of (lid, uid_other, lid_other)
+        """
+        num_links = len(self._get_model_info(uid)['joint_info'])
+        candidates = set()
+        for lid in range(-1, num_links):
+            lower, upper = p.getAABB(
+                uid, linkIndex=lid, physicsClientId=self._physics_server_id)
+            overlaps = p.getOverlappingObjects(
+                np.subtract(lower, dist).tolist(),
+                np.add(upper, dist).tolist(),
+                physicsClientId=self._physics_server_id) or ()
+            for uid_other, lid_other in overlaps:
+                if uid_other != uid and \
+                        (uids_other is None or uid_other in uids_other):
+                    candidates.add((lid, uid_other, lid_other))
+        return sorted(candidates)
+
+    @_step_memoized
+    def get_body_proximity(self, uid, dist, uids_other=None):
+        try:
+            candidates = self._get_proximity_candidates(
+                uid, dist, None if uids_other is None else set(uids_other))
+            # Narrowphase only on broadphase candidates
+            points = list()
+            for lid, uid_other, lid_other in candidates:
+                points.extend(p.getClosestPoints(
+                    bodyA=uid, bodyB=uid_other, distance=dist,
+                    linkIndexA=lid, linkIndexB=lid_other,
+                    physicsClientId=self._physics_server_id))
+            return self._to_contact_array(points)
+        except p.error as e:
+            self.status = BulletPhysicsEngine._STATUS[-1]
+            self._error_message.append(str(e))
+            logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
+            return self._to_contact_array(())
 
-    def get_body_surroundings(self, uidA, lidA, uidB, lidB, dist):
+    def get_proximity(self, uids, dist, uids_other=None):
+        if uids_other is not None:
+            uids_other = tuple(sorted(uids_other))
+        return dict((uid, self.get_body_proximity(uid, dist, uids_other))
+                    for uid in uids)
 
-        neighbors = p.getClosestPoints(
-            bodyA=uidA, bodyB=uidB,
-            distance=dist,
-            linkIndexA=lidA,
-            linkIndexB=lidB,
-            physicsClientId=self._physics_server_id
-        )
-        neighbor_dic = []
-        for neighbor in neighbors:
-            neighbor_dic.append(
-                dict(uid=neighbor[2],
-                     lid=neighbor[4],
-                     posA=neighbor[5],  # Vec3
-                     posB=neighbor[6],  # Vec3
-                     distance=neighbor[8])  # Scalar
-            )
-        return neighbor_dic
+    def _add_debug_item(self, kind, add_item, args, kwargs,
+                        time, uid, lid):
+        """
+        Add a debug item, reusing a pooled item of the same
+        kind and parent if there is one
+        :param kind: item kind string, 'line' or 'text'
+        :param add_item: bullet function adding the item
+        :param args: positional arguments of add_item
+        :param kwargs: keyword arguments of add_item
+        :param time: float life time, 0 for permanent
+        :param uid: integer parent body unique id, can be None
+        :param lid: integer parent link index
+        :return: integer debug item id
+        """
+        if uid is not None:
+            kwargs.update(parentObjectUniqueId=uid,
+                          parentLinkIndex=lid or 0)
+        key = (kind, uid, (lid or 0) if uid is not None else None)
+        pool = self._marker_pool.get(key)
+        mid = -1
+        if pool and self._marker_replace:
+            try:
+                mid = add_item(*args, replaceItemUniqueId=pool[-1],
+                               physicsClientId=self._physics_server_id,
+                               **kwargs)
+                pool.pop()
+            except TypeError:
+                # Not available in older bullet versions
+                self._marker_replace = False
+        if mid < 0:
+            mid = add_item(*args, physicsClientId=self._physics_server_id,
+                           **kwargs)
+        # Items with life time expire by themselves, cannot recycle
+        if time == 0:
+            self._marker_items[mid] = key
+        return mid
 
     def add_body_line_marker(self, posA, posB, color, width,
                              time, uid, lid=None):
-
-        if uid is not None:
-            lid = lid or 0
-            mid = p.addUserDebugLine(
-                posA, posB, lineColorRGB=color,
-                lineWidth=width,
-                lifeTime=time,
-                parentObjectUniqueId=uid,
-                parentLinkIndex=lid,
-                physicsClientId=self._physics_server_id
-            )
-        else:
-            mid = p.addUserDebugLine(
-                posA, posB, lineColorRGB=color,
-                lineWidth=width,
-                lifeTime=time,
-                physicsClientId=self._physics_server_id
-            )
-
-        return mid
+        if not self._viz:
+            return None
+        return self._add_debug_item(
+            'line', p.addUserDebugLine, (posA, posB),
+            dict(lineColorRGB=color, lineWidth=width, lifeTime=time),
+            time, uid, lid)
+
+    def add_body_line_markers(self, segments, color, width,
+                              time, uid, lid=None):
+        if not self._viz:
+            return list()
+        return [self._add_debug_item(
+            'line', p.addUserDebugLine, (posA, posB),
+            dict(lineColorRGB=color, lineWidth=width, lifeTime=time),
+            time, uid, lid) for posA, posB in segments]
 
     def add_body_text_marker(self, text, pos, font_size, color,
                              time, uid, lid=None):
-        if uid is not None:
-            lid = lid or 0
-            mid = p.addUserDebugText(
-                text, pos, textColorRGB=tuple(color),
-                textSize=float(font_size),
-                lifeTime=time,
-
-                # Not using textOrientation for now
-                parentObjectUniqueId=uid,
-                parentLinkIndex=lid,
-                physicsClientId=self._physics_server_id)
-        else:
-            mid = p.addUserDebugText(
-                text, pos, textColorRGB=tuple(color),
-                textSize=float(font_size),
-                lifeTime=time,
-                physicsClientId=self._physics_server_id)
-        return mid
+        if not self._viz:
+            return None
+        # Not using textOrientation for now
+        return self._add_debug_item(
+            'text', p.addUserDebugText, (text, pos),
+            dict(textColorRGB=tuple(color), textSize=float(font_size),
+                 lifeTime=time),
+            time, uid, lid)
 
     def remove_body_text_marker(self, marker_id):
-        p.removeUserDebugItem(marker_id, physicsClientId=self._physics_server_id)
+        if not self._viz or marker_id is None:
+            return
+        key = self._marker_items.pop(marker_id, None)
+        if key is None or not self._marker_replace:
+            p.removeUserDebugItem(
+                marker_id, physicsClientId=self._physics_server_id)
+            return
+
+        # Hide the item in place and keep it for reuse
+        kind, uid, lid = key
+        kwargs = dict(replaceItemUniqueId=marker_id,
+                      physicsClientId=self._physics_server_id)
+        if uid is not None:
+            kwargs.update(parentObjectUniqueId=uid, parentLinkIndex=lid)
+        try:
+            if kind == 'line':
+                p.addUserDebugLine((0., 0., 0.), (0., 0., 0.), **kwargs)
+            else:
+                p.addUserDebugText('', (0., 0., 0.), **kwargs)
+        except TypeError:
+            # Not available in older bullet versions
+            self._marker_replace = False
+            self._marker_pool = dict()
+            p.removeUserDebugItem(
+                marker_id, physicsClientId=self._physics_server_id)
+            return
+        self._marker_pool.setdefault(key, list()).append(marker_id)
 
     def apply_force_to_body(self, uid, lid, force, pos, ref):
         try:
@@ -582,6 +1824,7 @@ class BulletPhysicsEngine(FakeStateEngine):
                             parent_pos=(0., 0., 0.),
                             child_pos=(0., 0., 0.),
                             **kwargs):
+        self._mark_dirty()
         parent_orn = kwargs.get('parentFrameOrientation', None)
         if parent_orn is None:
             parent_orn = (0., 0., 0., 1)
@@ -618,42 +1861,253 @@ class BulletPhysicsEngine(FakeStateEngine):
             logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
 
     def delete_body(self, uid):
+        self._mark_dirty()
+        self._snapshot.pop(uid, None)
+        self._model_info.pop(uid, None)
+        self._motor_commands.pop(uid, None)
+        # Debug items attached to the body go with it
+        for key in [k for k in self._marker_pool if k[1] == uid]:
+            del self._marker_pool[key]
+        for mid in [m for m, k in self._marker_items.items() if k[1] == uid]:
+            del self._marker_items[mid]
+        if self._command_buffer is not None:
+            self._command_buffer.pop(uid, None)
+        self._step_callbacks.pop(uid, None)
+        self.disable_joint_sensors(uid)
+        self._ik_cache.clear()
+        for key in [k for k in self._ik_seed if k[0] == uid]:
+            del self._ik_seed[key]
+        self._urdf_paths.pop(uid, None)
+        self._kinematic_uids.pop(uid, None)
         p.removeBody(uid, physicsClientId=self._physics_server_id)
 
     ###
     # Arm related methods
 
-    def solve_ik(self, uid, lid, pos, damping, orn=None):
-        if orn is None:
-            return p.calculateInverseKinematics(
-                uid, lid, targetPosition=pos,
-                jointDamping=tuple(damping),
-                physicsClientId=self._physics_server_id)
+    def configure_ik_cache(self, size=1024, resolution=1e-5,
+                           warm_start=False):
+        """
+        Configure the IK solution cache
+        :param size: maximum number of cached solutions,
+        0 to disable caching
+        :param resolution: quantization step of target pose
+        and joint configuration used as cache key
+        :param warm_start: True to start solving from the last
+        solution of the same end effector instead of the
+        current joint positions. This changes solutions.
+        :return: None
+        """
+        self._ik_cache.clear()
+        self._ik_cache_size = size
+        self._ik_resolution = resolution
+        self._ik_warm_start = warm_start
+
+    def _ik_key(self, *values):
+        """
+        Quantize arrays into a hashable cache key
+        :param values: vectors, None entries are kept
+        :return: tuple key
+        """
+        res = self._ik_resolution
+        return tuple(
+            None if v is None else
+            tuple(np.round(np.asarray(v, dtype=np.float64) / res)
+                  .astype(np.int64).tolist())
+            for v in values)
+
+    def _get_kinematic_uid(self, uid):
+        """
+        Get the kinematic model of a body, loaded on first use
+        :param uid: integer body unique id
+        :return: integer uid in the kinematic engine,
+        None if the body is not loaded from urdf
+        """
+        if uid not in self._kinematic_uids:
+            path = self._urdf_paths.get(uid)
+            kuid = None
+            if path is not None:
+                loaded = self._kinematics.load_asset(
+                    path, (0., 0., 0.), (0., 0., 0., 1.), False)
+                kuid = loaded[0] if loaded else None
+            if kuid is None:
+                logging.warning('No kinematic model of body {}, '
+                                'IK residuals are not computed.'.format(uid))
+            self._kinematic_uids[uid] = kuid
+        return self._kinematic_uids[uid]
+
+    def _ik_residual(self, uid, lid, solution, pos, orn):
+        """
+        Get the error of an IK solution by forward kinematics,
+        without touching the simulation state
+        :return: float position error, plus orientation
+        error if orientation is given. NaN if unknown.
+        """
+        kuid = self._get_kinematic_uid(uid)
+        if kuid is None:
+            return float('nan')
+        base_pos, base_orn = p.getBasePositionAndOrientation(
+            uid, physicsClientId=self._physics_server_id)
+        self._kinematics.set_body_scene_pose(kuid, base_pos, base_orn)
+        pose = self._kinematics.forward_kinematics(
+            kuid, [solution])[0, lid + 1]
+
+        residual = math_util.l2(pose[:3] - math_util.vec(pos))
+        if orn is not None:
+            # Rotation angle between the two quaternions
+            cos = min(abs(float(np.dot(pose[3:], orn))), 1.)
+            residual += 2. * np.arccos(cos)
+        return float(residual)
+
+    def _calculate_ik(self, uid, lid, pos, orn, seed, kwargs):
+        """
+        Call bullet IK, warm started from seed if supported
+        :return: tuple of joint positions
+        """
+        kwargs = dict(kwargs, targetPosition=tuple(pos),
+                      physicsClientId=self._physics_server_id)
+        if orn is not None:
+            kwargs['targetOrientation'] = tuple(orn)
+        if seed is not None and self._ik_extended:
+            try:
+                return p.calculateInverseKinematics(
+                    uid, lid, currentPositions=list(seed), **kwargs)
+            except TypeError:
+                # Older bullet versions always start
+                # from the current joint positions
+                self._ik_extended = False
+        return p.calculateInverseKinematics(uid, lid, **kwargs)
+
+    def _solve_ik(self, uid, lid, pos, orn, kwargs,
+                  info, max_iter, threshold):
+        """
+        Solve IK through the solution cache. On a miss, solve
+        from the current joint positions, or the last solution
+        if warm start is configured, refining until residual
+        is below threshold or max_iter solves are done.
+        :return: joint positions, or tuple (joint positions,
+        residual, iterations) if info
+        """
+        joint_pos = self.get_body_snapshot(
+            [uid], {uid: ()})[uid]['joint_pos']
+        key = (uid, lid, max_iter, threshold,
+               tuple(sorted(kwargs.items()))) + \
+            self._ik_key(pos, orn, joint_pos)
+
+        entry = self._ik_cache.get(key)
+        if entry is not None:
+            self._ik_stats['hits'] += 1
+            if info and entry[1] is None:
+                entry[1] = self._ik_residual(uid, lid, entry[0], pos, orn)
         else:
-            return p.calculateInverseKinematics(
-                uid, lid, targetPosition=pos,
-                targetOrientation=orn, jointDamping=tuple(damping),
-                physicsClientId=self._physics_server_id)
+            self._ik_stats['misses'] += 1
+            seed = self._ik_seed.get((uid, lid)) \
+                if self._ik_warm_start else None
+            solution = self._calculate_ik(
+                uid, lid, pos, orn, seed, kwargs)
+            iterations, residual = 1, None
+            if info or max_iter > 1:
+                residual = self._ik_residual(uid, lid, solution, pos, orn)
+                while residual > threshold and iterations < max_iter:
+                    solution = self._calculate_ik(
+                        uid, lid, pos, orn, solution, kwargs)
+                    residual = self._ik_residual(
+                        uid, lid, solution, pos, orn)
+                    iterations += 1
+            self._ik_stats['iterations'] += iterations
+            self._ik_seed[(uid, lid)] = solution
+
+            entry = [solution, residual, iterations]
+            if self._ik_cache_size > 0:
+                self._ik_cache[key] = entry
+                if len(self._ik_cache) > self._ik_cache_size:
+                    self._ik_cache.popitem(last=False)
+
+        self._ik_stats['residual'] = entry[1]
+        if info:
+            return tuple(entry)
+        return entry[0]
+
+    def solve_ik(self, uid, lid, pos, damping, orn=None,
+                 info=False, max_iter=1, threshold=1e-3):
+        return self._solve_ik(
+            uid, lid, pos, orn,
+            dict(jointDamping=tuple(damping)),
+            info, max_iter, threshold)
 
     def solve_ik_null_space(self, uid, lid, pos,
                             lower, upper, ranges,
-                            rest, damping, orn=None):
-        if orn is None:
-            return p.calculateInverseKinematics(
-                uid, lid,
-                targetPosition=tuple(pos),
-                lowerLimits=tuple(lower), upperLimits=tuple(upper),
-                jointRanges=tuple(ranges), restPoses=tuple(rest),
-                jointDamping=tuple(damping),
-                physicsClientId=self._physics_server_id)   
-        else:
-            return p.calculateInverseKinematics(
-                uid, lid, targetPosition=tuple(pos),
-                targetOrientation=tuple(orn),
-                lowerLimits=tuple(lower), upperLimits=tuple(upper),
-                jointRanges=tuple(ranges), restPoses=tuple(rest),
-                jointDamping=tuple(damping),
+                            rest, damping, orn=None,
+                            info=False, max_iter=1, threshold=1e-3):
+        return self._solve_ik(
+            uid, lid, pos, orn,
+            dict(lowerLimits=tuple(lower), upperLimits=tuple(upper),
+                 jointRanges=tuple(ranges), restPoses=tuple(rest),
+                 jointDamping=tuple(damping)),
+            info, max_iter, threshold)
+
+    def solve_ik_batch(self, uid, lid, targets, damping,
+                       null_space=None, max_iter=1, threshold=1e-3):
+        """
+        Solve IK for a batch of end effector targets through
+        the solution cache, see <configure_ik_cache>.
+        :param uid: integer body unique id
+        :param lid: integer end effector link index
+        :param targets: list of (pos, orn) tuples, orn can be None
+        :param damping: joint damping vector
+        :param null_space: dictionary of null space settings
+        {lower, upper, ranges, rest}, None to not use null space
+        :param max_iter: maximum number of solves per target
+        :param threshold: residual threshold to stop refining
+        :return: tuple (solutions as (N, dof) numpy array,
+        residuals as (N,) array, iterations as (N,) array)
+        """
+        kwargs = dict(jointDamping=tuple(damping))
+        if null_space is not None:
+            kwargs.update(
+                lowerLimits=tuple(null_space['lower']),
+                upperLimits=tuple(null_space['upper']),
+                jointRanges=tuple(null_space['ranges']),
+                restPoses=tuple(null_space['rest']))
+
+        results = [self._solve_ik(uid, lid, pos, orn, kwargs,
+                                  True, max_iter, threshold)
+                   for pos, orn in targets]
+        return (np.array([r[0] for r in results], dtype=np.float64),
+                np.array([r[1] for r in results], dtype=np.float64),
+                np.array([r[2] for r in results], dtype=np.int64))
+
+    @_step_memoized
+    def get_body_operational_model(self, uid, lid, local_pos=(0., 0., 0.)):
+        specs = self._get_model_info(uid)['joint_specs']
+        jids = [jid for jid, jtype in zip(specs['index'], specs['jtype'])
+                if jtype != 'fixed']
+        try:
+            states = p.getJointStates(
+                uid, jids, physicsClientId=self._physics_server_id)
+            q = [s[0] for s in states]
+            dq = [s[1] for s in states]
+            zeros = [0.] * len(jids)
+
+            linear, angular = p.calculateJacobian(
+                uid, lid, list(local_pos), q, dq, zeros,
                 physicsClientId=self._physics_server_id)
+            mass = p.calculateMassMatrix(
+                uid, q, physicsClientId=self._physics_server_id)
+            # Inverse dynamics at zero acceleration
+            bias = p.calculateInverseDynamics(
+                uid, q, dq, zeros, physicsClientId=self._physics_server_id)
+        except p.error as e:
+            self.status = BulletPhysicsEngine._STATUS[-1]
+            self._error_message.append(str(e))
+            logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
+            return None
+
+        return (jids,
+                np.vstack((linear, angular)).astype(np.float64),
+                np.array(mass, dtype=np.float64),
+                np.array(bias, dtype=np.float64),
+                np.array(q, dtype=np.float64),
+                np.array(dq, dtype=np.float64))
 
     def start_engine(self, frame):
 
@@ -672,6 +2126,7 @@ class BulletPhysicsEngine(FakeStateEngine):
                 float(self._step_size),
                 physicsClientId=self._physics_server_id
             )
+            self._apply_solver()
             flag = 0 if self._async else 1
             p.setRealTimeSimulation(flag, physicsClientId=self._physics_server_id)
 
@@ -684,8 +2139,11 @@ class BulletPhysicsEngine(FakeStateEngine):
             return 0
 
     def hold(self, max_steps=30):
+        self._mark_dirty()
         for _ in range(max_steps):
+            self._pre_step()
             p.stepSimulation(self._physics_server_id)
+        self._read_sensors()
 
     def step(self, elapsed_time, step_size):
         if self.status == 'running':
@@ -694,23 +2152,308 @@ class BulletPhysicsEngine(FakeStateEngine):
                         or self._max_run_time == 0:
 
                     # Update model (world) states
+                    self._mark_dirty()
+                    self._pre_step()
                     if step_size:
-                        p.setTimeStep(step_size)
+                        p.setTimeStep(step_size,
+                                      physicsClientId=self._physics_server_id)
                         p.stepSimulation(self._physics_server_id)
                     else:
-                        p.setTimeStep(self._step_size)
+                        p.setTimeStep(self._step_size,
+                                      physicsClientId=self._physics_server_id)
                         p.stepSimulation(self._physics_server_id)
                     self._step_count += 1
+                    self._read_sensors()
                     return False
             else:
                 if elapsed_time < self._max_run_time \
                         or self._max_run_time == 0:
+                    # Bullet steps by itself in real time,
+                    # callbacks run once per control tick
+                    self._pre_step()
+                    self._read_sensors()
                     return False
         return True
 
+    def save_state(self):
+        try:
+            constraints = dict()
+            for i in range(p.getNumConstraints(self._physics_server_id)):
+                cid = p.getConstraintUniqueId(
+                    i, physicsClientId=self._physics_server_id)
+                info = p.getConstraintInfo(
+                    cid, physicsClientId=self._physics_server_id)
+                # Child pivot, child frame orientation, max force
+                constraints[cid] = (info[7], info[9], info[10])
+            return dict(
+                sid=p.saveState(physicsClientId=self._physics_server_id),
+                constraints=constraints,
+                motors=dict((uid, dict(commands)) for uid, commands
+                            in self._motor_commands.items()))
+        except p.error as e:
+            self.status = BulletPhysicsEngine._STATUS[-1]
+            self._error_message.append(str(e))
+            logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
+
+    def restore_state(self, token):
+        self._mark_dirty()
+        try:
+            # Bullet states only hold bodies, so the
+            # constraint set must not have changed since
+            cids = set(p.getConstraintUniqueId(
+                i, physicsClientId=self._physics_server_id)
+                for i in range(p.getNumConstraints(self._physics_server_id)))
+            if cids != set(token['constraints']):
+                logging.warning('Constraints changed since state saved, '
+                                'cannot restore.')
+                return -1
+
+            p.restoreState(
+                stateId=token['sid'],
+                physicsClientId=self._physics_server_id)
+            for cid, (pivot, orn, force) in token['constraints'].items():
+                p.changeConstraint(
+                    cid, jointChildPivot=pivot,
+                    jointChildFrameOrientation=orn,
+                    maxForce=force,
+                    physicsClientId=self._physics_server_id)
+
+            self._motor_commands = dict(
+                (uid, dict(commands)) for uid, commands
+                in token['motors'].items())
+            # Pending commands belong to the discarded state
+            if self._command_buffer is not None:
+                self._command_buffer = dict()
+            self._replay_motor_commands(self._motor_commands)
+            return 0
+        except p.error as e:
+            self.status = BulletPhysicsEngine._STATUS[-1]
+            self._error_message.append(str(e))
+            logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
+            return -1
+
+    # Motor control types in exported states
+    _MOTOR_CODES = ('position', 'velocity', 'torque')
+
+    def export_state(self, uids):
+        num_joints = max([len(self._get_model_info(uid)['joint_info'])
+                          for uid in uids] + [0])
+        base = np.zeros((len(uids), 13))
+        joints = np.full((len(uids), num_joints, 2), np.nan)
+        motors = np.full((len(uids), num_joints, 3), np.nan)
+        try:
+            for i, uid in enumerate(uids):
+                pos, orn = p.getBasePositionAndOrientation(
+                    uid, physicsClientId=self._physics_server_id)
+                v, omega = p.getBaseVelocity(
+                    uid, physicsClientId=self._physics_server_id)
+                base[i] = np.concatenate((pos, orn, v, omega))
+
+                jids = list(range(len(self._get_model_info(uid)['joint_info'])))
+                if jids:
+                    states = p.getJointStates(
+                        uid, jids, physicsClientId=self._physics_server_id)
+                    joints[i, :len(jids)] = [s[:2] for s in states]
+
+                for jid, (ctype, val, kwargs) in \
+                        self._motor_commands.get(uid, dict()).items():
+                    motors[i, jid] = (self._MOTOR_CODES.index(ctype), val,
+                                      kwargs.get('forces', np.nan))
+
+            constraints = list()
+            for i in range(p.getNumConstraints(self._physics_server_id)):
+                cid = p.getConstraintUniqueId(
+                    i, physicsClientId=self._physics_server_id)
+                info = p.getConstraintInfo(
+                    cid, physicsClientId=self._physics_server_id)
+                constraints.append(np.concatenate(
+                    ((cid,), info[7], info[9], (info[10],))))
+        except p.error as e:
+            self.status = BulletPhysicsEngine._STATUS[-1]
+            self._error_message.append(str(e))
+            logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
+            return None
+
+        return dict(base=base, joints=joints, motors=motors,
+                    constraints=np.array(sorted(constraints, key=lambda c: c[0]),
+                                         dtype=np.float64).reshape(-1, 9))
+
+    def import_state(self, uids, state):
+        self._mark_dirty()
+        cids = set(p.getConstraintUniqueId(
+            i, physicsClientId=self._physics_server_id)
+            for i in range(p.getNumConstraints(self._physics_server_id)))
+        if cids != set(int(c) for c in state['constraints'][:, 0]):
+            logging.warning('Constraints differ from exported state, '
+                            'cannot import.')
+            return -1
+        try:
+            for i, uid in enumerate(uids):
+                base = state['base'][i]
+                p.resetBasePositionAndOrientation(
+                    uid, base[:3].tolist(), base[3:7].tolist(),
+                    physicsClientId=self._physics_server_id)
+                p.resetBaseVelocity(
+                    uid, base[7:10].tolist(), base[10:13].tolist(),
+                    physicsClientId=self._physics_server_id)
+
+                num_joints = len(self._get_model_info(uid)['joint_info'])
+                for jid in range(num_joints):
+                    pos, vel = state['joints'][i, jid]
+                    p.resetJointState(
+                        uid, jid, targetValue=pos, targetVelocity=vel,
+                        physicsClientId=self._physics_server_id)
+
+                # Re-issue motor commands grouped like recorded ones
+                commands = dict()
+                for jid in range(num_joints):
+                    code, val, force = state['motors'][i, jid]
+                    if np.isnan(code):
+                        continue
+                    kwargs = dict() if np.isnan(force) else dict(forces=force)
+                    commands[jid] = (self._MOTOR_CODES[int(code)], val, kwargs)
+                self._motor_commands[uid] = commands
+                if self._command_buffer is not None:
+                    self._command_buffer.pop(uid, None)
+                self._replay_motor_commands({uid: commands})
+
+            for cid, pivot, orn, force in (
+                    (int(c[0]), c[1:4], c[4:8], c[8])
+                    for c in state['constraints']):
+                p.changeConstraint(
+                    cid, jointChildPivot=pivot.tolist(),
+                    jointChildFrameOrientation=orn.tolist(),
+                    maxForce=float(force),
+                    physicsClientId=self._physics_server_id)
+            return 0
+        except p.error as e:
+            self.status = BulletPhysicsEngine._STATUS[-1]
+            self._error_message.append(str(e))
+            logging.exception('BulletPhysicsEngine captured exception: ' + str(e))
+            return -1
+
+    def step_n(self, num_steps, callback=None,
+               callback_every=0, use_substeps=False):
+        if self.status != 'running' or not self._async:
+            logging.warning('<step_n> only runs asynchronous simulation.')
+            return True
+
+        if self._max_run_time:
+            num_steps = min(num_steps,
+                            self._max_run_time - self._step_count)
+        chunk = callback_every or num_steps
+        self._mark_dirty()
+
+        steps = 0
+        p.setTimeStep(self._step_size,
+                      physicsClientId=self._physics_server_id)
+        while steps < num_steps:
+            n = min(chunk, num_steps - steps)
+            self._pre_step()
+            if use_substeps and n > 1:
+                # Let the engine run all substeps in one call
+                p.setPhysicsEngineParameter(
+                    fixedTimeStep=self._step_size * n,
+                    numSubSteps=n * max(self._num_substeps, 1),
+                    physicsClientId=self._physics_server_id)
+                p.stepSimulation(self._physics_server_id)
+                p.setPhysicsEngineParameter(
+                    fixedTimeStep=self._step_size,
+                    numSubSteps=self._num_substeps,
+                    physicsClientId=self._physics_server_id)
+            else:
+                for i in range(n):
+                    if i and self._step_callbacks:
+                        self._pre_step()
+                    p.stepSimulation(self._physics_server_id)
+            steps += n
+            self._step_count += n
+            self._read_sensors()
+
+            if callback is not None:
+                self._mark_dirty()
+                callback(self, steps)
+
+        return 0 < self._max_run_time <= self._step_count
+
     def stop(self):
         # Shutdown simulation
+        self._snapshot = dict()
+        self._model_info = dict()
+        self._motor_commands = dict()
+        if self._command_buffer is not None:
+            self._command_buffer = dict()
+        self._step_callbacks = dict()
+        self._marker_pool = dict()
+        self._marker_items = dict()
+        self._ik_cache.clear()
+        self._ik_seed = dict()
+        self._kinematics = KinematicEngine()
+        self._kinematic_uids = dict()
+        self._urdf_paths = dict()
+        self._sensors = list()
+        self._rebuild_sensors()
         p.resetSimulation(self._physics_server_id)
         p.disconnect(self._physics_server_id)
         self.status = 'finished'
         logging.info('Physics physics_engine stopped.')
+
+
+class BulletEnginePool(object):
+    """
+    A pool of Bullet Physics engines inside the current
+    process, each bound to its own DIRECT physics client,
+    so that many independent simulations can be driven
+    without spawning processes.
+    """
+    def __init__(self, size, max_run_time=0, step_size=0.001, solver=None):
+        """
+        Connect the physics clients and create their engines.
+        Engines are always asynchronous (explicitly stepped).
+        :param size: integer number of physics clients
+        :param max_run_time: maximum number of time steps
+        of each engine, 0 for unlimited
+        :param step_size: time step size (float) for each
+        simulation step
+        :param solver: dictionary of solver settings, see
+        <BulletPhysicsEngine.configure_solver>
+        """
+        self._engines = list()
+        for e_id in range(size):
+            client = p.connect(p.DIRECT)
+            if client < 0:
+                logging.error('Cannot connect physics client {} '
+                              'of engine pool.'.format(e_id))
+                break
+            p.resetSimulation(client)
+            self._engines.append(BulletPhysicsEngine(
+                e_id, client, max_run_time, True,
+                step_size, solver=solver))
+
+    def __len__(self):
+        return len(self._engines)
+
+    def __getitem__(self, e_id):
+        return self._engines[e_id]
+
+    def __iter__(self):
+        return iter(self._engines)
+
+    @property
+    def info(self):
+        """
+        Get the info of all engines in the pool
+        :return: list of engine info dictionaries
+        """
+        return [engine.info for engine in self._engines]
+
+    def close(self):
+        """
+        Stop all engines that are not yet stopped
+        and disconnect their physics clients
+        :return: None
+        """
+        for engine in self._engines:
+            if engine.status != 'finished':
+                engine.stop()
+        self._engines = list()
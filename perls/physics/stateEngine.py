@@ -82,3 +82,64 @@ class FakeStateEngine(StateEngine):
         :return: None
         """
         return NotImplemented
+
+    @abc.abstractmethod
+    def configure_solver(self, preset=None, **params):
+        """
+        Configure the physics solver, trading accuracy for
+        throughput. Applied when the engine starts, or
+        immediately if it is already running.
+        :param preset: name string of a solver preset,
+        such as 'fast-training' or 'high-fidelity-demo'
+        :param params: solver settings overriding the preset,
+        num_solver_iterations, num_substeps,
+        contact_breaking_threshold, enable_cone_friction,
+        deterministic_overlapping_pairs, collision_margin
+        :return: 0 if success, -1 if failure
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def configure_command_buffer(self, flag=True):
+        """
+        Turn on/off deferring joint motor commands until
+        the next simulation step, where the last command
+        of each joint in a tick wins.
+        :param flag: boolean, True to enable
+        :return: None
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def set_body_step_callback(self, uid, callback):
+        """
+        Register a function called right before every
+        simulation step, e.g. to send torques that the
+        engine clears after each step.
+        :param uid: integer body unique id owning the callback
+        :param callback: function () -> None, None to remove
+        :return: None
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def configure_asset_cache(self, flag=True, cache_dir=None):
+        """
+        Turn on/off caching of parsed assets, so repeated
+        loads of the same asset file skip re-parsing.
+        :param flag: boolean, True to enable
+        :param cache_dir: directory to persist the cache
+        across processes, None to keep it in memory
+        :return: None
+        """
+        return NotImplemented
+
+    @abc.abstractmethod
+    def preload_assets(self, file_paths, num_threads=4):
+        """
+        Warm up the asset cache for given asset files
+        :param file_paths: list of asset path strings
+        :param num_threads: number of worker threads
+        :return: dictionary of {path: hash string}
+        """
+        return NotImplemented
@@ -86,6 +86,7 @@ class BulletRenderEngine(GraphicsEngine):
 
         self._record_video = video
         self._record_name = task
+        self._record_suffix = ''
         self._replay_delay = 1e-4
 
         self._logging_id = list()
@@ -174,6 +175,19 @@ class BulletRenderEngine(GraphicsEngine):
         """
         return self._record_name
 
+    @property
+    def record_suffix(self):
+        """
+        Get the string appended to the time stamp of
+        record file names, empty for none
+        :return: String
+        """
+        return self._record_suffix
+
+    @record_suffix.setter
+    def record_suffix(self, suffix):
+        self._record_suffix = suffix or ''
+
     @camera.setter
     def camera(self, params):
         if self._frame == 'gui':
@@ -377,6 +391,10 @@ class BulletRenderEngine(GraphicsEngine):
             assert self._record_name, \
                 'Must provide record file name!'
             time_stamp = time_util.get_full_time_stamp()
+            # Runs started within the same second, e.g. by
+            # parallel rollout workers, differ by the suffix
+            if self._record_suffix:
+                time_stamp = '{}_{}'.format(time_stamp, self._record_suffix)
 
             self._base_file_name = '{}.bin'.format(time_stamp)
 
@@ -0,0 +1,368 @@
+"""
+Episode level parallel rollouts. Each worker process owns
+its own physics client and built world, pulls episode jobs
+from a shared queue and streams results back to the parent.
+"""
+
+import logging
+import multiprocessing
+import random
+import time
+import traceback
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+try:
+    from multiprocessing import SimpleQueue
+except ImportError:
+    from multiprocessing.queues import SimpleQueue
+
+import numpy as np
+
+from .control import Controller
+from .utils import io_util
+
+__author__ = 'Julian Gao'
+__email__ = 'julianyg@stanford.edu'
+__license__ = 'private'
+__version__ = '0.1'
+
+
+# Messages sent from workers to the parent
+_JOB_START, _RUN_START, _RESULT = range(3)
+
+
+def _load(config, conf_id):
+    """
+    Build and boot a world without control handler
+    :param config: path string of configuration batch file
+    :param conf_id: integer id of the configuration in file
+    :return: tuple (world, display, configuration)
+    """
+    conf = io_util.parse_config(config)[conf_id]
+
+    # Run time is limited per episode instead of per engine
+    _, world, display, _ = Controller.load_config(
+        conf._replace(max_run_time=0), None)
+    world.boot(display.info['frame'], job=conf.job)
+    return world, display, conf
+
+
+def _run_episode(world, display, conf, policy, action_repeat, suffix):
+    """
+    Run one episode until the task is done or time is up
+    :param suffix: string appended to the record file name
+    :return: tuple (success, score, steps, trajectory path)
+    """
+    world.reset()
+    display.set_record_suffix(suffix)
+    status = display.run([t[1] for t in world.target])
+    if status == -1:
+        raise RuntimeError('Error loading simulation')
+
+    steps, done, success = 0, False, False
+    while not done and (steps < conf.max_run_time
+                        or conf.max_run_time == 0):
+        if policy is not None:
+            policy(world, steps)
+        world.update(num_steps=action_repeat)
+        steps += action_repeat
+        done, success = world.check_states()
+
+    score = world.evaluate()
+    display.close(0 if success else 1)
+
+    trajectory = None
+    if conf.job == 'record':
+        engine_info = display.info['engine']
+        trajectory = io_util.pjoin(
+            engine_info['log_info']['success_trajectory'
+                                    if success else 'fail_trajectory'],
+            engine_info['record_name'])
+    return success, score, steps, trajectory
+
+
+def _worker(worker_id, jobs, results, policy, action_repeat):
+    """
+    Worker process loop, runs queued items until given None
+    :param worker_id: integer id of the worker
+    :param jobs: multiprocessing queue of item tuples
+    (job id, config, conf id, seed, first run, last run),
+    each holding a few runs of a job
+    :param results: multiprocessing simple queue of messages
+    :param policy: function (world, step) -> None, applying
+    scripted actions each tick, None to only run physics
+    :param action_repeat: number of physics steps per tick
+    :return: None
+    """
+    loaded = dict()
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, config, conf_id, seed, first, last = job
+        results.put((_JOB_START, worker_id, job_id, first, last))
+
+        for run in range(first, last):
+            results.put((_RUN_START, worker_id, job_id, run))
+
+            # Seed each run, so a run requeued after a crash
+            # repeats the same episode
+            np.random.seed(seed + run)
+            random.seed(seed + run)
+            result = dict(job=job_id, run=run, seed=seed + run,
+                          worker=worker_id, error=None)
+            try:
+                if (config, conf_id) not in loaded:
+                    for world, _, _ in loaded.values():
+                        world.clean_up()
+                    loaded = {(config, conf_id): _load(config, conf_id)}
+                world, display, conf = loaded[(config, conf_id)]
+                result['success'], result['score'], result['steps'], \
+                    result['trajectory'] = _run_episode(
+                        world, display, conf, policy, action_repeat,
+                        'w{}_r{}_s{}'.format(worker_id, run, seed + run))
+            except Exception:
+                # Rebuild the world for the next run
+                result.update(success=False, score=None, steps=0,
+                              trajectory=None,
+                              error=traceback.format_exc())
+                for world, display, _ in loaded.values():
+                    display.close(-1)
+                    world.clean_up()
+                loaded = dict()
+            results.put((_RESULT, worker_id, job_id, result))
+
+    for world, _, _ in loaded.values():
+        world.clean_up()
+
+
+class RolloutManager(object):
+
+    def __init__(self, num_workers=None, policy=None, action_repeat=1,
+                 chunk_size=1):
+        """
+        Initialize the rollout manager
+        :param num_workers: integer number of worker
+        processes, default is one per core
+        :param policy: function (world, step) -> None applying
+        scripted actions each tick, must be picklable
+        :param action_repeat: number of physics steps per tick
+        :param chunk_size: integer number of runs per queued
+        item, so that free workers share the runs of a job
+        """
+        self._num_workers = num_workers or multiprocessing.cpu_count()
+        self._policy = policy
+        self._action_repeat = action_repeat
+        self._chunk_size = max(int(chunk_size), 1)
+
+        self._jobs = multiprocessing.Queue()
+        # Results are written to the pipe at once, so they
+        # are not lost in a buffer when a worker crashes
+        self._results = SimpleQueue()
+        self._workers = dict()
+
+        # Job tuples by id, the runs not yet reported,
+        # the last (job, first, last) item each worker
+        # took and the (job, run) each worker is running
+        self._job_specs = dict()
+        self._pending = dict()
+        self._taken = dict()
+        self._running = dict()
+        self._next_id = 0
+        self._restarts = 0
+
+    @property
+    def info(self):
+        """
+        Get the status of the manager
+        :return: dictionary of {workers, pending runs,
+        running runs, restarts}
+        """
+        return dict(
+            workers=sum(w.is_alive() for w in self._workers.values()),
+            pending=sum(len(runs) for runs in self._pending.values()),
+            running=len(self._running),
+            restarts=self._restarts)
+
+    def _spawn(self, worker_id):
+        worker = multiprocessing.Process(
+            target=_worker,
+            args=(worker_id, self._jobs, self._results,
+                  self._policy, self._action_repeat))
+        worker.daemon = True
+        worker.start()
+        self._workers[worker_id] = worker
+
+    def start(self):
+        """
+        Start the worker processes
+        :return: None
+        """
+        for worker_id in range(self._num_workers):
+            if worker_id not in self._workers:
+                self._spawn(worker_id)
+
+    def submit(self, config, seed=0, num_runs=1, conf_id=0):
+        """
+        Queue an episode job, split into items of chunk
+        size runs that free workers take in turn
+        :param config: path string of configuration batch file,
+        the configuration must run asynchronous simulation
+        :param seed: integer seed of the first run, following
+        runs are seeded incrementally
+        :param num_runs: integer number of episodes
+        :param conf_id: integer id of the configuration in file
+        :return: integer job id
+        """
+        job_id = self._next_id
+        self._next_id += 1
+        self._job_specs[job_id] = (config, conf_id, seed)
+        self._pending[job_id] = set(range(num_runs))
+        for first in range(0, num_runs, self._chunk_size):
+            self._jobs.put((job_id, config, conf_id, seed, first,
+                            min(first + self._chunk_size, num_runs)))
+        return job_id
+
+    def _receive(self, timeout):
+        """
+        Handle one message from workers
+        :param timeout: float seconds to wait, None to not block
+        :return: result dictionary, None if the message is
+        not a new result
+        :raise Empty: if there is no message
+        """
+        deadline = time.time() + (timeout or 0.)
+        while self._results.empty():
+            if time.time() >= deadline:
+                raise Empty
+            time.sleep(0.001)
+        message = self._results.get()
+
+        kind, worker_id, job_id = message[:3]
+        if kind == _JOB_START:
+            self._taken[worker_id] = (job_id,) + tuple(message[3:])
+            return None
+        if kind == _RUN_START:
+            self._running[worker_id] = (job_id, message[3])
+            return None
+
+        result = message[3]
+        if self._running.get(worker_id) == (job_id, result['run']):
+            del self._running[worker_id]
+        runs = self._pending.get(job_id, ())
+        if result['run'] not in runs:
+            # Already reported before a crash
+            return None
+        runs.discard(result['run'])
+        if not runs:
+            del self._pending[job_id]
+        return result
+
+    def _recover(self):
+        """
+        Restart dead workers and requeue the runs they left
+        :return: list of result dictionaries, received before
+        the check, and of crashed runs
+        """
+        dead = [worker_id for worker_id, worker in self._workers.items()
+                if not worker.is_alive()]
+        if not dead:
+            return list()
+
+        # Take in what dead workers sent before they died
+        received = list()
+        while True:
+            try:
+                result = self._receive(None)
+            except Empty:
+                break
+            if result is not None:
+                received.append(result)
+
+        requeue = list()
+        for worker_id in dead:
+            exitcode = self._workers[worker_id].exitcode
+            logging.warning('Rollout worker {} died with exit code {}, '
+                            'restarting.'.format(worker_id, exitcode))
+            self._restarts += 1
+            self._spawn(worker_id)
+
+            job_id, run = self._running.pop(worker_id, (None, None))
+            runs = self._pending.get(job_id, set())
+            if run in runs:
+                # Fail the run that crashed
+                runs.discard(run)
+                if not runs:
+                    del self._pending[job_id]
+                received.append(dict(
+                    job=job_id, run=run,
+                    seed=self._job_specs[job_id][2] + run,
+                    worker=worker_id, success=False, score=None,
+                    steps=0, trajectory=None,
+                    error='Worker crashed with exit code {}'.format(
+                        exitcode)))
+
+            # Rerun what is left of the item the worker took.
+            # Other items of the job are still queued or run
+            # by other workers.
+            taken = self._taken.pop(worker_id, None)
+            if taken is None:
+                continue
+            job_id, first, last = taken
+            requeue.extend((job_id, r) for r in range(first, last)
+                           if r in self._pending.get(job_id, ()))
+
+        for job_id, run in requeue:
+            config, conf_id, seed = self._job_specs[job_id]
+            self._jobs.put((job_id, config, conf_id, seed, run, run + 1))
+        return received
+
+    def results(self, poll_interval=1.):
+        """
+        Stream results until all submitted runs are reported
+        :param poll_interval: float seconds between checks
+        for crashed workers
+        :return: generator of result dictionaries of
+        {job, run, seed, worker, success, score, steps,
+        trajectory, error}, where error is None or the
+        traceback string of a failed run
+        """
+        last_check = time.time()
+        while self._pending:
+            if time.time() - last_check > poll_interval:
+                last_check = time.time()
+                for result in self._recover():
+                    yield result
+                continue
+            try:
+                result = self._receive(poll_interval)
+            except Empty:
+                continue
+            if result is not None:
+                yield result
+
+    def run(self, jobs):
+        """
+        Run a batch of jobs to completion
+        :param jobs: list of (config, seed, num_runs) tuples
+        :return: list of result dictionaries, see <results>
+        """
+        self.start()
+        for config, seed, num_runs in jobs:
+            self.submit(config, seed, num_runs)
+        return list(self.results())
+
+    def close(self):
+        """
+        Stop the worker processes
+        :return: None
+        """
+        for _ in self._workers:
+            self._jobs.put(None)
+        for worker in self._workers.values():
+            worker.join(timeout=5.)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = dict()
@@ -0,0 +1,178 @@
+"""
+Channel passing control signals from control handlers to
+the control loop. Handlers tick in a thread of the same
+process, so signals are handed over as plain references.
+Shared memory is only used for producers in other processes.
+"""
+
+import collections
+import logging
+import multiprocessing
+import threading
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+# Size in bytes of the shared slot of latest value channels
+_SHARED_SLOT_SIZE = 1 << 16
+
+
+class ControlChannel(object):
+
+    MODES = ('latest', 'fifo')
+
+    def __init__(self, mode='latest', maxsize=8, merge=None, shared=False):
+        """
+        Initialize an empty channel
+        :param mode: 'latest' to keep only the newest pending
+        signal, 'fifo' to keep up to maxsize signals in order,
+        dropping the oldest when full
+        :param maxsize: integer capacity of fifo channels
+        :param merge: function (older, newer) -> signal, called
+        when a pending signal is replaced in latest mode, e.g. to
+        carry over one-shot instructions. None to discard older.
+        :param shared: True if signals are put by another
+        process, so that they go through shared memory
+        """
+        if mode not in self.MODES:
+            raise ValueError('Unknown channel mode {}'.format(mode))
+        self._mode = mode
+        self._maxsize = 1 if mode == 'latest' else max(int(maxsize), 1)
+        self._merge = merge
+        self._shared = shared
+
+        if shared:
+            self._lock = multiprocessing.Lock()
+            # put, got, dropped, coalesced
+            self._counts = multiprocessing.Array('l', 4, lock=False)
+            if mode == 'latest':
+                self._slot = multiprocessing.Array(
+                    'c', _SHARED_SLOT_SIZE, lock=False)
+                self._slot_len = multiprocessing.Value('l', 0, lock=False)
+            else:
+                self._pipe = multiprocessing.Queue()
+                self._pending = multiprocessing.Value('l', 0, lock=False)
+        else:
+            self._lock = threading.Lock()
+            self._counts = [0] * 4
+            self._buffer = collections.deque()
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def stats(self):
+        """
+        Get the signal counters of the channel
+        :return: dictionary of {put, got, dropped, coalesced},
+        where dropped signals were pushed out of a full fifo
+        and coalesced ones replaced by a newer latest value
+        """
+        with self._lock:
+            return dict(zip(('put', 'got', 'dropped', 'coalesced'),
+                            list(self._counts)))
+
+    def empty(self):
+        """
+        Check if there is no pending signal
+        :return: boolean
+        """
+        if not self._shared:
+            return not self._buffer
+        if self._mode == 'latest':
+            return self._slot_len.value == 0
+        return self._pending.value == 0
+
+    def put(self, signal):
+        """
+        Hand over a signal, never blocks on the consumer
+        :param signal: signal dictionary
+        :return: None
+        """
+        with self._lock:
+            self._counts[0] += 1
+            if self._shared:
+                self._put_shared(signal)
+            elif self._mode == 'latest' and self._buffer:
+                older = self._buffer.pop()
+                self._buffer.append(self._merge(older, signal)
+                                    if self._merge else signal)
+                self._counts[3] += 1
+            else:
+                if len(self._buffer) == self._maxsize:
+                    self._buffer.popleft()
+                    self._counts[2] += 1
+                self._buffer.append(signal)
+
+    def _put_shared(self, signal):
+        """
+        Put a signal through shared memory, lock held
+        :return: None
+        """
+        if self._mode == 'fifo':
+            if self._pending.value == self._maxsize:
+                self._pipe.get()
+                self._pending.value -= 1
+                self._counts[2] += 1
+            self._pipe.put(signal)
+            self._pending.value += 1
+            return
+
+        if self._slot_len.value:
+            if self._merge:
+                signal = self._merge(
+                    pickle.loads(self._slot.raw[:self._slot_len.value]),
+                    signal)
+            self._counts[3] += 1
+        data = pickle.dumps(signal, pickle.HIGHEST_PROTOCOL)
+        if len(data) > _SHARED_SLOT_SIZE:
+            logging.warning('Signal of {} bytes does not fit '
+                            'in the channel, dropped.'.format(len(data)))
+            self._counts[2] += 1
+            return
+        self._slot[:len(data)] = data
+        self._slot_len.value = len(data)
+
+    def _take(self):
+        """
+        Pop the next pending signal, lock held
+        :return: signal dictionary, None if empty
+        """
+        if not self._shared:
+            return self._buffer.popleft() if self._buffer else None
+        if self._mode == 'latest':
+            if not self._slot_len.value:
+                return None
+            signal = pickle.loads(self._slot.raw[:self._slot_len.value])
+            self._slot_len.value = 0
+            return signal
+        if not self._pending.value:
+            return None
+        self._pending.value -= 1
+        return self._pipe.get()
+
+    def get(self):
+        """
+        Take the next pending signal
+        :return: signal dictionary, None if empty
+        """
+        if self.empty():
+            return None
+        with self._lock:
+            signal = self._take()
+            if signal is not None:
+                self._counts[1] += 1
+        return signal
+
+    def clear(self):
+        """
+        Discard all pending signals, counted as dropped
+        :return: None
+        """
+        with self._lock:
+            while self._take() is not None:
+                self._counts[2] += 1
@@ -147,13 +147,41 @@ _config_tree = collections.namedtuple(
      'min_version', 'job', 'video',
      'async', 'step_size', 'max_run_time', 'log',
      'control_type', 'sensitivity',
-     'rate', 'disp_info', 'replay_name'])
+     'rate', 'disp_info', 'replay_name', 'solver',
+     'asset_cache', 'command_buffer', 'lockstep',
+     'channel', 'channel_size'])
 
 
 def str2bool(string):
     return string.lower() == 'true'
 
 
+# Solver settings in <solver> element and their types
+_solver_attrib_types = dict(
+    num_solver_iterations=int,
+    num_substeps=int,
+    contact_breaking_threshold=float,
+    enable_cone_friction=str2bool,
+    deterministic_overlapping_pairs=str2bool,
+    collision_margin=float
+)
+
+
+def parse_joint_list(string):
+    """
+    Parse a joint selection attribute
+    :param string: 'all', or space separated joint indices,
+    None or empty for no joints
+    :return: None for all joints, list of integers otherwise,
+    empty list for no joints
+    """
+    if not string:
+        return []
+    if string.strip().lower() == 'all':
+        return None
+    return [int(j) for j in string.split()]
+
+
 def pjoin(*fname):
 
     return os.path.abspath(os.path.join(*fname))
@@ -278,6 +306,32 @@ def parse_env(file_path):
     return tree
 
 
+def list_env_assets(tree):
+    """
+    Collect the asset file paths referred by a parsed
+    environment, including attachments. Tools using
+    their default assets are not listed.
+    :param tree: environment tree from parse_env
+    :return: list of path strings
+    """
+    paths = list()
+
+    def _collect(spec):
+        if spec and spec.get('path'):
+            paths.append(spec['path'])
+        for attach in (spec or dict()).get('attach') or []:
+            _collect(attach)
+
+    for gripper in tree.gripper:
+        _collect(gripper)
+    for arm in tree.arm:
+        _collect(arm)
+        _collect(arm['gripper'])
+    for body in tree.scene:
+        _collect(body)
+    return paths
+
+
 def parse_gripper_elem(gripper_elem):
     """
     Parse given gripper xml tree elements.
@@ -317,7 +371,8 @@ def parse_gripper_elem(gripper_elem):
                 # ID refers to controll id
                 name='{}_{}'.format(elem.attrib['name'], tid),
                 fixed=str2bool(elem.attrib.get('fixed', 'False')),
-                traction=float(elem.attrib.get('traction', 200.))
+                traction=float(elem.attrib.get('traction', 200.)),
+                ft_sensor=parse_joint_list(elem.attrib.get('ft_sensor'))
             ))
     return gripper
 
@@ -362,6 +417,7 @@ def parse_arm_elem(arm_elem):
                 name='{}_{}'.format(elem.attrib['name'], tid),
                 collision_checking=str2bool(elem.attrib.get('collision_checking', 'False')),
                 gripper=gripper,
+                ft_sensor=parse_joint_list(elem.attrib.get('ft_sensor')),
             )
         )
     return arm
@@ -391,6 +447,7 @@ def parse_body_elem(body_elem):
                      f in orn.text.split(' ')] if
                 orn is not None else (0., 0., 0., 1.),
                 fixed=str2bool(elem.attrib.get('fixed', 'False')),
+                ft_sensor=parse_joint_list(elem.attrib.get('ft_sensor')),
                 # Default id is 0 since first time for each new entity
                 name='{}_{}'.format(elem.attrib['name'],
                                     asset.attrib.get('id', 0))
@@ -478,6 +535,7 @@ def parse_config(file_path):
         graphics_engine = graphics_attrib.get('render', 'bullet')
 
         min_version = physics_attrib.get('version', '20170101')
+        asset_cache = str2bool(physics_attrib.get('asset_cache', 'False'))
 
         display_name = graphics_attrib['name']
         replay_name = job_attrib.get('replay_path', '')
@@ -502,15 +560,39 @@ def parse_config(file_path):
         video = str2bool(job_attrib.get('video', 'False'))
         log_path = job_attrib.get('log_path', '')
 
-        async = str2bool(property_attrib.get('async', 'False'))
+        # Lockstep control advances physics by whole steps
+        # each control tick, instead of bullet real time
+        lockstep = str2bool(control_attrib.get('lockstep', 'False'))
+
+        async = lockstep or str2bool(property_attrib.get('async', 'False'))
         step_size = float(property_attrib.get(
             'step_size', 0.001)) if async else None
         max_run_time = int(float(property_attrib.get(
             'max_run_time', 300)))
+        if lockstep:
+            # Run time is given in seconds, count it in steps
+            max_run_time = int(max_run_time / step_size)
+        command_buffer = str2bool(property_attrib.get(
+            'command_buffer', 'False'))
 
         control_type = control_attrib['type'].lower()
         sensitivity = float(control_attrib.get('sensitivity', 1.))
         rate = int(control_attrib.get('rate', 100))
+        channel = control_attrib.get('channel', 'latest').lower()
+        channel_size = int(control_attrib.get('buffer', 8))
+
+        # Optional physics solver settings
+        solver = dict()
+        solver_elem = conf.find('./build/solver')
+        if solver_elem is not None:
+            for key, value in solver_elem.attrib.items():
+                if key == 'preset':
+                    solver[key] = value.lower()
+                elif key in _solver_attrib_types:
+                    solver[key] = _solver_attrib_types[key](value)
+                else:
+                    logging.warning('Ignoring unknown solver '
+                                    'setting {}'.format(key))
 
         # Append one configuration
         trees.append(
@@ -520,6 +602,7 @@ def parse_config(file_path):
                 min_version, job, video,
                 async, step_size, max_run_time, log_path,
                 control_type, sensitivity, rate,
-                disp_info, replay_name)
+                disp_info, replay_name, solver, asset_cache,
+                command_buffer, lockstep, channel, channel_size)
         )
     return trees
@@ -5,6 +5,7 @@ import pybullet as p
 from .math_util import get_relative_pose, vec
 from .io_util import parse_log, parse_config, PerlsLogger
 from ..control import Controller
+from ..physics.physicsEngine import KinematicEngine
 import numpy as np
 # import cv2
 # from PIL import Image
@@ -46,6 +47,12 @@ class Postprocess:
         self.table = world.body['table_0']
         self.cube = world.body['cube_0']
 
+        # Robot kinematics for converting logged joint
+        # positions to end effector poses in batch
+        self.kinematics = KinematicEngine()
+        self.kinematics_uid, _, _ = self.kinematics.load_asset(
+            self.robot.model_path, self.robot.pos, self.robot.orn, True)
+
         self.object_map = {4: "cube_0", 1: "titan_0", 0: 'bax_0'}
         self.object_ids = [int(x) for x in self.object_map.keys()]
         self.object_names = self.object_map.values()
@@ -206,6 +213,14 @@ class Postprocess:
 
         logging.info("Using robot pose: {}".format(self.robot.pose))
 
+        # Robot frame poses in world frame, and end effector
+        # poses in robot frame, of all samples at once
+        robot_poses = self.kinematics.forward_kinematics(
+            self.kinematics_uid, robot_log[:, 3:10])[:, 1]
+        eef_poses = self.kinematics.forward_kinematics(
+            self.kinematics_uid, robot_log[:, 3:10],
+            ref_lid=0)[:, self.robot.active_joints[-1] + 1]
+
         for i in range(1, num_elems):
 
             # timestamp_elem = robot_log[i, 1]
@@ -218,21 +233,25 @@ class Postprocess:
 
             gripper_joints = gripper_log[i, 10:]
 
-            for j in range(7):
-                p.resetJointState(1, j, joint_pos_elem[j])
+            cube_pose_elem = (cube_log[i, 3:6], cube_log[i, 6:10])
 
-            for k in range(5):
-                p.resetJointState(0, k, gripper_joints[k])
+            # Only rendering needs the simulated scene in sync
+            if self.state_dim != 'low':
+                for j in range(7):
+                    p.resetJointState(1, j, joint_pos_elem[j])
 
-            cube_pose_elem = (cube_log[i, 3:6], cube_log[i, 6:10])
-            p.resetBasePositionAndOrientation(4, *cube_pose_elem)
-            p.resetBasePositionAndOrientation(0, gripper_pos, gripper_orn)
+                for k in range(5):
+                    p.resetJointState(0, k, gripper_joints[k])
+
+                p.resetBasePositionAndOrientation(4, *cube_pose_elem)
+                p.resetBasePositionAndOrientation(0, gripper_pos, gripper_orn)
 
             # convert from world frame to robot frame
             cube_pose_pos_elem, cube_pose_orn_elem = \
-                get_relative_pose(cube_pose_elem, self.robot.pose)
+                get_relative_pose(cube_pose_elem,
+                                  (robot_poses[i, :3], robot_poses[i, 3:]))
             eef_pose_pos_elem, eef_pose_orn_elem = \
-                get_relative_pose(self.robot.eef_pose, self.robot.pose)
+                eef_poses[i, :3], eef_poses[i, 3:]
 
             # filter on eef positions being similar (user didn't move) and cube falling
             if (i != 1) and (np.all(np.absolute(np.array(eef_pose_pos_elem) - np.array(prev_eef_pose_pos)) < 1e-5) \
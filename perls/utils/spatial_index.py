@@ -0,0 +1,233 @@
+"""
+Uniform grid index of axis aligned bounding boxes (AABBs),
+for region, radius and nearest neighbor queries over scene
+bodies without scanning all of them.
+"""
+
+import numpy as np
+
+
+class GridIndex(object):
+
+    def __init__(self, cell_size=0.1, max_cells=64):
+        """
+        Initialize an empty index
+        :param cell_size: float edge length of grid cells
+        :param max_cells: boxes spanning more cells than this,
+        e.g. ground planes, are kept aside and checked
+        on every query instead of being gridded
+        """
+        self._cell = float(cell_size)
+        self._max_cells = max_cells
+
+        # Boxes are stored in rows of growing arrays,
+        # freed rows are reused
+        self._keys = list()
+        self._rows = dict()
+        self._free = list()
+        self._lower = np.zeros((0, 3), dtype=np.float64)
+        self._upper = np.zeros((0, 3), dtype=np.float64)
+
+        self._grid = dict()
+        self._cells = dict()
+        self._oversized = set()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    @property
+    def keys(self):
+        """
+        Get the keys of all indexed boxes
+        :return: list of keys
+        """
+        return list(self._rows.keys())
+
+    def _cell_range(self, lower, upper):
+        """
+        Get the integer cell bounds covering a box
+        :return: tuple of (low, high) int arrays, inclusive
+        """
+        return (np.floor(np.asarray(lower) / self._cell).astype(int),
+                np.floor(np.asarray(upper) / self._cell).astype(int))
+
+    def _cover(self, lower, upper):
+        """
+        Get the cells covering a box
+        :return: list of cell tuples, None if oversized
+        """
+        low, high = self._cell_range(lower, upper)
+        if np.prod(high - low + 1) > self._max_cells:
+            return None
+        return list(self._cover_all(low, high))
+
+    @staticmethod
+    def _cover_all(low, high):
+        """
+        Iterate over cells between integer cell bounds
+        :return: generator of cell tuples
+        """
+        return ((x, y, z)
+                for x in range(low[0], high[0] + 1)
+                for y in range(low[1], high[1] + 1)
+                for z in range(low[2], high[2] + 1))
+
+    def update(self, key, lower, upper):
+        """
+        Insert a box or move an indexed box
+        :param key: hashable key, e.g. (body name, link index)
+        :param lower: vec3 float lower corner
+        :param upper: vec3 float upper corner
+        :return: None
+        """
+        row = self._rows.get(key)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+                self._keys[row] = key
+            else:
+                row = len(self._keys)
+                self._keys.append(key)
+                self._lower = np.vstack((self._lower, np.zeros((1, 3))))
+                self._upper = np.vstack((self._upper, np.zeros((1, 3))))
+            self._rows[key] = row
+            old = ()
+        else:
+            # Regrid only if the box crosses cell borders
+            if np.array_equal(self._cell_range(lower, upper),
+                              self._cell_range(self._lower[row],
+                                               self._upper[row])):
+                self._lower[row], self._upper[row] = lower, upper
+                return
+            old = self._cells.pop(row, None)
+            if old is None:
+                self._oversized.discard(row)
+                old = ()
+
+        self._lower[row], self._upper[row] = lower, upper
+        for cell in old:
+            bucket = self._grid[cell]
+            bucket.discard(row)
+            if not bucket:
+                del self._grid[cell]
+
+        cells = self._cover(lower, upper)
+        if cells is None:
+            self._oversized.add(row)
+        else:
+            self._cells[row] = cells
+            for cell in cells:
+                self._grid.setdefault(cell, set()).add(row)
+
+    def remove(self, key):
+        """
+        Remove a box from the index
+        :param key: key of the box
+        :return: None
+        """
+        row = self._rows.pop(key, None)
+        if row is None:
+            return
+        for cell in self._cells.pop(row, ()):
+            bucket = self._grid[cell]
+            bucket.discard(row)
+            if not bucket:
+                del self._grid[cell]
+        self._oversized.discard(row)
+        self._keys[row] = None
+        self._free.append(row)
+
+    def clear(self):
+        """
+        Remove all boxes
+        :return: None
+        """
+        self._keys, self._rows, self._free = list(), dict(), list()
+        self._lower = np.zeros((0, 3), dtype=np.float64)
+        self._upper = np.zeros((0, 3), dtype=np.float64)
+        self._grid, self._cells = dict(), dict()
+        self._oversized = set()
+
+    def _candidates(self, lower, upper):
+        """
+        Get the rows of boxes in cells touched by a query box
+        :return: int array of rows
+        """
+        rows = set(self._oversized)
+        low, high = self._cell_range(lower, upper)
+        if np.prod(high - low + 1) > len(self._grid):
+            # Query larger than the occupied cells
+            for cell, bucket in self._grid.items():
+                if np.all(cell >= low) and np.all(cell <= high):
+                    rows.update(bucket)
+        else:
+            for cell in self._cover_all(low, high):
+                rows.update(self._grid.get(cell, ()))
+        return np.fromiter(rows, dtype=int, count=len(rows))
+
+    def _distances(self, rows, point):
+        """
+        Distance from a point to boxes, 0 for points inside
+        :return: float array aligned with rows
+        """
+        point = np.asarray(point, dtype=np.float64)
+        gap = np.maximum(self._lower[rows] - point,
+                         point - self._upper[rows])
+        return np.linalg.norm(np.maximum(gap, 0.), axis=1)
+
+    def query_region(self, lower, upper):
+        """
+        Find boxes overlapping a region
+        :param lower: vec3 float lower corner of region
+        :param upper: vec3 float upper corner of region
+        :return: list of keys
+        """
+        rows = self._candidates(lower, upper)
+        hit = np.all((self._lower[rows] <= upper) &
+                     (self._upper[rows] >= lower), axis=1)
+        return [self._keys[row] for row in sorted(rows[hit])]
+
+    def query_radius(self, point, radius):
+        """
+        Find boxes within a distance of a point
+        :param point: vec3 float query point
+        :param radius: float distance
+        :return: list of (key, distance) tuples, nearest first
+        """
+        point = np.asarray(point, dtype=np.float64)
+        rows = self._candidates(point - radius, point + radius)
+        dist = self._distances(rows, point)
+        order = np.argsort(dist, kind='mergesort')
+        return [(self._keys[rows[i]], float(dist[i]))
+                for i in order if dist[i] <= radius]
+
+    def query_nearest(self, point, k=1):
+        """
+        Find the k boxes nearest to a point
+        :param point: vec3 float query point
+        :param k: integer number of boxes
+        :return: list of (key, distance) tuples, nearest first
+        """
+        k = min(k, len(self._rows))
+        if k <= 0:
+            return list()
+        point = np.asarray(point, dtype=np.float64)
+        rows = np.fromiter(self._rows.values(), dtype=int,
+                           count=len(self._rows))
+        # Radius reaching all boxes
+        corner = np.maximum(np.abs(self._lower[rows].min(axis=0) - point),
+                            np.abs(self._upper[rows].max(axis=0) - point))
+        reach = float(np.linalg.norm(corner))
+
+        # Grow the search radius until k boxes are found,
+        # boxes farther than the radius cannot be nearer
+        radius = self._cell
+        while radius < reach:
+            found = self.query_radius(point, radius)
+            if len(found) >= k:
+                return found[:k]
+            radius *= 2.
+        return self.query_radius(point, reach)[:k]
@@ -0,0 +1,127 @@
+"""
+Library of pre-settled world start states on disk. States
+are stored in one numpy structured array file, loaded memory
+mapped so that processes on the same host share its pages,
+with a json file describing the layout.
+"""
+
+import json
+import os
+import os.path as osp
+
+import numpy as np
+
+
+# Engine state arrays stored for each entry
+_ENGINE_FIELDS = ('base', 'joints', 'motors', 'constraints')
+
+
+def pack_checker_state(state):
+    """
+    Flatten the numerical task checker states into a vector
+    :param state: dictionary of checker states
+    :return: tuple (float vector, layout list of [key, shape])
+    """
+    values, layout = list(), list()
+    for key in sorted(state):
+        value = np.asarray(state[key])
+        if value.dtype.kind not in 'biuf':
+            continue
+        values.append(value.astype(np.float64).ravel())
+        layout.append([key, list(value.shape)])
+    vector = np.concatenate(values) if values else np.zeros(0)
+    return vector, layout
+
+
+def unpack_checker_state(vector, layout):
+    """
+    Rebuild the task checker states from a flat vector
+    :param vector: float vector given by <pack_checker_state>
+    :param layout: layout list given by <pack_checker_state>
+    :return: dictionary of checker states
+    """
+    state, start = dict(), 0
+    for key, shape in layout:
+        size = int(np.prod(shape))
+        value = np.array(vector[start:start + size]).reshape(shape)
+        state[key] = float(value) if not shape else value
+        start += size
+    return state
+
+
+def write_library(path, entries, meta):
+    """
+    Write start states to disk
+    :param path: file path string without extension,
+    <path>.npy and <path>.json are written
+    :param entries: list of state dictionaries, each holding
+    the engine state arrays and a 'checker' vector
+    :param meta: dictionary of layout info, e.g. body names
+    and checker layout, stored as json
+    :return: None
+    """
+    first = entries[0]
+    dtype = np.dtype([(field, np.float64, first[field].shape)
+                      for field in _ENGINE_FIELDS + ('checker',)])
+    records = np.zeros(len(entries), dtype=dtype)
+    for i, entry in enumerate(entries):
+        for field in dtype.names:
+            records[i][field] = entry[field]
+
+    directory = osp.dirname(osp.abspath(path))
+    if not osp.exists(directory):
+        os.makedirs(directory)
+
+    # Write aside and move, so readers never map a partial file
+    np.save(path + '.tmp.npy', records)
+    os.rename(path + '.tmp.npy', path + '.npy')
+    with open(path + '.json', 'w') as f:
+        json.dump(dict(meta, size=len(entries)), f, indent=2)
+
+
+class StateLibrary(object):
+
+    def __init__(self, path):
+        """
+        Open a library of start states
+        :param path: file path string without extension
+        """
+        with open(path + '.json') as f:
+            self._meta = json.load(f)
+        self._records = np.load(path + '.npy', mmap_mode='r')
+        self._path = path
+
+    def __len__(self):
+        return len(self._records)
+
+    def __getitem__(self, index):
+        """
+        Get one start state, copied out of the mapped file
+        :param index: integer entry index
+        :return: dictionary of engine state arrays, with
+        'checker' holding the unpacked checker states
+        """
+        record = self._records[index]
+        entry = dict((field, np.array(record[field]))
+                     for field in _ENGINE_FIELDS)
+        entry['checker'] = unpack_checker_state(
+            record['checker'], self._meta['checker_layout'])
+        return entry
+
+    @property
+    def meta(self):
+        """
+        Get the layout info of the library
+        :return: dictionary, including body names and size
+        """
+        return self._meta
+
+    def sample(self, random_state=None):
+        """
+        Draw a random start state
+        :param random_state: numpy RandomState, None for
+        the global random state
+        :return: start state dictionary, see <__getitem__>
+        """
+        random_state = random_state or np.random
+        return self[random_state.randint(len(self._records))]
@@ -1,6 +1,13 @@
+import json
 import time
 from threading import Thread, Event
 
+import numpy as np
+
+# Monotonic clock for scheduling, unaffected by
+# system time changes
+_clock = getattr(time, 'monotonic', time.time)
+
 
 class Timer(Thread):
 
@@ -46,6 +53,178 @@ class Timer(Thread):
                         time.sleep(self._interval - interval)
 
 
+class RateScheduler(object):
+
+    def __init__(self, rate):
+        """
+        Pace a loop at a fixed rate on a monotonic clock
+        :param rate: float ticks per second
+        """
+        self._period = 1. / rate
+        self._deadline = None
+        self._last = None
+        self._stats = dict()
+        self.reset_stats()
+
+    @property
+    def period(self):
+        """
+        Get the tick period
+        :return: float seconds
+        """
+        return self._period
+
+    @property
+    def stats(self):
+        """
+        Get the timing statistics since last reset
+        :return: dictionary of {ticks, overruns, skipped,
+        jitter_mean, jitter_max}, where overruns are ticks
+        whose work ran past the deadline, skipped are
+        deadlines dropped to catch up, and jitter is the
+        wake up delay after deadlines in seconds
+        """
+        stats = dict(self._stats)
+        total = stats.pop('jitter_sum')
+        stats['jitter_mean'] = total / max(stats['ticks'], 1)
+        return stats
+
+    def reset_stats(self):
+        """
+        Clear the timing statistics
+        :return: None
+        """
+        self._stats.update(ticks=0, overruns=0, skipped=0,
+                           jitter_sum=0., jitter_max=0.)
+
+    def start(self):
+        """
+        Start counting deadlines from now
+        :return: None
+        """
+        self._last = _clock()
+        self._deadline = self._last + self._period
+
+    def wait(self):
+        """
+        Sleep until the next deadline. Overrunning ticks
+        return at once, and if more than a period behind,
+        missed deadlines are dropped rather than run in a burst.
+        :return: float seconds since the last tick
+        """
+        if self._deadline is None:
+            self.start()
+
+        now = _clock()
+        lag = now - self._deadline
+        if lag < 0:
+            time.sleep(-lag)
+            now = _clock()
+            jitter = max(now - self._deadline, 0.)
+            self._deadline += self._period
+        else:
+            self._stats['overruns'] += 1
+            jitter = 0.
+            missed = int(lag // self._period)
+            self._stats['skipped'] += missed
+            self._deadline += self._period * (missed + 1)
+
+        self._stats['ticks'] += 1
+        self._stats['jitter_sum'] += jitter
+        self._stats['jitter_max'] = max(self._stats['jitter_max'], jitter)
+
+        elapsed, self._last = now - self._last, now
+        return elapsed
+
+
+class PhaseTimer(object):
+
+    def __init__(self, window=4096, enabled=True):
+        """
+        Time the phases of a loop, keeping the latest
+        durations of each phase for percentiles
+        :param window: integer number of latest durations
+        kept per phase
+        :param enabled: False to make all calls no-ops
+        """
+        self._window = window
+        self._enabled = enabled
+        self._samples = dict()
+        self._counts = dict()
+        self._max = dict()
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    def start(self):
+        """
+        Get a time stamp to time the first phase from
+        :return: float time stamp, None if disabled
+        """
+        if self._enabled:
+            return _clock()
+
+    def lap(self, phase, stamp, exclude=0.):
+        """
+        Record the time since a stamp for a phase
+        :param phase: name string of the phase
+        :param stamp: time stamp given by <start> or <lap>
+        :param exclude: float seconds within the phase
+        already recorded under another phase
+        :return: float time stamp to time the next phase
+        from, None if disabled
+        """
+        if not self._enabled:
+            return None
+        now = _clock()
+        duration = now - stamp - exclude
+        count = self._counts.get(phase, 0)
+        if not count:
+            self._samples[phase] = np.zeros(self._window)
+            self._max[phase] = 0.
+        self._samples[phase][count % self._window] = duration
+        self._counts[phase] = count + 1
+        if duration > self._max[phase]:
+            self._max[phase] = duration
+        return now
+
+    @property
+    def stats(self):
+        """
+        Get the timing statistics of each phase
+        :return: dictionary where keys are phase names,
+        values are dictionaries of {count, mean, p50, p95,
+        p99, max} in seconds, percentiles and mean over the
+        latest window, max over all time
+        """
+        stats = dict()
+        for phase, count in self._counts.items():
+            samples = self._samples[phase][:min(count, self._window)]
+            p50, p95, p99 = np.percentile(samples, (50, 95, 99))
+            stats[phase] = dict(
+                count=count, mean=float(samples.mean()),
+                p50=float(p50), p95=float(p95), p99=float(p99),
+                max=self._max[phase])
+        return stats
+
+    def reset(self):
+        """
+        Clear all recorded durations
+        :return: None
+        """
+        self._samples, self._counts, self._max = dict(), dict(), dict()
+
+    def dump(self, path):
+        """
+        Write the timing statistics to a json file
+        :param path: file path string
+        :return: None
+        """
+        with open(path, 'w') as f:
+            json.dump(self.stats, f, indent=2, sort_keys=True)
+
+
 def pause(t):
     time.sleep(t)
 
@@ -106,6 +106,15 @@ class View:
         """
         return self._engine.get_camera_image(itype=itype)
 
+    def set_record_suffix(self, suffix):
+        """
+        Set the string appended to the names of following
+        record files, so that they do not collide
+        :param suffix: string, None or empty for none
+        :return: None
+        """
+        self._engine.record_suffix = suffix
+
     def set_render_view(self, camera_info):
         """
         Update the view, mainly resetting the camera.
@@ -1,13 +1,17 @@
 #!/usr/bin/env python
 
 from .entity.body import Body
-from .utils import io_util, math_util
+from .utils import io_util, math_util, time_util
+from .utils.spatial_index import GridIndex
+from .utils.state_library import StateLibrary, pack_checker_state
 from .utils.io_util import PerlsLogger
 from .entity import PR2Gripper, rethinkGripper, WSG50Gripper
 from .entity import sawyer, kuka
 from .handler import taskHandler
 
+import copy
 import logging
+import numpy as np
 
 __author__ = 'Julian Gao'
 __email__ = 'julianyg@stanford.edu'
@@ -41,6 +45,16 @@ class World(object):
         env=['gravity', 'traction', 'target']
     )
 
+    # Snapshot fields gathered from engine state buffers,
+    # base fields are concatenated, joint fields are padded
+    _SNAPSHOT_BASE = dict(
+        pos=('pos',), orn=('orn',), pose=('pos', 'orn'),
+        v=('v',), omega=('omega',))
+    _SNAPSHOT_JOINT = dict(
+        joint_positions='joint_pos',
+        joint_velocities='joint_vel',
+        joint_torques='joint_torque')
+
     def __init__(self, desc_file, physics_engine):
         """
         Initialize default environment in simulation
@@ -59,6 +73,32 @@ class World(object):
         self._traction = 200
         self._checker = None
 
+        # Restore from the first settled reset
+        # instead of simulating every time
+        self._fast_reset = False
+        self._reset_checkpoint = None
+        self._random_start = False
+
+        # Wall time in seconds spent by each build phase
+        self._build_time = dict()
+
+        # Optional index of link bounding boxes keyed by
+        # (body name, link index), with the body states
+        # they were last refreshed at
+        self._index = None
+        self._index_state = dict()
+
+        # Resets and boot step in chunks until bodies come to
+        # rest. Number of steps taken is kept by stage
+        self._settle = dict(lin_threshold=1e-3, ang_threshold=1e-2,
+                            chunk=10)
+        self._settle_steps = dict()
+
+        # Library of pre-settled start states to sample resets
+        # from, after one full reset has set up the task
+        self._start_states = None
+        self._initialized = False
+
     @property
     def info(self):
         """
@@ -73,7 +113,9 @@ class World(object):
             tools=[t.name for t in self._tools.values()],
             tracking_bodies=self._target_bodies,
             assets=self._bodies.keys(),
-            engine=self._engine.info
+            engine=self._engine.info,
+            build_time=dict(self._build_time),
+            settle_steps=dict(self._settle_steps)
         )
 
     @property
@@ -121,29 +163,310 @@ class World(object):
         """
         return self._target_bodies
 
+    @property
+    def fast_reset(self):
+        """
+        Check if resets restore from the checkpoint taken
+        after the first settled reset
+        :return: boolean
+        """
+        return self._fast_reset
+
+    @fast_reset.setter
+    def fast_reset(self, flag):
+        """
+        Turn on/off restoring resets from checkpoint. Note
+        the task initialization is then only run once, so
+        randomized initial conditions are not redrawn.
+        :param flag: boolean
+        :return: None
+        """
+        self._fast_reset = flag
+        self._reset_checkpoint = None
+
+    @property
+    def random_start(self):
+        """
+        Check if full resets randomize the task setup
+        :return: boolean
+        """
+        return self._random_start
+
+    @random_start.setter
+    def random_start(self, flag):
+        """
+        Turn on/off randomizing object placement and goal
+        on full resets, drawn from numpy random state
+        :param flag: boolean
+        :return: None
+        """
+        self._random_start = flag
+        if self._checker is not None:
+            self._checker.set_random_start(flag)
+
     def build(self):
         """
         Build the world
         :return: None
         """
+        start = time_util.get_abs_time()
         self.load_xml(self._description)
+        self._build_time['total'] = time_util.get_abs_time() - start
+        logging.info('World built in {:.3f} sec: {}'.format(
+            self._build_time['total'],
+            ', '.join('{} {:.3f}'.format(k, v) for k, v in
+                      sorted(self._build_time.items()) if k != 'total')))
 
     def reset(self):
         """
         Reset the world to its initial conditions
         :return: None
         """
+        if self._start_states is not None and self._initialized:
+            if self.apply_start_state(self._start_states.sample()) == 0:
+                return
+            logging.warning('Failed to apply start state, '
+                            'performing full reset.')
+
+        if self._fast_reset and self._reset_checkpoint is not None:
+            if self.restore(self._reset_checkpoint) == 0:
+                return
+            logging.warning('Failed to restore checkpoint, '
+                            'performing full reset.')
+
         for tool in self._tools.values():
             tool.reset()
             
         for body in self._bodies.values():
             body.reset()
-            
-        self._engine.hold(500)
-        
+
+        self.settle(500, 'reset')
+
         # Fine tune the initial environment setup
         self._checker.initialize(self)
-        self._engine.hold(500)
+        self.settle(500, 'initialize')
+
+        if self._fast_reset:
+            self._reset_checkpoint = self.checkpoint()
+        self._initialized = True
+        self.refresh_index(force=True)
+
+    def load_start_states(self, path):
+        """
+        Sample resets from a library of start states, see
+        scripts/generate_start_states.py. The first reset is
+        still a full one, setting up task visuals.
+        :param path: library file path string without extension,
+        None to stop sampling
+        :return: 0 if success, -1 if the library does not
+        match this world
+        """
+        if path is None:
+            self._start_states = None
+            return 0
+        library = StateLibrary(path)
+        if library.meta['names'] != sorted(self._bodies):
+            logging.error('Start states in {} are of a different '
+                          'scene.'.format(path))
+            return -1
+        self._start_states = library
+        logging.info('Loaded {} start states.'.format(len(library)))
+        return 0
+
+    def capture_start_state(self):
+        """
+        Capture the current world state as a library entry
+        :return: tuple (entry dictionary, layout dictionary)
+        :raise RuntimeError: if the engine fails to export
+        """
+        names = sorted(self._bodies)
+        entry = self._engine.export_state(
+            [self._bodies[name].uid for name in names])
+        if entry is None:
+            raise RuntimeError('Failed to export world state')
+        entry['checker'], checker_layout = \
+            pack_checker_state(self._checker.state)
+        return entry, dict(names=names, checker_layout=checker_layout)
+
+    def apply_start_state(self, entry):
+        """
+        Set the world to a library start state
+        :param entry: dictionary given by <StateLibrary.sample>
+        :return: 0 if success, -1 if failed
+        """
+        names = sorted(self._bodies)
+        if self._engine.import_state(
+                [self._bodies[name].uid for name in names], entry) != 0:
+            return -1
+        state = dict(self._checker.state)
+        state.update(entry['checker'])
+        self._checker.state = state
+        self.refresh_index(force=True)
+        return 0
+
+    def checkpoint(self):
+        """
+        Save the current world state in memory, including
+        simulation states, body bookkeeping (constraints,
+        markers) and task checker states.
+        :return: checkpoint token, None if failed
+        """
+        state = self._engine.save_state()
+        if state is None:
+            return None
+        return dict(
+            state=state,
+            bodies=dict((name, body.checkpoint())
+                        for name, body in self._bodies.items()),
+            checker=copy.deepcopy(self._checker.state))
+
+    def restore(self, token):
+        """
+        Restore the world to a checkpoint
+        :param token: checkpoint token given by <checkpoint>
+        :return: 0 if success, -1 if failed
+        """
+        if self._engine.restore_state(token['state']) != 0:
+            return -1
+        for name, record in token['bodies'].items():
+            self._bodies[name].restore(record)
+        self._checker.state = copy.deepcopy(token['checker'])
+        self.refresh_index(force=True)
+        return 0
+
+    @property
+    def spatial_index(self):
+        """
+        Get the index of link bounding boxes
+        :return: GridIndex instance, None if not enabled
+        """
+        return self._index
+
+    def enable_spatial_index(self, cell_size=0.1):
+        """
+        Maintain an index of link bounding boxes of all
+        bodies, refreshed on every update for bodies
+        that moved since
+        :param cell_size: float grid cell edge length
+        :return: None
+        """
+        self._index = GridIndex(cell_size)
+        self._index_state = dict()
+        self.refresh_index(force=True)
+
+    def disable_spatial_index(self):
+        """
+        Stop maintaining the index of link bounding boxes
+        :return: None
+        """
+        self._index = None
+        self._index_state = dict()
+
+    def refresh_index(self, force=False):
+        """
+        Update bounding boxes in the index for bodies
+        whose pose or joint positions changed. Bodies with
+        fixed base and no movable joints are only indexed
+        when forced.
+        :param force: boolean, True to refresh all bodies
+        :return: None
+        """
+        if self._index is None:
+            return
+
+        for name in [n for n in self._index_state if n not in self._bodies]:
+            for lid in range(-1, self._index_state.pop(name)[1] - 1):
+                self._index.remove((name, lid))
+
+        bodies = list()
+        for name, body in self._bodies.items():
+            state = self._index_state.get(name)
+            if force or state is None or not state[2]:
+                bodies.append((name, body))
+        if not bodies:
+            return
+
+        snapshots = self._engine.get_body_snapshot(
+            [body.uid for _, body in bodies],
+            dict((body.uid, ()) for _, body in bodies))
+        for name, body in bodies:
+            snap = snapshots[body.uid]
+            pose = np.concatenate((snap['pos'], snap['orn'], snap['joint_pos']))
+            state = self._index_state.get(name)
+            if not force and state is not None \
+                    and np.allclose(pose, state[0], rtol=0., atol=1e-6):
+                continue
+
+            boxes = self._engine.get_body_bounding_boxes(body.uid)
+            for lid, (lower, upper) in zip(range(-1, len(boxes) - 1), boxes):
+                self._index.update((name, lid), lower, upper)
+            static = body.fix and body not in self._tools.values() and \
+                all(jtype == 'fixed' for jtype in body.joint_specs['jtype'])
+            self._index_state[name] = (pose, len(boxes), static)
+
+    def _by_body(self, results):
+        """
+        Collapse link query results to bodies, keeping
+        the first result of each body
+        :param results: list of ((name, lid), value) tuples
+        :return: list of (name, value) tuples
+        """
+        seen = set()
+        bodies = list()
+        for (name, _), value in results:
+            if name not in seen:
+                seen.add(name)
+                bodies.append((name, value))
+        return bodies
+
+    def query_region(self, lower, upper, by_body=False):
+        """
+        Find links whose bounding boxes overlap a region,
+        e.g. the bodies inside the goal region. Requires
+        the spatial index to be enabled.
+        :param lower: vec3 float lower corner of region
+        :param upper: vec3 float upper corner of region
+        :param by_body: boolean, True to return body names
+        :return: list of (name, lid) tuples, or of names
+        """
+        keys = self._index.query_region(lower, upper)
+        if by_body:
+            return [name for name, _ in self._by_body(
+                [(key, None) for key in keys])]
+        return keys
+
+    def query_radius(self, point, radius, by_body=False):
+        """
+        Find links whose bounding boxes are within given
+        distance of a point. Requires the spatial index.
+        :param point: vec3 float query point
+        :param radius: float distance
+        :param by_body: boolean, True to return body names
+        :return: list of ((name, lid), distance) tuples, or of
+        (name, distance) tuples, nearest first
+        """
+        results = self._index.query_radius(point, radius)
+        return self._by_body(results) if by_body else results
+
+    def query_nearest(self, point, k=1, by_body=False):
+        """
+        Find the k links, or bodies, whose bounding boxes are
+        nearest to a point. Requires the spatial index.
+        :param point: vec3 float query point
+        :param k: integer number of results
+        :param by_body: boolean, True to return body names
+        :return: list of ((name, lid), distance) tuples, or of
+        (name, distance) tuples, nearest first
+        """
+        if not by_body:
+            return self._index.query_nearest(point, k)
+        num = k
+        while True:
+            results = self._index.query_nearest(point, num)
+            bodies = self._by_body(results)
+            if len(bodies) >= k or len(results) < num:
+                return bodies[:k]
+            num *= 2
 
     def load_body(self, file_path, pos, orn,
                   fixed=False, record=False):
@@ -168,11 +491,21 @@ class World(object):
         :param file_name: file path of this xml 
         :return: None
         """
+        tic = time_util.get_abs_time()
         parse_tree = io_util.parse_env(file_name)
         self.name_str = (parse_tree.env['title'], parse_tree.scene_title)
+        toc = time_util.get_abs_time()
+        self._build_time['parse'] = toc - tic
+
+        # Warm up asset cache, if the engine has one
+        if getattr(self._engine, 'asset_cache', False):
+            self._engine.preload_assets(io_util.list_env_assets(parse_tree))
+        tic = time_util.get_abs_time()
+        self._build_time['preload'] = tic - toc
 
         # Load task completion checker
         self._checker = taskHandler.Checker(self.name_str[1])
+        self._checker.set_random_start(self._random_start)
 
         for gripper in parse_tree.gripper:
             gripper_body = self.GRIPPER_TYPE[gripper['type']](
@@ -188,6 +521,9 @@ class World(object):
                 gripper_body.traction = self._traction
                 gripper_body.hang()
 
+            if gripper['ft_sensor'] != []:
+                gripper_body.enable_ft_sensors(gripper['ft_sensor'])
+
             if gripper['attach']:
                 children = self._load_asset(gripper['attach'])
                 gripper_body.attach_children = \
@@ -214,6 +550,8 @@ class World(object):
                     self._engine,
                     path=gripper_spec['path'])
                 gripper_body.name = gripper_spec['name']
+                if gripper_spec['ft_sensor'] != []:
+                    gripper_body.enable_ft_sensors(gripper_spec['ft_sensor'])
 
                 # Note here not appending gripper into tools since
                 # we can only operate it through the arm
@@ -231,10 +569,15 @@ class World(object):
                 gripper=gripper_body)
 
             arm_body.name = arm_spec['name']
+            if arm_spec['ft_sensor'] != []:
+                arm_body.enable_ft_sensors(arm_spec['ft_sensor'])
             self._tools[arm_body.tid] = arm_body
             self._bodies[arm_body.name] = arm_body
             self._target_bodies.append((arm_body.name, arm_body.uid))
 
+        toc = time_util.get_abs_time()
+        self._build_time['tools'] = toc - tic
+
         for asset in parse_tree.scene:
             bodies = self._load_asset(asset)
 
@@ -245,6 +588,7 @@ class World(object):
         # Add gravity after everything is loaded
         self._gravity = parse_tree.env['gravity']
         self._engine.configure_environment(self._gravity)
+        self._build_time['scene'] = time_util.get_abs_time() - toc
 
     def _load_asset(self, asset):
         """
@@ -266,6 +610,8 @@ class World(object):
             self._bodies[asset_body.name] = asset_body
             if p_elem['record']:
                 self._target_bodies.append((asset_body.name, asset_body.uid))
+            if p_elem.get('ft_sensor', []) != []:
+                asset_body.enable_ft_sensors(p_elem['ft_sensor'])
 
             body_lst.append(asset_body)
 
@@ -305,6 +651,22 @@ class World(object):
                      .2, {'text': 'controlling'})
         return tool
 
+    def get_proximity(self, names, dist_thresh, others=None):
+        """
+        Get the closest points near each of given bodies
+        in one query, see <Body.get_nearby>
+        :param names: list of body name strings to query
+        :param dist_thresh: float distance threshold
+        :param others: list of body name strings to consider,
+        None for all other bodies
+        :return: dictionary of {name: structured array of points}
+        """
+        uids = None if others is None else \
+            [self._bodies[name].uid for name in others]
+        points = self._engine.get_proximity(
+            [self._bodies[name].uid for name in names], dist_thresh, uids)
+        return dict((name, points[self._bodies[name].uid]) for name in names)
+
     def get_env_state(self, *args):
         """
         Get world states by attribute name
@@ -333,6 +695,83 @@ class World(object):
 
         return state_list
 
+    def snapshot(self, fields, names=None):
+        """
+        Get states of many bodies at once, stacked into arrays.
+        Base and joint states are read in one engine pass;
+        other fields, e.g. 'tool_pose', fall back to body
+        attributes read from links fetched in the same pass,
+        and are flattened.
+        :param fields: list of field strings among 'pos', 'orn',
+        'pose', 'v', 'omega', 'joint_positions',
+        'joint_velocities', 'joint_torques', or attribute names
+        :param names: list of body name strings, None for all
+        bodies in name order
+        :return: dictionary of {names: list of body names,
+        index: {name: row}, num_joints: (N,) int array,
+        <field>: (N, ...) array}. Joint and attribute fields
+        are padded with NaN up to the longest row, attribute
+        fields that are not numeric give object arrays.
+        """
+        names = sorted(self._bodies) if names is None else list(names)
+        bodies = [self._bodies[name] for name in names]
+        uids = [body.uid for body in bodies]
+        if all(field in self._SNAPSHOT_BASE or field in self._SNAPSHOT_JOINT
+               for field in fields):
+            snapshots = self._engine.get_body_snapshot(
+                uids, dict((uid, ()) for uid in uids))
+        else:
+            # Attribute fields such as tool poses read link states,
+            # also of attached grippers, so fetch all links of the
+            # bodies and tools in the same engine pass
+            link_uids = uids + [tool.uid for tool in self._tools.values()
+                                if tool.uid not in uids]
+            snapshots = self._engine.get_body_snapshot(link_uids)
+        snaps = [snapshots[uid] for uid in uids]
+
+        num_joints = np.array([len(snap['joint_pos']) for snap in snaps],
+                              dtype=int)
+        result = dict(names=names,
+                      index=dict((name, i) for i, name in enumerate(names)),
+                      num_joints=num_joints)
+        for field in fields:
+            if field in self._SNAPSHOT_BASE:
+                keys = self._SNAPSHOT_BASE[field]
+                result[field] = np.array(
+                    [np.concatenate([snap[k] for k in keys])
+                     for snap in snaps], dtype=np.float64) \
+                    if snaps else np.zeros((0, 0))
+            elif field in self._SNAPSHOT_JOINT:
+                key = self._SNAPSHOT_JOINT[field]
+                values = np.full((len(snaps), max(num_joints.tolist() + [0])),
+                                 np.nan)
+                for i, snap in enumerate(snaps):
+                    values[i, :num_joints[i]] = snap[key]
+                result[field] = values
+            else:
+                values = list()
+                for body in bodies:
+                    value = getattr(body, field)
+                    if isinstance(value, tuple):
+                        value = np.concatenate(
+                            [np.ravel(v) for v in value])
+                    values.append(np.ravel(value))
+                try:
+                    values = [np.asarray(v, dtype=np.float64) for v in values]
+                except (TypeError, ValueError):
+                    # Not numeric, keep each body value as is
+                    result[field] = np.array(
+                        [None] * len(values), dtype=object)
+                    result[field][:] = values
+                    continue
+                padded = np.full(
+                    (len(values), max([len(v) for v in values] + [0])),
+                    np.nan)
+                for i, value in enumerate(values):
+                    padded[i, :len(value)] = value
+                result[field] = padded
+        return result
+
     def get_task_state(self):
         """
         Get task states. Typically to get the task goal, or 
@@ -350,9 +789,66 @@ class World(object):
         """
         self._checker.set_job(job)
         status = self._engine.start_engine(frame)
-        self._engine.hold(100)
+        self.settle(100, 'boot')
         return status
 
+    def configure_settle(self, lin_threshold=1e-3,
+                         ang_threshold=1e-2, chunk=10):
+        """
+        Configure when the world is considered at rest
+        :param lin_threshold: float linear velocity threshold, m/s
+        :param ang_threshold: float angular velocity threshold,
+        rad/s, also applied to joint velocities
+        :param chunk: integer number of steps between checks,
+        0 to always step the full cap as before
+        :return: None
+        """
+        self._settle = dict(lin_threshold=lin_threshold,
+                            ang_threshold=ang_threshold,
+                            chunk=chunk)
+
+    def _at_rest(self):
+        """
+        Check if all bodies not fixed have come to rest,
+        and joints of all bodies stopped moving
+        :return: boolean
+        """
+        snapshot = self.snapshot(['v', 'omega', 'joint_velocities'])
+        free = np.array([not self._bodies[name].fix
+                         for name in snapshot['names']], dtype=bool)
+        if not len(free):
+            return True
+        lin = np.linalg.norm(snapshot['v'][free], axis=1)
+        ang = np.linalg.norm(snapshot['omega'][free], axis=1)
+        joint = np.abs(np.nan_to_num(snapshot['joint_velocities']))
+        return bool(np.all(lin < self._settle['lin_threshold']) and
+                    np.all(ang < self._settle['ang_threshold']) and
+                    np.all(joint < self._settle['ang_threshold']))
+
+    def settle(self, max_steps, stage='settle'):
+        """
+        Step the simulation until the world comes to rest,
+        checking every few steps
+        :param max_steps: integer maximum number of steps
+        :param stage: name string to log the steps taken by
+        :return: integer number of steps taken
+        """
+        chunk = self._settle['chunk'] or max_steps
+        steps = 0
+        # Require rest at two consecutive checks, so bodies
+        # momentarily still, e.g. at their apex, do not count
+        rested = 0
+        while steps < max_steps and rested < 2:
+            n = min(chunk, max_steps - steps)
+            self._engine.hold(n)
+            steps += n
+            rested = rested + 1 if self._at_rest() else 0
+
+        self._settle_steps[stage] = steps
+        logging.debug('World {} settled in {}/{} steps.'.format(
+            stage, steps, max_steps))
+        return steps
+
     def notify_engine(self, stat):
         """
         Set the status of render,
@@ -378,12 +874,21 @@ class World(object):
         """
         return self._checker.score(self)
 
-    def update(self, elp=0, step_size=None):
+    def update(self, elp=0, step_size=None, num_steps=1):
         """
         Update the states of the world.
-        :return: None
-        """
-        return self._engine.step(elp, step_size)
+        :param elp: elapsed time since start, for time out
+        :param step_size: dynamically change step size
+        :param num_steps: number of simulation steps to advance
+        in one engine call, for asynchronous simulation only
+        :return: boolean, True if running time is up
+        """
+        if num_steps > 1:
+            done = self._engine.step_n(num_steps)
+        else:
+            done = self._engine.step(elp, step_size)
+        self.refresh_index()
+        return done
 
     def clean_up(self):
         """
@@ -392,6 +897,10 @@ class World(object):
         """
         self._target_bodies = list()
         self._tools, self._bodies = dict(), dict()
+        self._reset_checkpoint = None
+        self._start_states = None
+        self._initialized = False
+        self.disable_spatial_index()
 
         # Flush error messages
         for err_msg in self._engine.error:
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+
+"""
+Benchmark physics solver presets on the push_sawyer environment.
+For each preset, report the simulation throughput (steps/sec)
+and how far resting bodies drift without any control input.
+
+Usage: python benchmark_solver.py [num_steps] [preset ...]
+"""
+
+from __future__ import print_function
+import sys
+import time
+
+from perls import Controller, io_util, math_util
+
+
+def benchmark(conf, preset, num_steps):
+    """
+    Run one preset in a fresh world
+    :param conf: base configuration tree
+    :param preset: name string of solver preset, None for
+    bullet defaults
+    :param num_steps: number of simulation steps to time
+    :return: tuple (steps per second, dict of body drift)
+    """
+    conf = conf._replace(
+        solver=dict(preset=preset) if preset else dict(),
+        max_run_time=0)
+    _, world, display, _ = Controller.load_config(conf, None)
+
+    world.boot(display.info['frame'])
+    display.run(None)
+    world.reset()
+
+    start = dict((name, body.pos) for name, body in world.body.items())
+
+    tic = time.time()
+    world.update(num_steps=num_steps)
+    elapsed = time.time() - tic
+
+    drift = dict((name, float(math_util.l2(body.pos - start[name])))
+                 for name, body in world.body.items())
+
+    world.clean_up()
+    display.close(0)
+    return num_steps / elapsed, drift
+
+
+def main(argv):
+
+    num_steps = int(argv[0]) if argv else 2000
+    presets = argv[1:] or [None, 'fast-training', 'high-fidelity-demo']
+
+    conf = io_util.parse_config(io_util.pjoin(
+        __file__, '../../perls/configs/gym-cmd.xml'))[0]
+    conf = conf._replace(model_desc=io_util.pjoin(
+        __file__, '../../perls/configs/push_sawyer.xml'))
+
+    print('{:<20s} {:>12s} {:>12s}  {}'.format(
+        'preset', 'steps/sec', 'max drift', 'drift body'))
+    for preset in presets:
+        rate, drift = benchmark(conf, preset, num_steps)
+        name = max(drift, key=drift.get)
+        print('{:<20s} {:>12.1f} {:>12.6f}  {}'.format(
+            preset or 'default', rate, drift[name], name))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+
+"""
+Generate a library of pre-settled start states for an
+environment. Worker processes each run full resets with
+randomized object placement and goal, seeded per worker,
+and capture the settled world. The states are written to
+one file that worlds sample resets from, see
+<World.load_start_states>.
+
+Usage: python generate_start_states.py output_path [num_states]
+       [num_workers] [env_xml]
+"""
+
+from __future__ import print_function
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from perls import Controller, io_util
+from perls.utils.state_library import write_library
+
+
+def generate(args):
+    """
+    Capture start states in a fresh world
+    :param args: tuple (env config path, number of states, seed)
+    :return: tuple (list of entries, layout dictionary)
+    """
+    model_desc, num_states, seed = args
+    np.random.seed(seed)
+
+    conf = io_util.parse_config(io_util.pjoin(
+        __file__, '../../perls/configs/gym-cmd.xml'))[0]
+    conf = conf._replace(model_desc=model_desc, max_run_time=0)
+    _, world, display, _ = Controller.load_config(conf, None)
+
+    world.boot(display.info['frame'])
+    display.run(None)
+
+    # Every reset must run the task initialization to draw
+    # a new setup, instead of restoring a checkpoint
+    world.fast_reset = False
+    world.random_start = True
+
+    entries, layout = list(), None
+    for _ in range(num_states):
+        world.reset()
+        entry, layout = world.capture_start_state()
+        entries.append(entry)
+
+    world.clean_up()
+    display.close(0)
+    return entries, layout
+
+
+def main(argv):
+
+    path = argv[0]
+    num_states = int(argv[1]) if len(argv) > 1 else 1000
+    num_workers = int(argv[2]) if len(argv) > 2 else 4
+    model_desc = argv[3] if len(argv) > 3 else io_util.pjoin(
+        __file__, '../../perls/configs/push_sawyer.xml')
+
+    # Split states evenly, seeding each worker differently
+    counts = [num_states // num_workers +
+              int(i < num_states % num_workers)
+              for i in range(num_workers)]
+    jobs = [(model_desc, count, seed)
+            for seed, count in enumerate(counts) if count > 0]
+
+    tic = time.time()
+    pool = Pool(len(jobs))
+    results = pool.map(generate, jobs)
+    pool.close()
+    pool.join()
+
+    entries = [entry for batch, _ in results for entry in batch]
+    write_library(path, entries, results[0][1])
+    print('Wrote {} start states to {}.npy in {:.1f} sec'.format(
+        len(entries), path, time.time() - tic))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
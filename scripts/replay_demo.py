@@ -1,12 +1,12 @@
 #!/usr/bin/env python
 
 from __future__ import print_function
-import pybullet as p
 import sys, os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from perls.src.lib.utils.io_util import parse_log as plog
 from perls.src.lib.utils.math_util import get_relative_pose, get_absolute_pose, rand_vec, seed
+from perls.src.lib.physics.physicsEngine import KinematicEngine
 from glob import glob
 import numpy as np
 import matplotlib.pyplot as plt
@@ -28,16 +28,13 @@ class Postprocess(object):
         robot_base_pose = (np.array([-0.15, -0.2, 0.9]), np.array([0, 0, 0, 1]))
 
         ### TODO: why should these be different... FUCK bullet
-        self.r = p.connect(p.DIRECT)
-        p.setRealTimeSimulation(0)
+        # Only forward kinematics is needed, no physics server
+        self.kinematics = KinematicEngine()
 
         ### Change this to your urdf file. ###
-        self.robot_file = p.loadURDF("../data/sawyer_robot/sawyer_description/urdf/sawyer_arm.urdf",
-                          robot_base_pose[0], robot_base_pose[1], useFixedBase=True)
-        p.resetBasePositionAndOrientation(self.robot_file, robot_base_pose[0], robot_base_pose[1])
-
-        ### TODO: why does the base pose change here and why is the above line necessary???
-        # self.robot_base_pose = (p.getLinkState(self.robot_file, 0)[4], p.getLinkState(self.robot_file, 0)[5])
+        self.robot_file, _, _ = self.kinematics.load_asset(
+            "../data/sawyer_robot/sawyer_description/urdf/sawyer_arm.urdf",
+            robot_base_pose[0], robot_base_pose[1], True)
 
         # hardcoded mapping between entity ids and entity names
         self.object_map = {4: "cube_0", 1: "titan_0"}
@@ -111,11 +108,16 @@ class Postprocess(object):
         """
         WARNING: returns eef pose in world frame
         """
-        for i in range(7):
-            p.resetJointState(self.robot_file, i, joint_pos[i])
+        x = self.fk_batch([joint_pos])[0]
+        return x[:3], x[3:]
 
-        x = p.getLinkState(self.robot_file, 6)
-        return x[4], x[5]
+    def fk_batch(self, joint_pos):
+        """
+        WARNING: returns (N, 7) eef poses in world frame
+        """
+        # End effector is link 6, after the base
+        return self.kinematics.forward_kinematics(
+            self.robot_file, joint_pos)[:, 7]
 
     def parse_demonstration(self, fname):
         """
@@ -170,7 +172,9 @@ class Postprocess(object):
         prev_joint_vel = robot_log[0, 10:17]
         prev_cube_pose = (cube_log[0, 3:6], cube_log[0, 6:10])
         prev_cube_pose_pos, prev_cube_pose_orn = get_relative_pose(prev_cube_pose, self.robot_base_pose)
-        prev_eef_pose = self.fk(prev_joint_pos)
+        # End effector poses of all samples at once
+        eef_poses = self.fk_batch(robot_log[:, 3:10])
+        prev_eef_pose = (eef_poses[0, :3], eef_poses[0, 3:])
         prev_eef_pose_pos, prev_eef_pose_orn = get_relative_pose(prev_eef_pose, self.robot_base_pose)
         cube_initial_z = prev_cube_pose_pos[-1]
 
@@ -191,7 +195,8 @@ class Postprocess(object):
 
             # convert from world frame to robot frame
             cube_pose_pos_elem, cube_pose_orn_elem = get_relative_pose(cube_pose_elem, self.robot_base_pose)
-            eef_pose_pos_elem, eef_pose_orn_elem = get_relative_pose(self.fk(joint_pos_elem), self.robot_base_pose)
+            eef_pose_pos_elem, eef_pose_orn_elem = get_relative_pose(
+                (eef_poses[i, :3], eef_poses[i, 3:]), self.robot_base_pose)
 
             # filter on eef positions being similar (user didn't move) and cube falling
             if (i != 1) and (np.all(np.absolute(np.array(eef_pose_pos_elem) - np.array(prev_eef_pose_pos)) < 1e-5) \
@@ -251,7 +256,7 @@ class Postprocess(object):
         return np.array(states), np.array(actions)
 
     def close(self):
-        p.disconnect(self.r)
+        self.kinematics.stop()
 
 
 if __name__ == "__main__":